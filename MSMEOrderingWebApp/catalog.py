@@ -0,0 +1,88 @@
+from collections import defaultdict
+
+from django.core.cache import cache
+
+from .data_versions import bump_data_version, data_version
+from .models import ProductCategory, Products
+
+CATALOG_VERSION = "catalog"
+# Renamed whenever the snapshot's shape changes, so no stale shape is read
+CATALOG_KEY = "catalog:snapshot:v2:{version}"
+
+# Customer home best sellers rank sales over this many business days
+BEST_SELLER_DAYS = 30
+
+
+def catalog_version():
+    """Changes whenever a product or category is written (see signals / bump_catalog_version)."""
+    return data_version(CATALOG_VERSION)
+
+
+def bump_catalog_version():
+    bump_data_version(CATALOG_VERSION)
+
+
+def build_catalog():
+    """
+    Group the available products by name, the way the POS and customer home
+    pages show them: one card per product with its price range and stocks,
+    plus the flat variation list the variation picker uses.
+    """
+    products = list(Products.objects.select_related('category').filter(available=True))
+
+    grouped = defaultdict(list)
+    for p in products:
+        grouped[p.name].append(p)
+
+    unique_products = []
+    for name, group in grouped.items():
+        min_price = min(p.price for p in group)
+        max_price = max(p.price for p in group)
+        representative = group[0]
+
+        unique_products.append({
+            'name': name,
+            'price_range': f"₱{min_price:.2f}" if min_price == max_price else f"₱{min_price:.2f} - ₱{max_price:.2f}",
+            'category': representative.category.name if representative.category else "Uncategorized",
+            'image': representative.image if representative.image else None,
+            'stocks': sum(p.stocks for p in group),
+            'show_stocks': all(p.track_stocks for p in group),
+            'track_stocks': representative.track_stocks,
+        })
+
+    return {
+        'products': unique_products,
+        'all_products': [
+            {
+                'id': p.id,
+                'name': p.name,
+                'variation_name': p.variation_name,
+                'price': p.price,
+                'stocks': p.stocks,
+                'track_stocks': p.track_stocks,
+            }
+            for p in products
+        ],
+        'categories': list(ProductCategory.objects.all()),
+    }
+
+
+def get_catalog():
+    """The grouped catalog snapshot, rebuilt only after a product/category write."""
+    return cache.get_or_set(CATALOG_KEY.format(version=catalog_version()), build_catalog, None)
+
+
+def best_sellers(catalog, ranking, limit=3, min_sold=3):
+    """
+    Catalog cards for the first `limit` products in `ranking` (see
+    sales_rollup.top_products) that sold at least `min_sold` units.
+    """
+    cards = {p['name'].lower(): p for p in catalog['products']}
+    picks = []
+    for row in ranking:
+        if row['quantity'] < min_sold or len(picks) == limit:
+            break
+        card = cards.get(row['name'].lower())
+        if card:
+            picks.append(card)
+    return picks
@@ -1,10 +1,30 @@
 from channels.generic.websocket import AsyncWebsocketConsumer
 from asgiref.sync import sync_to_async
-from .models import Checkout
+from channels.db import database_sync_to_async
+from .notification_counts import get_owner_counts, get_customer_count
+from .shop_status import SHOP_STATUS_GROUP, shop_status_payload
+from .report_jobs import REPORT_JOBS_GROUP, REPORT_USER_TYPES
+from .metrics import ConsumerMetricsMixin, group_send
 import json
+import logging
 from urllib.parse import parse_qs
 
-class PrintConsumer(AsyncWebsocketConsumer):
+logger = logging.getLogger(__name__)
+
+# Session user types that see the order dashboard notifications
+STAFF_USER_TYPES = {'owner', 'cashier', 'rider'}
+
+
+@database_sync_to_async
+def session_user(scope):
+    """(user_type, email) of the logged-in session behind a socket, from AuthMiddlewareStack."""
+    session = scope.get('session')
+    if session is None:
+        return None, None
+    return session.get('user_type'), session.get('email')
+
+
+class PrintConsumer(ConsumerMetricsMixin, AsyncWebsocketConsumer):
     async def connect(self):
         # You can put all desktop apps in a single group
         await self.channel_layer.group_add("printers", self.channel_name)
@@ -16,8 +36,14 @@ class PrintConsumer(AsyncWebsocketConsumer):
     async def send_print_job(self, event):
         await self.send(text_data=json.dumps(event["data"]))
 
-class NotificationConsumer(AsyncWebsocketConsumer):
+class NotificationConsumer(ConsumerMetricsMixin, AsyncWebsocketConsumer):
     async def connect(self):
+        # ✅ Order cards carry customer names and addresses: staff sessions only
+        user_type, _ = await session_user(self.scope)
+        if user_type not in STAFF_USER_TYPES:
+            await self.close()
+            return
+
         await self.channel_layer.group_add("notifications", self.channel_name)
         await self.accept()
 
@@ -35,37 +61,72 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         await self.send(text_data=json.dumps({
             'type': 'send_notification',
             'count': event.get('unseen_count', 0),  # Badge
-            'dashboard_count': event['pending_count']  # Card
+            'dashboard_count': event['pending_count'],  # Card
+            'orders': event.get('orders', []),  # Changed order cards
         }))
 
     @sync_to_async
     def get_counts(self):
-        return {
-            "pending_count": Checkout.objects.filter(status="pending").values("order_code").distinct().count(),
-            "unseen_count": Checkout.objects.filter(status="pending", is_seen_by_owner=False).values("order_code").distinct().count()
-        }
+        # Cached counters, refreshed by signals.notify_orders on commit
+        return get_owner_counts()
     
     # Safe no-op handlers
     async def delivery_fee_response(self, event):
-        print(f"[NotificationConsumer] Ignoring delivery_fee_response: {event}")
+        logger.debug("[NotificationConsumer] Ignoring delivery_fee_response: %s", event)
 
     async def delivery_fee_rejected(self, event):
-        print(f"[NotificationConsumer] Ignoring delivery_fee_rejected: {event}")
+        logger.debug("[NotificationConsumer] Ignoring delivery_fee_rejected: %s", event)
 
 
 
-class CustomerNotificationConsumer(AsyncWebsocketConsumer):
+class ShopStatusConsumer(ConsumerMetricsMixin, AsyncWebsocketConsumer):
+    async def connect(self):
+        await self.channel_layer.group_add(SHOP_STATUS_GROUP, self.channel_name)
+        await self.accept()
+
+        # ✅ Current state on connect, then pushes on every change
+        data = await sync_to_async(shop_status_payload)()
+        await self.send(text_data=json.dumps({'type': 'shop_status', **data}))
+
+    async def disconnect(self, close_code):
+        await self.channel_layer.group_discard(SHOP_STATUS_GROUP, self.channel_name)
+
+    async def send_shop_status(self, event):
+        await self.send(text_data=json.dumps({'type': 'shop_status', **event['data']}))
+
+
+class ReportJobConsumer(ConsumerMetricsMixin, AsyncWebsocketConsumer):
+    async def connect(self):
+        # ✅ Job updates carry sales / inventory report download URLs
+        user_type, _ = await session_user(self.scope)
+        if user_type not in REPORT_USER_TYPES:
+            await self.close()
+            return
+
+        await self.channel_layer.group_add(REPORT_JOBS_GROUP, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        await self.channel_layer.group_discard(REPORT_JOBS_GROUP, self.channel_name)
+
+    async def send_report_job(self, event):
+        await self.send(text_data=json.dumps({'type': 'report_job', **event['data']}))
+
+
+class CustomerNotificationConsumer(ConsumerMetricsMixin, AsyncWebsocketConsumer):
     async def connect(self):
         self.group_name = None
         query_params = parse_qs(self.scope['query_string'].decode())
         raw_email = query_params.get('email', [None])[0]
 
-        if not raw_email:
+        # ✅ Only the logged-in customer may follow their own orders
+        user_type, session_email = await session_user(self.scope)
+        if user_type != 'customer' or not session_email or (raw_email and raw_email != session_email):
             await self.close()
             return
 
-        self.email = raw_email
-        self.group_name = f"customer_{self.sanitize_email(raw_email)}"
+        self.email = session_email
+        self.group_name = f"customer_{self.sanitize_email(session_email)}"
 
         await self.channel_layer.group_add(self.group_name, self.channel_name)
         await self.accept()
@@ -88,48 +149,45 @@ class CustomerNotificationConsumer(AsyncWebsocketConsumer):
             'type': 'send_customer_notification',
             'message': event['message'],
             'customer_count': event['customer_count'],
+            'orders': event.get('orders', []),
         }))
 
     @sync_to_async
     def get_customer_notification_count(self):
-        return Checkout.objects.filter(
-        email=self.email,
-        status__in=["accepted", "rejected", "Preparing", "Packed", "Ready for Pickup", "Out for Delivery", "Completed"],
-        is_seen_by_customer=False
-    ).values("order_code").distinct().count()
+        return get_customer_count(self.email)
 
     # Safe no-op handlers
     async def delivery_fee_response(self, event):
-        print(f"[CustomerNotificationConsumer] Ignoring delivery_fee_response: {event}")
+        logger.debug("[CustomerNotificationConsumer] Ignoring delivery_fee_response: %s", event)
 
     async def delivery_fee_rejected(self, event):
-        print(f"[CustomerNotificationConsumer] Ignoring delivery_fee_rejected: {event}")
+        logger.debug("[CustomerNotificationConsumer] Ignoring delivery_fee_rejected: %s", event)
 
 
 
-class DeliveryFeeOwnerConsumer(AsyncWebsocketConsumer):
+class DeliveryFeeOwnerConsumer(ConsumerMetricsMixin, AsyncWebsocketConsumer):
     async def connect(self):
-        print(f"[Owner] Connecting {self.channel_name}")
+        logger.debug("[Owner] Connecting %s", self.channel_name)
         await self.channel_layer.group_add("owners", self.channel_name)
         await self.accept()
-        print(f"[Owner] Connected: {self.channel_name}")
+        logger.debug("[Owner] Connected: %s", self.channel_name)
 
     async def disconnect(self, close_code):
-        print(f"[Owner] Disconnecting {self.channel_name}")
+        logger.debug("[Owner] Disconnecting %s", self.channel_name)
         await self.channel_layer.group_discard("owners", self.channel_name)
-        print(f"[Owner] Disconnected: {self.channel_name}")
+        logger.debug("[Owner] Disconnected: %s", self.channel_name)
 
     async def receive(self, text_data):
-        print(f"[Owner] Received raw text: {text_data}")
+        logger.debug("[Owner] Received raw text: %s", text_data)
         data = json.loads(text_data)
-        print(f"[Owner] Parsed data: {data}")
+        logger.debug("[Owner] Parsed data: %s", data)
 
         if data.get("action") == "send_fee":
             customer_email = data["customer_email"]
             fee = data["delivery_fee"]
             customer_group = f"customer_{self.sanitize_email(customer_email)}"
-            print(f"[Owner] Forwarding fee '{fee}' to customer group '{customer_group}'")
-            await self.channel_layer.group_send(
+            logger.debug("[Owner] Forwarding fee '%s' to customer group '%s'", fee, customer_group)
+            await group_send(
                 customer_group,
                 {
                     "type": "delivery_fee_response",
@@ -141,8 +199,8 @@ class DeliveryFeeOwnerConsumer(AsyncWebsocketConsumer):
             customer_email = data["customer_email"]
             reason = data.get("reason", "Delivery request rejected")
             customer_group = f"customer_{self.sanitize_email(customer_email)}"
-            print(f"[Owner] Rejecting fee request for {customer_email} with reason: {reason}")
-            await self.channel_layer.group_send(
+            logger.debug("[Owner] Rejecting fee request for %s with reason: %s", customer_email, reason)
+            await group_send(
                 customer_group,
                 {
                     "type": "delivery_fee_rejected",
@@ -151,7 +209,7 @@ class DeliveryFeeOwnerConsumer(AsyncWebsocketConsumer):
             )
 
     async def delivery_fee_request(self, event):
-        print(f"[Owner] Sending fee request event: {event}")
+        logger.debug("[Owner] Sending fee request event: %s", event)
         await self.send(text_data=json.dumps({
             "type": "delivery_fee_request",
             "customer_email": event["customer_email"],
@@ -160,43 +218,47 @@ class DeliveryFeeOwnerConsumer(AsyncWebsocketConsumer):
 
     async def delivery_fee_rejected(self, event):
         # No-op handler to avoid ValueError if a stray message comes here
-        print(f"[Owner] Ignoring delivery_fee_rejected: {event}")
+        logger.debug("[Owner] Ignoring delivery_fee_rejected: %s", event)
 
     def sanitize_email(self, email):
         return email.replace('@', '_at_').replace('.', '_dot_')
 
 
-class DeliveryFeeCustomerConsumer(AsyncWebsocketConsumer):
+class DeliveryFeeCustomerConsumer(ConsumerMetricsMixin, AsyncWebsocketConsumer):
     async def connect(self):
-        print("[Customer] Connecting")
+        logger.debug("[Customer] Connecting")
+        self.group_name = None
         query_params = parse_qs(self.scope['query_string'].decode())
-        self.customer_email = query_params.get('email', [None])[0]
+        raw_email = query_params.get('email', [None])[0]
 
-        if not self.customer_email:
-            print("[Customer] No email found, closing connection")
+        # ✅ Same customer group as the order notifications: the session's own email only
+        user_type, session_email = await session_user(self.scope)
+        if user_type != 'customer' or not session_email or (raw_email and raw_email != session_email):
+            logger.debug("[Customer] No customer session for this email, closing connection")
             await self.close()
             return
+        self.customer_email = session_email
 
         self.group_name = f"customer_{self.sanitize_email(self.customer_email)}"
-        print(f"[Customer] Adding to group: {self.group_name}")
+        logger.debug("[Customer] Adding to group: %s", self.group_name)
         await self.channel_layer.group_add(self.group_name, self.channel_name)
         await self.accept()
-        print("[Customer] Connected")
+        logger.debug("[Customer] Connected")
 
     async def disconnect(self, close_code):
-        print(f"[Customer] Disconnecting {self.channel_name}")
-        if hasattr(self, 'group_name') and self.group_name:
+        logger.debug("[Customer] Disconnecting %s", self.channel_name)
+        if self.group_name:
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
-            print(f"[Customer] Removed from group: {self.group_name}")
+            logger.debug("[Customer] Removed from group: %s", self.group_name)
 
     async def receive(self, text_data):
-        print(f"[Customer] Received raw text: {text_data}")
+        logger.debug("[Customer] Received raw text: %s", text_data)
         data = json.loads(text_data)
-        print(f"[Customer] Parsed data: {data}")
+        logger.debug("[Customer] Parsed data: %s", data)
 
         if data.get("action") == "request_fee":
-            print("[Customer] Forwarding fee request to 'owners' group")
-            await self.channel_layer.group_send(
+            logger.debug("[Customer] Forwarding fee request to 'owners' group")
+            await group_send(
                 "owners",
                 {
                     "type": "delivery_fee_request",
@@ -206,14 +268,14 @@ class DeliveryFeeCustomerConsumer(AsyncWebsocketConsumer):
             )
 
     async def delivery_fee_response(self, event):
-        print(f"[Customer] Sending fee response event: {event}")
+        logger.debug("[Customer] Sending fee response event: %s", event)
         await self.send(text_data=json.dumps({
             "type": "delivery_fee_response",
             "delivery_fee": event["delivery_fee"],
         }))
 
     async def delivery_fee_rejected(self, event):
-        print(f"[Customer] Delivery fee rejected: {event}")
+        logger.debug("[Customer] Delivery fee rejected: %s", event)
         await self.send(text_data=json.dumps({
             "type": "delivery_fee_rejected",
             "reason": event["reason"],
@@ -0,0 +1,36 @@
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import DataVersion
+
+DATA_VERSION_KEY = "data_version:{name}"
+
+# Without Redis the cache is per process; a bump made by another process
+# (the web server, the email or report worker) is seen within this many seconds
+VERSION_TTL = 5
+
+
+def data_version(name):
+    """
+    Current version of a named data set, for building cache keys. Read from
+    the database and cached briefly, so every process agrees on it.
+    """
+    key = DATA_VERSION_KEY.format(name=name)
+    version = cache.get(key)
+    if version is None:
+        version = DataVersion.objects.filter(name=name).values_list("version", flat=True).first() or 0
+        cache.set(key, version, VERSION_TTL)
+    return version
+
+
+def bump_data_version(name):
+    """Move `name` to a new version; cache entries keyed on the old one stop being used."""
+    if not DataVersion.objects.filter(name=name).update(version=F("version") + 1):
+        try:
+            with transaction.atomic():
+                DataVersion.objects.create(name=name, version=1)
+        except IntegrityError:
+            # Created by a concurrent bump
+            DataVersion.objects.filter(name=name).update(version=F("version") + 1)
+    cache.delete(DATA_VERSION_KEY.format(name=name))
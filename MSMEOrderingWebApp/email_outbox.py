@@ -0,0 +1,127 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+DEFAULT_MAX_ATTEMPTS = 5
+MAX_BACKOFF = timedelta(hours=1)
+
+# An email still marked sending after this long belongs to a worker that died
+SENDING_TIMEOUT = timedelta(minutes=10)
+
+
+def enqueue_email(to, subject, html_body="", body="", from_email=None):
+    """Store an email in the outbox; the send_queued_emails worker delivers it."""
+    return OutboundEmail.objects.create(
+        to=to,
+        subject=subject,
+        body=body or "This is an HTML email. Please use an HTML-compatible client.",
+        html_body=html_body,
+        # Blank falls back to DEFAULT_FROM_EMAIL when sending
+        from_email=from_email or getattr(settings, "EMAIL_HOST_USER", "") or settings.DEFAULT_FROM_EMAIL or "",
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff: 1, 2, 4, 8 ... minutes, capped at MAX_BACKOFF."""
+    return min(timedelta(minutes=2 ** (attempts - 1)), MAX_BACKOFF)
+
+
+def _claim_due_emails(batch_size):
+    """
+    Mark a batch of due emails as sending in one short transaction, so no
+    row lock is held while talking to the mail server. Emails left sending
+    by a worker that died are due again after SENDING_TIMEOUT.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        due = OutboundEmail.objects.filter(
+            Q(status="pending", next_attempt_at__lte=now)
+            | Q(status="sending", locked_at__lt=now - SENDING_TIMEOUT)
+        ).order_by("next_attempt_at", "id")
+        if connection.features.has_select_for_update_skip_locked:
+            # Several workers can drain the outbox without sending twice
+            due = due.select_for_update(skip_locked=True)
+        emails = list(due[:batch_size])
+
+        OutboundEmail.objects.filter(pk__in=[outbound.pk for outbound in emails]).update(
+            status="sending", attempts=F("attempts") + 1, locked_at=now,
+        )
+    for outbound in emails:
+        outbound.status = "sending"
+        outbound.attempts += 1
+        outbound.locked_at = now
+    return emails
+
+
+def _record_attempt(outbound, error, max_attempts):
+    """Store the result of one claimed email in its own UPDATE."""
+    outbound.locked_at = None
+    if error is None:
+        outbound.status = "sent"
+        outbound.sent_at = timezone.now()
+        outbound.last_error = ""
+    else:
+        outbound.last_error = str(error)
+        if outbound.attempts >= max_attempts:
+            outbound.status = "failed"
+        else:
+            outbound.status = "pending"
+            outbound.next_attempt_at = timezone.now() + retry_delay(outbound.attempts)
+    outbound.save(update_fields=["status", "last_error", "next_attempt_at", "sent_at", "locked_at"])
+
+
+def send_due_emails(batch_size=50, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """
+    Send one batch of due emails over a single backend connection.
+
+    Emails are claimed first and sent outside any transaction; each result
+    is saved as soon as it is known, so a crash mid-batch can't roll back
+    emails that already went out. Failures are rescheduled with exponential
+    backoff and marked failed after `max_attempts`. Returns (sent, failed)
+    counts for the batch.
+    """
+    sent = failed = 0
+
+    emails = _claim_due_emails(batch_size)
+    if not emails:
+        return sent, failed
+
+    mail_connection = get_connection(fail_silently=False)
+    try:
+        mail_connection.open()
+    except Exception as e:
+        # Server unreachable: the whole batch waits for the next retry
+        for outbound in emails:
+            _record_attempt(outbound, e, max_attempts)
+        return sent, len(emails)
+
+    try:
+        for outbound in emails:
+            message = EmailMultiAlternatives(
+                subject=outbound.subject,
+                body=outbound.body,
+                from_email=outbound.from_email or None,
+                to=[outbound.to],
+                connection=mail_connection,
+            )
+            if outbound.html_body:
+                message.attach_alternative(outbound.html_body, "text/html")
+
+            try:
+                message.send()
+            except Exception as e:
+                _record_attempt(outbound, e, max_attempts)
+                failed += 1
+            else:
+                _record_attempt(outbound, None, max_attempts)
+                sent += 1
+    finally:
+        mail_connection.close()
+
+    return sent, failed
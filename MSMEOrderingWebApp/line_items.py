@@ -0,0 +1,6 @@
+from .models import Products
+
+
+def products_for(lines):
+    """{product_id: Products} for the given Cart/Checkout lines, in one query."""
+    return Products.objects.in_bulk({line.product_id for line in lines if line.product_id})
@@ -0,0 +1,21 @@
+import itertools
+import logging
+
+
+class SampleFilter(logging.Filter):
+    """
+    Lets through 1 in `rate` DEBUG / INFO records from each logging call site,
+    so per-request and per-message logs stay cheap; WARNING and above always
+    pass. Configured in settings.LOGGING (LOG_SAMPLE_RATE).
+    """
+
+    def __init__(self, rate=1):
+        super().__init__()
+        self.rate = max(int(rate), 1)
+        self.counters = {}
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.rate == 1:
+            return True
+        counter = self.counters.setdefault((record.pathname, record.lineno), itertools.count())
+        return next(counter) % self.rate == 0
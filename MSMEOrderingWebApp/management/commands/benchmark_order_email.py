@@ -0,0 +1,44 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from MSMEOrderingWebApp.models import Checkout
+from MSMEOrderingWebApp.order_emails import render_order_status_email
+from MSMEOrderingWebApp.utils import invalidate_site_config
+
+STATUSES = ["accepted", "Preparing", "Packed", "Out for Delivery", "Completed"]
+
+
+class Command(BaseCommand):
+    help = 'Measure per-email render time of the order status email (cold vs. cached fragments)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=500, help='Emails to render.')
+        parser.add_argument('--items', type=int, default=10, help='Line items per order.')
+
+    def handle(self, *args, **options):
+        items = [
+            Checkout(product_name=f"Product {i} - Default", quantity=2, price=Decimal("99.50"))
+            for i in range(options['items'])
+        ]
+
+        # Cold: fresh site config version, so every fragment and the branding lookup miss
+        invalidate_site_config()
+        start = time.perf_counter()
+        render_order_status_email("PU001", "accepted", items)
+        cold_ms = (time.perf_counter() - start) * 1000
+
+        # Warm-up the remaining statuses, then time the steady state
+        for status in STATUSES:
+            render_order_status_email("PU001", status, items)
+
+        start = time.perf_counter()
+        for n in range(options['count']):
+            render_order_status_email(f"PU{n:03d}", STATUSES[n % len(STATUSES)], items)
+        warm_ms = (time.perf_counter() - start) * 1000 / options['count']
+
+        self.stdout.write(f'First render (cold cache): {cold_ms:.2f} ms')
+        self.stdout.write(self.style.SUCCESS(
+            f'Cached render: {warm_ms:.3f} ms/email over {options["count"]} emails ({options["items"]} items each)'
+        ))
@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from MSMEOrderingWebApp.pg_channel_layer import PostgresChannelLayer
+
+GROUP = "channel-layer-check"
+
+
+class Command(BaseCommand):
+    help = 'Round-trip group_send / send between two PostgresChannelLayer instances (as two daphne processes would)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--receivers', type=int, default=50, help='Channels in the test group.')
+        parser.add_argument('--messages', type=int, default=20, help='group_send calls to time.')
+        parser.add_argument('--timeout', type=float, default=5, help='Seconds to wait for each delivery.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('The Postgres channel layer needs a PostgreSQL database (DATABASE_URL).')
+        asyncio.run(self.round_trip(options['receivers'], options['messages'], options['timeout']))
+
+    async def round_trip(self, receivers, messages, timeout):
+        sender, receiver = PostgresChannelLayer(), PostgresChannelLayer()
+        channels = [await receiver.new_channel() for _ in range(receivers)]
+        try:
+            for channel in channels:
+                await receiver.group_add(GROUP, channel)
+
+            # Direct send to one specific channel
+            await sender.send(channels[0], {"type": "check.direct"})
+            message = await asyncio.wait_for(receiver.receive(channels[0]), timeout)
+            self.stdout.write(f'send -> receive: {message["type"]}')
+
+            # Fan-out to channels that are all being received, like live consumers
+            async def collect(channel):
+                return [(await receiver.receive(channel))["n"] for _ in range(messages)]
+
+            collecting = [asyncio.ensure_future(collect(channel)) for channel in channels]
+            start = time.perf_counter()
+            for n in range(messages):
+                await sender.group_send(GROUP, {"type": "check.group", "n": n})
+            send_ms = (time.perf_counter() - start) * 1000
+            for channel, received in zip(channels, await asyncio.wait_for(asyncio.gather(*collecting), timeout)):
+                if received != list(range(messages)):
+                    raise CommandError(f'{channel} received {received}')
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            # Discarded channels get nothing more
+            await receiver.group_discard(GROUP, channels[0])
+            await sender.group_send(GROUP, {"type": "check.after_discard"})
+            await asyncio.wait_for(receiver.receive(channels[1]), timeout)
+            try:
+                await asyncio.wait_for(receiver.receive(channels[0]), 0.5)
+                raise CommandError('A discarded channel still received group messages')
+            except asyncio.TimeoutError:
+                pass
+        except asyncio.TimeoutError:
+            raise CommandError('Timed out waiting for a message')
+        finally:
+            for channel in channels:
+                await receiver.group_discard(GROUP, channel)
+            await sender.close()
+            await receiver.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{messages} group_send x {receivers} receivers: sent in {send_ms:.1f} ms '
+            f'({send_ms / messages:.2f} ms per group_send), all delivered in {elapsed_ms:.1f} ms'
+        ))
@@ -0,0 +1,87 @@
+import re
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from MSMEOrderingWebApp.models import Checkout, Order, OrderCodeSequence
+from MSMEOrderingWebApp.notification_counts import pending_orders, unseen_customer_orders, unseen_pending_orders
+from MSMEOrderingWebApp.notification_feed import owner_feed
+from MSMEOrderingWebApp.order_groups import ONGOING_STATUSES, order_page_queryset, orders_with_status
+from MSMEOrderingWebApp.utils import get_business_day
+
+
+def hot_queries():
+    """
+    The order queries run on every dashboard load, badge update or checkout,
+    built by the same helpers the views use so the plans match what runs.
+    """
+    group_id = uuid.UUID(int=0)
+    return [
+        ("dashboard pending count", orders_with_status("pending")),
+        ("dashboard preparing count", orders_with_status("preparing")),
+        ("dashboard rejected count", orders_with_status("rejected")),
+        ("dashboard completed table", order_page_queryset(orders_with_status("completed"), "-updated_at")),
+        ("dashboard accepted table", order_page_queryset(
+            Order.objects.filter(status__in=ONGOING_STATUSES), "created_at"
+        )),
+        ("owner badge: pending", pending_orders()),
+        ("owner badge: unseen pending", unseen_pending_orders()),
+        ("owner feed", owner_feed().order_by("-created_at", "-group_id")),
+        ("customer badge: unseen", unseen_customer_orders("customer@example.com")),
+        ("order lines by code + group", Checkout.objects.filter(order_code="PU001", group_id=group_id)),
+        ("order code sequence", OrderCodeSequence.objects.filter(
+            business_day=get_business_day(), order_type="pickup"
+        )),
+        ("in-house deliveries", Order.objects.filter(delivery_method="in_house").order_by("-created_at")),
+    ]
+
+
+def is_sequential_scan(plan):
+    """True if the plan reads a whole table instead of using an index."""
+    if connection.vendor == "postgresql":
+        return "Seq Scan" in plan
+    if connection.vendor == "sqlite":
+        # "SCAN <table>" without "USING ... INDEX" is a full table scan
+        return any(
+            re.search(r"\bSCAN\b", line) and "INDEX" not in line
+            for line in plan.splitlines()
+        )
+    if connection.vendor == "mysql":
+        return re.search(r"\btype\W+ALL\b", plan) is not None
+    return False
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN on the hot order queries and report any that still do a sequential scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans', action='store_true',
+            help='Print the full query plan for every query, not only the failing ones.',
+        )
+
+    def handle(self, *args, **options):
+        seq_scans = []
+
+        with transaction.atomic():
+            if connection.vendor == "postgresql":
+                # Small tables are always cheaper to seq-scan; ask whether an index *can* be used.
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+
+            for label, queryset in hot_queries():
+                plan = queryset.explain()
+                if is_sequential_scan(plan):
+                    seq_scans.append(label)
+                    self.stdout.write(self.style.WARNING(f'SEQ SCAN  {label}'))
+                    self.stdout.write(plan)
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'INDEXED   {label}'))
+                    if options['verbose_plans']:
+                        self.stdout.write(plan)
+
+        if seq_scans:
+            self.stdout.write(self.style.ERROR(f'{len(seq_scans)} hot queries still do a sequential scan.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('All hot queries use an index.'))
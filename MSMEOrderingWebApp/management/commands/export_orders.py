@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from MSMEOrderingWebApp.order_export import EXPORT_FORMATS, ExportError, export_filters, iter_export
+
+
+class Command(BaseCommand):
+    help = 'Stream Checkout lines to a CSV or NDJSON file (or stdout)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First day to include (YYYY-MM-DD).')
+        parser.add_argument('--end', help='Last day to include (YYYY-MM-DD).')
+        parser.add_argument('--status', action='append', default=[], help='Only lines in this status; repeat for several.')
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', help='File to write; defaults to stdout.')
+
+    def handle(self, *args, **options):
+        try:
+            lines = export_filters(options['start'], options['end'], options['status'])
+            chunks = iter_export(lines, options['format'])
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        out = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        rows = 0
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+                rows += 1
+        finally:
+            if options['output']:
+                out.close()
+
+        if options['output']:
+            if options['format'] == 'csv':
+                rows -= 1  # header
+            self.stdout.write(self.style.SUCCESS(f'Exported {rows} line(s) to {options["output"]}.'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from MSMEOrderingWebApp.sales_rollup import rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the DailySalesRollup table from the orders (backfill / repair)'
+
+    def handle(self, *args, **options):
+        days = rebuild_sales_rollups()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt sales rollups for {days} business day(s).'))
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from MSMEOrderingWebApp.report_jobs import run_pending_report_jobs
+
+
+class Command(BaseCommand):
+    help = 'Render queued PDF report jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep polling for jobs instead of exiting once the queue is empty.')
+        parser.add_argument('--interval', type=float, default=2, help='Seconds to wait between polls in --loop mode.')
+        parser.add_argument('--batch-size', type=int, default=10)
+
+    def handle(self, *args, **options):
+        while True:
+            processed = run_pending_report_jobs(options['batch_size'])
+            if processed:
+                self.stdout.write(self.style.SUCCESS(f'Rendered {processed} report job(s).'))
+                continue
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
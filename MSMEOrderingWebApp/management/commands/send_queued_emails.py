@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from MSMEOrderingWebApp.email_outbox import DEFAULT_MAX_ATTEMPTS, send_due_emails
+
+
+class Command(BaseCommand):
+    help = 'Send emails queued in the outbox (order status notifications)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep polling the outbox instead of exiting once it is empty.')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to wait between polls in --loop mode.')
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS)
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_due_emails(options['batch_size'], options['max_attempts'])
+            if sent or failed:
+                self.stdout.write(self.style.SUCCESS(f'Sent {sent} email(s), {failed} failed attempt(s).'))
+
+            # Drain the backlog before sleeping
+            if sent or failed:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
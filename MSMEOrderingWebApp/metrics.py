@@ -0,0 +1,169 @@
+import threading
+import time
+
+from channels.layers import get_channel_layer
+
+# In-process metrics in the Prometheus text format, served at /metrics
+# (views.metrics). Each worker process keeps its own numbers; scrape every
+# process. HTTP views are recorded by middleware.MetricsMiddleware.
+
+_lock = threading.Lock()
+REGISTRY = []
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        REGISTRY.append(self)
+
+    def key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        for key, value in sorted(self.values.items()):
+            yield self.name, tuple(zip(self.labelnames, key)), value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with _lock:
+            samples = list(self.samples())
+        lines.extend(f"{name}{_labels(labels)} {_number(value)}" for name, labels, value in samples)
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with _lock:
+            counts, total, count = self.values.get(key, ((0,) * len(self.buckets), 0, 0))
+            counts = tuple(n + 1 if value <= bound else n for n, bound in zip(counts, self.buckets))
+            self.values[key] = (counts, total + value, count + 1)
+
+    def samples(self):
+        for key, (counts, total, count) in sorted(self.values.items()):
+            labels = tuple(zip(self.labelnames, key))
+            for bound, n in zip(self.buckets, counts):
+                yield f"{self.name}_bucket", labels + (("le", _number(bound)),), n
+            yield f"{self.name}_bucket", labels + (("le", "+Inf"),), count
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+def render_metrics():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# HTTP views, labelled by URL name
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP responses by view, method and status.",
+                        ["view", "method", "status"])
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "Time spent producing the response.",
+                         ["view", "method"])
+HTTP_DB_QUERIES = Histogram("http_db_queries", "Database queries per request.",
+                            ["view"], buckets=QUERY_BUCKETS)
+HTTP_DB_TIME = Histogram("http_db_query_duration_seconds", "Time spent in database queries per request.",
+                         ["view"])
+HTTP_RESPONSE_SIZE = Histogram("http_response_size_bytes", "Response body size (streaming responses excluded).",
+                               ["view"], buckets=SIZE_BUCKETS)
+
+# WebSocket consumers and the channel layer
+WS_OPEN = Gauge("websocket_connections", "Open WebSocket connections.", ["consumer"])
+WS_CONNECTIONS = Counter("websocket_connections_total", "WebSocket connections opened.", ["consumer"])
+WS_RECEIVED = Counter("websocket_messages_received_total", "Frames received from clients.", ["consumer"])
+WS_SENT = Counter("websocket_messages_sent_total", "Frames sent to clients.", ["consumer"])
+GROUP_SEND_LATENCY = Histogram("channel_layer_group_send_seconds", "channel_layer.group_send time by event type.",
+                               ["type"])
+
+
+class QueryTimer:
+    """connection.execute_wrapper that counts and times the queries it wraps."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+class ConsumerMetricsMixin:
+    """Connection and message counts for a WebSocket consumer; list it before the consumer base class."""
+
+    async def websocket_connect(self, message):
+        WS_CONNECTIONS.inc(consumer=type(self).__name__)
+        WS_OPEN.inc(consumer=type(self).__name__)
+        await super().websocket_connect(message)
+
+    async def websocket_disconnect(self, message):
+        WS_OPEN.dec(consumer=type(self).__name__)
+        await super().websocket_disconnect(message)
+
+    async def websocket_receive(self, message):
+        WS_RECEIVED.inc(consumer=type(self).__name__)
+        await super().websocket_receive(message)
+
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        if text_data is not None or bytes_data is not None:
+            WS_SENT.inc(consumer=type(self).__name__)
+        await super().send(text_data=text_data, bytes_data=bytes_data, close=close)
+
+
+async def group_send(group, message):
+    """get_channel_layer().group_send, timed per event type."""
+    start = time.perf_counter()
+    try:
+        await get_channel_layer().group_send(group, message)
+    finally:
+        GROUP_SEND_LATENCY.observe(time.perf_counter() - start, type=message.get("type", ""))
@@ -1,6 +1,38 @@
+import time
+
+from django.db import connection
 from django.urls import reverse
 from django.shortcuts import redirect
-from MSMEOrderingWebApp.models import BusinessDetails, BusinessOwnerAccount
+from MSMEOrderingWebApp.metrics import (
+    HTTP_DB_QUERIES, HTTP_DB_TIME, HTTP_LATENCY, HTTP_REQUESTS, HTTP_RESPONSE_SIZE, QueryTimer,
+)
+from MSMEOrderingWebApp.utils import owner_requires_setup
+
+
+class MetricsMiddleware:
+    """Latency, DB queries / time and response size per URL name; first in MIDDLEWARE."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryTimer()
+        start = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        # ✅ Label by URL name, not path, so order codes / ids don't multiply series
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else "unmatched"
+        HTTP_REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+        HTTP_LATENCY.observe(elapsed, view=view, method=request.method)
+        HTTP_DB_QUERIES.observe(queries.count, view=view)
+        HTTP_DB_TIME.observe(queries.seconds, view=view)
+        if not response.streaming:
+            HTTP_RESPONSE_SIZE.observe(len(response.content), view=view)
+        return response
+
 
 class BusinessOwnerSetupMiddleware:
     def __init__(self, get_response):
@@ -22,17 +54,11 @@ class BusinessOwnerSetupMiddleware:
             return self.get_response(request)
 
         owner_id = request.session.get('owner_id')
-        if owner_id:
-            try:
-                owner = BusinessOwnerAccount.objects.get(id=owner_id)
-
-                # ✅ If first_login2 is still True → restrict access
-                if owner.first_login2:
-                    # Allow access only to settings module
-                    if not request.path.startswith(reverse('settings')):
-                        return redirect('settings')
-
-            except BusinessOwnerAccount.DoesNotExist:
-                pass
+
+        # ✅ If first_login2 is still True → restrict access (cached per owner)
+        if owner_id and owner_requires_setup(owner_id):
+            # Allow access only to settings module
+            if not request.path.startswith(reverse('settings')):
+                return redirect('settings')
 
         return self.get_response(request)
\ No newline at end of file
@@ -0,0 +1,37 @@
+from django.db import migrations
+from django.db.models.functions import TruncDate
+
+
+def unify_walkin_group_ids(apps, schema_editor):
+    """
+    POS orders used to get a separate group_id per line item. Give every line
+    of the same walk-in order (same order_code on the same day) one group_id
+    so orders can be grouped by (order_code, group_id) in SQL.
+    """
+    Checkout = apps.get_model('MSMEOrderingWebApp', 'Checkout')
+
+    walkins = (
+        Checkout.objects.filter(order_type='walkin')
+        .annotate(order_date=TruncDate('created_at'))
+        .order_by('id')
+        .values_list('id', 'order_code', 'order_date', 'group_id')
+    )
+
+    canonical = {}
+    for pk, order_code, order_date, group_id in walkins.iterator():
+        key = (order_code, order_date)
+        if key not in canonical:
+            canonical[key] = group_id
+        elif canonical[key] != group_id:
+            Checkout.objects.filter(pk=pk).update(group_id=canonical[key])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MSMEOrderingWebApp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(unify_walkin_group_ids, migrations.RunPython.noop),
+    ]
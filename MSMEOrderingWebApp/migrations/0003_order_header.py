@@ -0,0 +1,57 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:30
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MSMEOrderingWebApp', '0002_unify_walkin_group_ids'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('group_id', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('order_code', models.CharField(max_length=10, null=True)),
+                ('first_name', models.CharField(max_length=100)),
+                ('last_name', models.CharField(max_length=100)),
+                ('contact_number', models.CharField(max_length=15)),
+                ('address', models.TextField()),
+                ('email', models.EmailField(max_length=254)),
+                ('sub_total', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('order_type', models.CharField(max_length=255)),
+                ('specific_order_type', models.CharField(blank=True, max_length=255, null=True)),
+                ('payment_method', models.CharField(max_length=50)),
+                ('proof_of_payment', models.ImageField(blank=True, null=True, upload_to='proofs/')),
+                ('additional_notes', models.TextField(blank=True)),
+                ('scheduled_at', models.DateTimeField(blank=True, null=True)),
+                ('cash_given', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('change', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False, null=True)),
+                ('updated_at', models.DateTimeField(blank=True, default=django.utils.timezone.now, null=True)),
+                ('is_seen_by_owner', models.BooleanField(default=False)),
+                ('is_seen_by_customer', models.BooleanField(default=False)),
+                ('status', models.CharField(default='pending', max_length=50)),
+                ('delivery_method', models.CharField(blank=True, max_length=50, null=True)),
+                ('tracking_url', models.URLField(blank=True, null=True)),
+                ('eta_value', models.PositiveIntegerField(blank=True, null=True)),
+                ('eta_unit', models.CharField(blank=True, max_length=10, null=True)),
+                ('rider', models.CharField(blank=True, max_length=150, null=True)),
+                ('delivery_fee', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('proof_of_delivery', models.ImageField(blank=True, null=True, upload_to='delivery_proofs/')),
+                ('rejection_reason', models.CharField(blank=True, max_length=255, null=True)),
+                ('void_reason', models.CharField(blank=True, max_length=50, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='checkout',
+            name='order',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='items', to='MSMEOrderingWebApp.order'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+HEADER_FIELDS = [
+    'order_code', 'first_name', 'last_name', 'contact_number', 'address', 'email',
+    'sub_total', 'order_type', 'specific_order_type', 'payment_method', 'proof_of_payment',
+    'additional_notes', 'scheduled_at', 'cash_given', 'change', 'created_at', 'updated_at',
+    'is_seen_by_owner', 'is_seen_by_customer', 'status', 'delivery_method', 'tracking_url',
+    'eta_value', 'eta_unit', 'rider', 'delivery_fee', 'proof_of_delivery', 'rejection_reason',
+    'void_reason',
+]
+
+
+def backfill_orders(apps, schema_editor):
+    """Create one Order per existing group_id from its first line item."""
+    Checkout = apps.get_model('MSMEOrderingWebApp', 'Checkout')
+    Order = apps.get_model('MSMEOrderingWebApp', 'Order')
+
+    first_lines = (
+        Checkout.objects.filter(order__isnull=True)
+        .order_by('group_id', 'id')
+        .values('group_id', *HEADER_FIELDS)
+    )
+
+    seen = set()
+    for line in first_lines.iterator():
+        group_id = line.pop('group_id')
+        if group_id in seen:
+            continue
+        seen.add(group_id)
+
+        order = Order.objects.create(group_id=group_id, **line)
+        Checkout.objects.filter(group_id=group_id).update(order=order)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MSMEOrderingWebApp', '0003_order_header'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_orders, migrations.RunPython.noop),
+    ]
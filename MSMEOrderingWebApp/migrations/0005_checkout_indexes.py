@@ -0,0 +1,53 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MSMEOrderingWebApp', '0004_backfill_orders'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='checkout',
+            index=models.Index(fields=['status', 'updated_at'], name='checkout_status_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='checkout',
+            index=models.Index(fields=['status', 'is_seen_by_owner'], name='checkout_owner_notif_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='checkout',
+            index=models.Index(fields=['email', 'status', 'is_seen_by_customer'], name='checkout_customer_notif_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='checkout',
+            index=models.Index(fields=['order_code', 'group_id'], name='checkout_code_group_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='checkout',
+            index=models.Index(fields=['order_type', 'created_at'], name='checkout_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='checkout',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['created_at'], name='checkout_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='checkout',
+            index=models.Index(condition=models.Q(('delivery_method', 'in_house')), fields=['created_at'], name='checkout_inhouse_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'updated_at'], name='order_status_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['email', 'status', 'is_seen_by_customer'], name='order_customer_notif_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['created_at'], name='order_pending_idx'),
+        ),
+    ]
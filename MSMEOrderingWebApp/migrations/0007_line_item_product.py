@@ -0,0 +1,34 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MSMEOrderingWebApp', '0006_outbound_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='product',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='MSMEOrderingWebApp.products'),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='checkout',
+            name='product',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='MSMEOrderingWebApp.products'),
+        ),
+        migrations.AddField(
+            model_name='checkout',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+    ]
@@ -0,0 +1,62 @@
+import re
+
+from django.db import migrations
+
+PRODUCT_NAME_RE = re.compile(r"^(.*?)\s+-\s+(.*?)(?:\s*\(₱.*\))?$")
+
+
+def split_product_name(display_name):
+    display_name = (display_name or "").strip()
+    match = PRODUCT_NAME_RE.match(display_name)
+    if match:
+        return match.group(1).strip(), match.group(2).strip()
+    return display_name, "Default"
+
+
+def backfill_products(apps, schema_editor):
+    """
+    Link existing cart and checkout lines to their product by parsing the
+    display name once. Carts also get the current price as their snapshot;
+    past checkout lines keep unit_price empty since the price they were
+    sold at is not known.
+    """
+    Products = apps.get_model('MSMEOrderingWebApp', 'Products')
+    Cart = apps.get_model('MSMEOrderingWebApp', 'Cart')
+    Checkout = apps.get_model('MSMEOrderingWebApp', 'Checkout')
+
+    by_name = {}
+    for product in Products.objects.order_by('-id'):
+        # Oldest row wins when name/variation is duplicated
+        by_name[(product.name.lower(), product.variation_name.lower())] = product
+
+    def lookup(display_name):
+        name, variation_name = split_product_name(display_name)
+        return by_name.get((name.lower(), variation_name.lower()))
+
+    carts = []
+    for cart in Cart.objects.filter(product__isnull=True).only('id', 'product_name'):
+        product = lookup(cart.product_name)
+        if product:
+            cart.product = product
+            cart.unit_price = product.price
+            carts.append(cart)
+    Cart.objects.bulk_update(carts, ['product', 'unit_price'], batch_size=500)
+
+    lines = []
+    for line in Checkout.objects.filter(product__isnull=True).only('id', 'product_name').iterator():
+        product = lookup(line.product_name)
+        if product:
+            line.product = product
+            lines.append(line)
+    Checkout.objects.bulk_update(lines, ['product'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MSMEOrderingWebApp', '0007_line_item_product'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_products, migrations.RunPython.noop),
+    ]
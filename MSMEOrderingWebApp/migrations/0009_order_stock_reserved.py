@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MSMEOrderingWebApp', '0008_backfill_line_item_products'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='stock_reserved',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MSMEOrderingWebApp', '0009_order_stock_reserved'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderCodeSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('business_day', models.DateField()),
+                ('order_type', models.CharField(max_length=20)),
+                ('last_number', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('business_day', 'order_type'), name='order_code_sequence_day_type')],
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+from django.db import migrations
+from django.utils import timezone
+
+PREFIXES = {'delivery': 'DL', 'pickup': 'PU', 'walkin': 'WI'}
+
+
+def seed_sequences(apps, schema_editor):
+    """Continue today's numbering from the codes already handed out."""
+    BusinessDetails = apps.get_model('MSMEOrderingWebApp', 'BusinessDetails')
+    Order = apps.get_model('MSMEOrderingWebApp', 'Order')
+    OrderCodeSequence = apps.get_model('MSMEOrderingWebApp', 'OrderCodeSequence')
+
+    now = timezone.localtime()
+    business = BusinessDetails.objects.first()
+    day_start = datetime.combine(now.date(), business.opening_time if business and business.opening_time else datetime.min.time(), tzinfo=now.tzinfo)
+    if now < day_start:
+        day_start -= timedelta(days=1)
+
+    for order_type, prefix in PREFIXES.items():
+        last_number = 0
+        codes = Order.objects.filter(
+            order_type=order_type, created_at__gte=day_start, order_code__startswith=prefix
+        ).values_list('order_code', flat=True)
+        for code in codes:
+            try:
+                last_number = max(last_number, int(code[len(prefix):]))
+            except ValueError:
+                pass
+
+        if last_number:
+            OrderCodeSequence.objects.update_or_create(
+                business_day=day_start.date(), order_type=order_type,
+                defaults={'last_number': last_number},
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MSMEOrderingWebApp', '0010_order_code_sequence'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
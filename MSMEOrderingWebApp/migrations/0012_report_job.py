@@ -0,0 +1,33 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MSMEOrderingWebApp', '0011_seed_order_code_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report_type', models.CharField(max_length=20)),
+                ('params', models.JSONField(default=dict)),
+                ('params_hash', models.CharField(max_length=64)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('progress', models.PositiveSmallIntegerField(default=0)),
+                ('file', models.FileField(blank=True, null=True, upload_to='reports/')),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='reportjob_status_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'running'])), fields=('params_hash',), name='reportjob_in_progress_unique')],
+            },
+        ),
+    ]
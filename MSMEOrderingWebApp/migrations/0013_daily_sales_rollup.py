@@ -0,0 +1,40 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MSMEOrderingWebApp', '0012_report_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('business_day', models.DateField(unique=True)),
+                ('completed_orders', models.PositiveIntegerField(default=0)),
+                ('rejected_orders', models.PositiveIntegerField(default=0)),
+                ('void_orders', models.PositiveIntegerField(default=0)),
+                ('items_sold', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('delivery_fees', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('by_payment_method', models.JSONField(default=dict)),
+                ('by_order_type', models.JSONField(default=dict)),
+                ('by_specific_order_type', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='rollup_day',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='rollup_status',
+            field=models.CharField(blank=True, max_length=10),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MSMEOrderingWebApp', '0013_daily_sales_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('business_day', models.DateField()),
+                ('product_name', models.CharField(max_length=255)),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('product', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='MSMEOrderingWebApp.products')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('business_day', 'product'), name='product_daily_sales_day_product')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MSMEOrderingWebApp', '0014_product_daily_sales'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['email', '-created_at', '-group_id'], name='order_customer_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MSMEOrderingWebApp', '0015_order_customer_feed_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChannelGroupMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('group', models.CharField(max_length=100)),
+                ('channel', models.CharField(max_length=100)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('group', 'channel'), name='channel_group_membership')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ChannelMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('inbox', models.CharField(max_length=100)),
+                ('channel', models.CharField(max_length=100)),
+                ('message', models.TextField()),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['channel', 'id'], name='channel_message_channel_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MSMEOrderingWebApp', '0016_channel_layer_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='reportjob',
+            name='cache_key',
+            field=models.CharField(blank=True, db_index=True, max_length=100),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:56
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MSMEOrderingWebApp', '0017_data_versions_report_cache_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(django.db.models.functions.text.Lower('status'), models.F('updated_at'), name='order_status_key_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 12:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MSMEOrderingWebApp', '0018_order_status_key_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboundemail',
+            name='locked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='outboundemail',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.2 on 2026-10-18 12:09
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MSMEOrderingWebApp', '0019_outbound_email_claim'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='products',
+            name='sold_count',
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.1.2 on 2026-10-18 12:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MSMEOrderingWebApp', '0020_remove_products_sold_count'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='checkout',
+            name='checkout_owner_notif_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='checkout',
+            name='checkout_customer_notif_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='checkout',
+            name='checkout_inhouse_idx',
+        ),
+        migrations.RemoveField(
+            model_name='checkout',
+            name='delivery_method',
+        ),
+        migrations.RemoveField(
+            model_name='checkout',
+            name='eta_unit',
+        ),
+        migrations.RemoveField(
+            model_name='checkout',
+            name='eta_value',
+        ),
+        migrations.RemoveField(
+            model_name='checkout',
+            name='is_seen_by_customer',
+        ),
+        migrations.RemoveField(
+            model_name='checkout',
+            name='is_seen_by_owner',
+        ),
+        migrations.RemoveField(
+            model_name='checkout',
+            name='proof_of_delivery',
+        ),
+        migrations.RemoveField(
+            model_name='checkout',
+            name='rejection_reason',
+        ),
+        migrations.RemoveField(
+            model_name='checkout',
+            name='rider',
+        ),
+        migrations.RemoveField(
+            model_name='checkout',
+            name='tracking_url',
+        ),
+        migrations.RemoveField(
+            model_name='checkout',
+            name='void_reason',
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('delivery_method', 'in_house')), fields=['created_at'], name='order_inhouse_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.db.models.signals import post_migrate
 from django.dispatch import receiver
 from django.utils import timezone
@@ -6,6 +7,45 @@ from django.forms import ValidationError
 from django.utils.timezone import now
 import uuid
 
+class TrackedFieldsMixin:
+    """
+    Remembers the values of `tracked_fields` as loaded from the database so
+    save() and views can tell what changed without re-reading the row.
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_tracked_values()
+        return instance
+
+    def _remember_tracked_values(self):
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            name: getattr(self, name) for name in self.tracked_fields if name not in deferred
+        }
+
+    def has_changed(self, name):
+        """True for new rows, unloaded fields, or a value different from the loaded one."""
+        loaded = getattr(self, '_loaded_values', {})
+        if self.pk is None or name not in loaded:
+            return True
+        return loaded[name] != getattr(self, name)
+
+    def changed_fields(self):
+        """{field: (old, new)} for tracked fields changed since load."""
+        loaded = getattr(self, '_loaded_values', {})
+        return {
+            name: (old, getattr(self, name))
+            for name, old in loaded.items()
+            if old != getattr(self, name)
+        }
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._remember_tracked_values()
+
 class User(models.Model):
     first_name = models.CharField(max_length=50)
     last_name = models.CharField(max_length=50)
@@ -60,7 +100,9 @@ class ProductCategory(models.Model):
             self.name = self.name.title()
         super().save(*args, **kwargs)
     
-class Products(models.Model):
+class Products(TrackedFieldsMixin, models.Model):
+    tracked_fields = ('price', 'stocks')
+
     category = models.ForeignKey(ProductCategory, on_delete=models.CASCADE)
     image = models.ImageField(upload_to='product_images/', null=True, blank=True)
     name = models.CharField(max_length=255)
@@ -71,7 +113,7 @@ class Products(models.Model):
     available = models.BooleanField(default=True)
     created_at = models.DateTimeField(default=timezone.now)  
     last_updated = models.DateTimeField(auto_now=True)
-    sold_count = models.PositiveIntegerField(default=0)
+    # Units sold are counted per day in ProductDailySales (see sales_rollup.py)
 
     def __str__(self):
         return f"{self.name} - {self.variation_name}"
@@ -90,7 +132,7 @@ class ArchivedProducts(models.Model):
     variation_name = models.CharField(max_length=100, default='Default')
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stocks = models.PositiveIntegerField(default=0)
-    sold_count = models.PositiveIntegerField(default=0)
+    sold_count = models.PositiveIntegerField(default=0)  # units sold when archived
     archived_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -179,9 +221,11 @@ class Cart(models.Model):
     address = models.TextField()
     email = models.EmailField()
     image = models.ImageField(null=True, blank=True)
+    product = models.ForeignKey(Products, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
     product_name = models.CharField(max_length=255)
     quantity = models.PositiveIntegerField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)  # product price when added
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} - {self.product_name}"
@@ -207,7 +251,97 @@ class PlacedOrder(models.Model):
     def __str__(self):
         return f"{self.first_name} {self.last_name} - {self.product_name} ({self.order_type})"
     
-class Checkout(models.Model):
+class Order(models.Model):
+    """One row per placed order; Checkout rows are its line items."""
+    group_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    order_code = models.CharField(max_length=10, null=True)
+
+    # Customer info
+    first_name = models.CharField(max_length=100)
+    last_name = models.CharField(max_length=100)
+    contact_number = models.CharField(max_length=15)
+    address = models.TextField()
+    email = models.EmailField()
+
+    # Order details
+    sub_total = models.DecimalField(max_digits=10, decimal_places=2)
+    order_type = models.CharField(max_length=255)
+    specific_order_type = models.CharField(max_length=255, null=True, blank=True)
+    payment_method = models.CharField(max_length=50)
+    proof_of_payment = models.ImageField(upload_to='proofs/', null=True, blank=True)
+    additional_notes = models.TextField(blank=True)
+    scheduled_at = models.DateTimeField(null=True, blank=True)
+    cash_given = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    change = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    created_at = models.DateTimeField(default=now, editable=False, null=True)
+    updated_at = models.DateTimeField(default=now, null=True, blank=True)
+    is_seen_by_owner = models.BooleanField(default=False)
+    is_seen_by_customer = models.BooleanField(default=False)
+
+    # Status + fulfilment
+    status = models.CharField(max_length=50, default='pending')
+    delivery_method = models.CharField(max_length=50, null=True, blank=True)
+    tracking_url = models.URLField(null=True, blank=True)
+    eta_value = models.PositiveIntegerField(null=True, blank=True)
+    eta_unit = models.CharField(max_length=10, null=True, blank=True)
+    rider = models.CharField(max_length=150, null=True, blank=True)
+    delivery_fee = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    proof_of_delivery = models.ImageField(upload_to='delivery_proofs/', null=True, blank=True)
+    rejection_reason = models.CharField(max_length=255, null=True, blank=True)
+    void_reason = models.CharField(max_length=50, null=True, blank=True)
+    stock_reserved = models.BooleanField(default=False)  # stock held at checkout, not yet consumed by acceptance
+
+    # Where this order is counted in DailySalesRollup (see sales_rollup.py)
+    rollup_day = models.DateField(null=True, blank=True)
+    rollup_status = models.CharField(max_length=10, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'updated_at'], name='order_status_updated_idx'),
+            # Dashboard counters/tables match status case-insensitively (see order_groups.orders_with_status)
+            models.Index(Lower('status'), 'updated_at', name='order_status_key_idx'),
+            models.Index(fields=['email', 'status', 'is_seen_by_customer'], name='order_customer_notif_idx'),
+            # Customer notification feed: keyset pages on (created_at, group_id)
+            models.Index(fields=['email', '-created_at', '-group_id'], name='order_customer_feed_idx'),
+            models.Index(
+                fields=['created_at'], name='order_pending_idx',
+                condition=models.Q(status='pending'),
+            ),
+            # Delivery / rider pages: in-house deliveries stay small
+            models.Index(
+                fields=['created_at'], name='order_inhouse_idx',
+                condition=models.Q(delivery_method='in_house'),
+            ),
+        ]
+
+    def __str__(self):
+        return f"Order {self.order_code} by {self.first_name} {self.last_name} ({self.status})"
+
+class OrderCodeSequence(models.Model):
+    """Last order number handed out per business day and order type (see order_codes.py)."""
+    business_day = models.DateField()
+    order_type = models.CharField(max_length=20)
+    last_number = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['business_day', 'order_type'], name='order_code_sequence_day_type'),
+        ]
+
+    def __str__(self):
+        return f"{self.order_type} {self.business_day}: {self.last_number}"
+
+class Checkout(TrackedFieldsMixin, models.Model):
+    """
+    One line item of an Order. The customer/payment columns repeated here are
+    a snapshot taken at checkout and never change; Order is the only source
+    for everything a status change sets (seen flags, delivery and rejection
+    details). Only `status` is copied onto the lines, by transition_order.
+    """
+    tracked_fields = ('status',)
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items', null=True, blank=True)
+
     # Customer info
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
@@ -217,9 +351,11 @@ class Checkout(models.Model):
 
     # Product info
     image = models.ImageField(null=True, blank=True)  # product image
+    product = models.ForeignKey(Products, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
     product_name = models.CharField(max_length=255)
     quantity = models.PositiveIntegerField()
     price = models.DecimalField(max_digits=10, decimal_places=2)  # total for this item
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)  # product price when ordered
 
     # Checkout-specific fields
     sub_total = models.DecimalField(max_digits=10, decimal_places=2)
@@ -230,29 +366,10 @@ class Checkout(models.Model):
     additional_notes = models.TextField(blank=True)
     order_code = models.CharField(max_length=10, null=True)
     created_at = models.DateTimeField(default=now, editable=False, null=True)
-    is_seen_by_owner = models.BooleanField(default=False)
-    is_seen_by_customer = models.BooleanField(default=False)
     
-      # Status field
+      # Status field (kept in step with Order.status by order_transitions)
     status = models.CharField(max_length=50, default='pending')
-    delivery_method = models.CharField(max_length=50, null=True, blank=True)  # e.g., in_house or third_party
-    tracking_url = models.URLField(null=True, blank=True)
-    eta_value = models.PositiveIntegerField(null=True, blank=True)  # numeric ETA value
-    eta_unit = models.CharField(
-        max_length=10,
-        choices=[
-            ('minutes', 'Minutes'),
-            ('hours', 'Hours'),
-            ('days', 'Days'),
-            ('weeks', 'Weeks'),
-        ],
-        null=True,
-        blank=True
-    )
-    rider = models.CharField(max_length=150, null=True, blank=True)
     delivery_fee = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
-    proof_of_delivery = models.ImageField(upload_to='delivery_proofs/', null=True, blank=True)
-    rejection_reason = models.CharField(max_length=255, null=True, blank=True)
     scheduled_at = models.DateTimeField(null=True, blank=True)  # <--- NEW
 
     cash_given = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
@@ -261,28 +378,26 @@ class Checkout(models.Model):
     group_id = models.UUIDField(default=uuid.uuid4, editable=False, db_index=True)
     updated_at = models.DateTimeField(null=True, blank=True)
 
-    void_reason = models.CharField(
-        max_length=50,
-        choices=[
-            ('unclaimed', 'Unclaimed'),
-            ('canceled', 'Canceled'),
-            ('returned', 'Returned'),
-            ('other', 'Other'),
-        ],
-        null=True,
-        blank=True
-    )
     
+    class Meta:
+        indexes = [
+            # Dashboard / badge counters and the updated_at ranges for "completed today"
+            models.Index(fields=['status', 'updated_at'], name='checkout_status_updated_idx'),
+            models.Index(fields=['order_code', 'group_id'], name='checkout_code_group_idx'),
+            # Orders of a type over a date range (reports, order history)
+            models.Index(fields=['order_type', 'created_at'], name='checkout_type_created_idx'),
+            # Partial index: the pending queue stays small
+            models.Index(
+                fields=['created_at'], name='checkout_pending_idx',
+                condition=models.Q(status='pending'),
+            ),
+        ]
+
     def save(self, *args, **kwargs):
-        # If the object already exists, check if status changed
-        if self.pk:
-            old = Checkout.objects.filter(pk=self.pk).first()
-            if old and old.status != self.status:
-                self.updated_at = timezone.now()
-        else:
-            # For new objects, make sure updated_at is set initially
+        # New rows, or a status change since the row was loaded
+        if self.has_changed('status'):
             self.updated_at = timezone.now()
-            
+
         super().save(*args, **kwargs)
         
     def __str__(self):
@@ -334,7 +449,156 @@ class OTP(models.Model):
             raise ValidationError("OTP must only contain numbers.")
         if len(self.otp) != 6:  # Ensuring OTP is 6 digits
             raise ValidationError("OTP must be exactly 6 digits.")
-        
+
+
+class OutboundEmail(models.Model):
+    """Email waiting to be sent by the send_queued_emails worker."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    to = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField(blank=True)  # plain-text fallback
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255, blank=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)  # claimed by a worker (status "sending")
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to} ({self.status})"
+
+
+class ReportJob(models.Model):
+    """A PDF report rendered by the run_report_jobs worker."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    IN_PROGRESS = ['pending', 'running']
+
+    report_type = models.CharField(max_length=20)
+    params = models.JSONField(default=dict)  # report_type, date_filter and its date inputs
+    params_hash = models.CharField(max_length=64)
+    # report_cache key of the finished file; identical later requests reuse it
+    cache_key = models.CharField(max_length=100, blank=True, db_index=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    progress = models.PositiveSmallIntegerField(default=0)  # percent
+    file = models.FileField(upload_to='reports/', null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='reportjob_status_idx'),
+        ]
+        constraints = [
+            # At most one queued/running job per set of parameters
+            models.UniqueConstraint(
+                fields=['params_hash'], name='reportjob_in_progress_unique',
+                condition=models.Q(status__in=['pending', 'running']),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.report_type} report #{self.pk} ({self.status})"
+
+
+class DailySalesRollup(models.Model):
+    """
+    Sales per business day, kept up to date as orders are completed, rejected
+    or voided (see sales_rollup.py). Breakdowns map a payment method / order
+    type to {"orders": n, "revenue": "0.00"}.
+    """
+    business_day = models.DateField(unique=True)
+
+    completed_orders = models.PositiveIntegerField(default=0)
+    rejected_orders = models.PositiveIntegerField(default=0)
+    void_orders = models.PositiveIntegerField(default=0)
+    items_sold = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    delivery_fees = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    by_payment_method = models.JSONField(default=dict)
+    by_order_type = models.JSONField(default=dict)
+    by_specific_order_type = models.JSONField(default=dict)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Sales {self.business_day}: {self.revenue} from {self.completed_orders} orders"
+
+
+class ProductDailySales(models.Model):
+    """Units and revenue per product variation per business day, from completed orders."""
+    business_day = models.DateField()
+    product = models.ForeignKey(Products, on_delete=models.SET_NULL, null=True, related_name='+')
+    product_name = models.CharField(max_length=255)  # base product name; best sellers group variations by it
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['business_day', 'product'], name='product_daily_sales_day_product'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_name} {self.business_day}: {self.quantity}"
+
+
+class ChannelGroupMembership(models.Model):
+    """Channel -> group membership for the PostgreSQL channel layer (see pg_channel_layer.py)."""
+    group = models.CharField(max_length=100)
+    channel = models.CharField(max_length=100)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['group', 'channel'], name='channel_group_membership'),
+        ]
+
+    def __str__(self):
+        return f"{self.channel} in {self.group}"
+
+
+class ChannelMessage(models.Model):
+    """
+    A channel layer message waiting to be received. `inbox` is what the
+    receiving process LISTENs for: the process prefix of a specific channel
+    ("specific.<prefix>!") or the channel name itself.
+    """
+    inbox = models.CharField(max_length=100)
+    channel = models.CharField(max_length=100)
+    message = models.TextField()  # JSON
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['channel', 'id'], name='channel_message_channel_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.channel} ({self.inbox})"
+
 
 #sample customize
 
@@ -423,4 +687,16 @@ class Customization(models.Model):
 
 
     def __str__(self):
-        return f"Customization Settings - {self.id}"
\ No newline at end of file
+        return f"Customization Settings - {self.id}"
+
+
+class DataVersion(models.Model):
+    """
+    A version counter that cache keys are built from (see data_versions.py).
+    Kept in the database so every process sees a bump, with or without Redis.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
@@ -0,0 +1,192 @@
+import threading
+import weakref
+from collections import defaultdict
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import transaction
+
+from .data_versions import bump_data_version
+from .metrics import group_send
+from .models import Order
+from .notification_feed import order_deltas
+
+OWNER_COUNTS_KEY = "notifications:owner_counts"
+CUSTOMER_COUNT_KEY = "notifications:customer_count:{email}"
+
+# Counters are refreshed by the process that changes an order; without Redis
+# the others recount after this many seconds at most
+COUNTS_TIMEOUT = 15
+
+# Statuses that show up in the customer's notification badge
+CUSTOMER_STATUSES = ["accepted", "rejected", "Preparing", "Packed", "Ready for Pickup", "Out for Delivery", "Completed"]
+
+# Weak reference to the current thread's _Batch, waiting for on_commit
+_pending = threading.local()
+
+
+def customer_group_name(email):
+    sanitized_email = email.replace("@", "_at_").replace(".", "_dot_")
+    return f"customer_{sanitized_email}"
+
+
+def pending_orders():
+    return Order.objects.filter(status="pending")
+
+
+def unseen_pending_orders():
+    return pending_orders().filter(is_seen_by_owner=False)
+
+
+def unseen_customer_orders(email):
+    return Order.objects.filter(email=email, status__in=CUSTOMER_STATUSES, is_seen_by_customer=False)
+
+
+def refresh_owner_counts():
+    """Recount pending / unseen-pending orders (one Order row per order) and cache them."""
+    counts = {
+        "pending_count": pending_orders().count(),
+        "unseen_count": unseen_pending_orders().count(),
+    }
+    cache.set(OWNER_COUNTS_KEY, counts, COUNTS_TIMEOUT)
+    return counts
+
+
+def get_owner_counts():
+    counts = cache.get(OWNER_COUNTS_KEY)
+    if counts is None:
+        counts = refresh_owner_counts()
+    return counts
+
+
+def refresh_customer_count(email):
+    count = unseen_customer_orders(email).count()
+    cache.set(CUSTOMER_COUNT_KEY.format(email=email), count, COUNTS_TIMEOUT)
+    return count
+
+
+def get_customer_count(email):
+    count = cache.get(CUSTOMER_COUNT_KEY.format(email=email))
+    if count is None:
+        count = refresh_customer_count(email)
+    return count
+
+
+def broadcast_owner_counts(orders=()):
+    """
+    Refresh the owner counters and push them to the dashboard WebSocket group,
+    along with the card deltas (see notification_feed.order_deltas) of the
+    orders that changed.
+    """
+    counts = refresh_owner_counts()
+    async_to_sync(group_send)(
+        "notifications",
+        {
+            "type": "send_pending_count",
+            "pending_count": counts["pending_count"],
+            "unseen_count": counts["unseen_count"],
+            "orders": list(orders),
+        }
+    )
+
+
+def broadcast_customer_count(email, status, orders=()):
+    async_to_sync(group_send)(
+        customer_group_name(email),
+        {
+            "type": "send_customer_notification",
+            "message": f"Your order has been {status}",
+            "customer_count": refresh_customer_count(email),
+            "orders": list(orders),
+        }
+    )
+
+
+class _Batch:
+    """
+    Orders changed and data versions to bump in one transaction; sent by a
+    single on_commit callback.
+    """
+
+    def __init__(self):
+        self.customers = {}  # email -> latest status
+        self.orders = {}  # group_id -> email
+        self.versions = set()  # data_versions names
+
+    def flush(self):
+        flush_order_notifications(self)
+
+
+def _current_batch():
+    """
+    The batch of the current thread's transaction, if it is still queued.
+
+    Only the on_commit callback holds the batch; a rollback discards the
+    callback and the batch with it, so a rolled-back change never reaches
+    the next broadcast.
+    """
+    ref = getattr(_pending, "batch", None)
+    batch = ref() if ref is not None else None
+    if batch is not None and transaction.get_connection().in_atomic_block:
+        return batch
+    return None
+
+
+def _queue(record):
+    """Add to the current transaction's batch, starting one if needed."""
+    batch = _current_batch()
+    new = batch is None
+    if new:
+        batch = _Batch()
+
+    record(batch)
+
+    if new:
+        _pending.batch = weakref.ref(batch)
+        # Runs immediately when not inside an atomic block
+        transaction.on_commit(batch.flush)
+
+
+def queue_order_notification(email=None, status=None, group_id=None):
+    """
+    Record that an order changed and broadcast once the transaction commits.
+
+    Every save inside one transaction shares a single broadcast, and each
+    changed order (by group_id) is rendered once for it.
+    """
+    def record(batch):
+        if email:
+            # Latest status wins for the customer message
+            batch.customers[email] = status
+        if group_id:
+            batch.orders[group_id] = email
+
+    _queue(record)
+
+
+def queue_version_bump(*names):
+    """Bump each data version once when the transaction commits, however many rows changed."""
+    _queue(lambda batch: batch.versions.update(names))
+
+
+def flush_order_notifications(batch):
+    ref = getattr(_pending, "batch", None)
+    if ref is not None and ref() is batch:
+        _pending.batch = None
+
+    # Before the broadcast, so clients reloading a report see the new version
+    for name in sorted(batch.versions):
+        bump_data_version(name)
+    if not batch.orders and not batch.customers:
+        return
+
+    owner_deltas, customer_deltas = [], defaultdict(list)
+    for group_id, email in batch.orders.items():
+        owner_delta, customer_delta = order_deltas(group_id)
+        owner_deltas.append(owner_delta)
+        if email:
+            customer_deltas[email].append(customer_delta)
+
+    broadcast_owner_counts(owner_deltas)
+    for email, status in batch.customers.items():
+        broadcast_customer_count(email, status, customer_deltas[email])
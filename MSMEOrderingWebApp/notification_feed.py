@@ -0,0 +1,125 @@
+import base64
+import uuid
+from datetime import datetime
+
+from django.db.models import Prefetch, Q
+from django.template.loader import render_to_string
+
+from .models import Checkout, Order
+from .order_groups import with_totals
+
+FEED_PAGE_SIZE = 20
+
+# Order statuses shown in a customer's notification feed
+CUSTOMER_FEED_STATUSES = [
+    "accepted", "rejected", "Preparing", "Packed",
+    "Ready for Pickup", "Out for Delivery", "Completed",
+]
+
+
+def owner_feed():
+    """Orders waiting for the owner / cashier to accept or reject them."""
+    return Order.objects.filter(status="pending")
+
+
+def customer_feed(email):
+    return Order.objects.filter(email=email, status__in=CUSTOMER_FEED_STATUSES)
+
+
+def encode_cursor(order):
+    raw = f"{order.created_at.isoformat()}|{order.group_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(created_at, group_id) from encode_cursor; ValueError for anything else."""
+    try:
+        created_at, group_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(group_id)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+def feed_page(orders, cursor=None, page_size=FEED_PAGE_SIZE):
+    """
+    One page of an Order feed, newest first, keyed on (created_at, group_id).
+
+    Older pages start strictly after the cursor instead of at an OFFSET, so
+    every page costs the same no matter how much history sits behind it.
+    Returns (entries, next_cursor); next_cursor is None on the last page.
+    Entries keep the {'order_code', 'items', 'first', ...} shape the
+    notification templates use.
+    """
+    orders = orders.filter(created_at__isnull=False)
+    if cursor:
+        created_at, group_id = decode_cursor(cursor)
+        orders = orders.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, group_id__lt=group_id))
+
+    page = list(
+        with_totals(orders)
+        .order_by("-created_at", "-group_id")
+        .prefetch_related(Prefetch("items", queryset=Checkout.objects.order_by("id")))[:page_size + 1]
+    )
+    next_cursor = encode_cursor(page[page_size - 1]) if len(page) > page_size else None
+
+    entries = [entry for entry in map(_entry, page[:page_size]) if entry]
+    return entries, next_cursor
+
+
+def _entry(order):
+    items = list(order.items.all())
+    if not items:
+        return None
+    first = items[0]
+    is_delivery = first.order_type and first.order_type.lower() == "delivery"
+    return {
+        "order": order,
+        "order_code": order.order_code,
+        "group_id": order.group_id,
+        "items": items,
+        "first": first,
+        "item_count": order.item_count,
+        "total_price": order.total_price,
+        "status": first.status,
+        "created_at": first.created_at,
+        "sub_total": first.sub_total,
+        "rejection_reason": order.rejection_reason if order.status == "rejected" else None,
+        "order_type": first.order_type,
+        "delivery_fee": first.delivery_fee,
+        "final_total": first.sub_total + first.delivery_fee if is_delivery and first.delivery_fee else first.sub_total,
+    }
+
+
+def feed_entry(group_id):
+    """The feed entry of a single order, or None if it no longer exists."""
+    order = (
+        with_totals(Order.objects.filter(group_id=group_id))
+        .prefetch_related(Prefetch("items", queryset=Checkout.objects.order_by("id")))
+        .first()
+    )
+    return _entry(order) if order else None
+
+
+def order_deltas(group_id):
+    """
+    How one order's card changes in the owner feed and in its customer's feed:
+    a pair of {'group_id', 'action', 'html'} dicts where action is "upsert"
+    (html is the rendered card) or "remove". Sent over the notification
+    sockets so pages patch a single card instead of re-fetching the list.
+    """
+    entry = feed_entry(group_id)
+    status = entry["order"].status if entry else None
+
+    def delta(in_feed, template, context_name):
+        if not in_feed:
+            return {"group_id": str(group_id), "action": "remove"}
+        return {
+            "group_id": str(group_id),
+            "action": "upsert",
+            "html": render_to_string(template, {context_name: [entry]}),
+        }
+
+    return (
+        delta(status == "pending", "partials/pending_order_cards.html", "grouped_orders"),
+        delta(status in CUSTOMER_FEED_STATUSES, "partials/customer_notification_cards.html", "notifications"),
+    )
@@ -0,0 +1,54 @@
+from django.db import connection, transaction
+from django.db.models import F
+
+from .models import OrderCodeSequence
+from .utils import get_business_day
+
+ORDER_CODE_PREFIXES = {
+    'delivery': 'DL',
+    'pickup': 'PU',
+    'walkin': 'WI',
+}
+
+
+def _upsert_next_number(business_day, order_type):
+    table = connection.ops.quote_name(OrderCodeSequence._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (business_day, order_type, last_number) VALUES (%s, %s, 1) "
+            f"ON CONFLICT (business_day, order_type) DO UPDATE SET last_number = {table}.last_number + 1 "
+            f"RETURNING last_number",
+            [business_day, order_type],
+        )
+        return cursor.fetchone()[0]
+
+
+def _locked_next_number(business_day, order_type):
+    with transaction.atomic():
+        sequence, _ = OrderCodeSequence.objects.select_for_update().get_or_create(
+            business_day=business_day, order_type=order_type,
+        )
+        OrderCodeSequence.objects.filter(pk=sequence.pk).update(last_number=F('last_number') + 1)
+        return sequence.last_number + 1
+
+
+def next_order_number(order_type, business_day=None):
+    """
+    Allocate the next number for (business day, order type) in one
+    round trip: an UPSERT ... RETURNING where the database supports it,
+    otherwise a row lock on the sequence row. Numbers restart with each
+    business day, on the same boundary as the sales rollup.
+
+    Call it inside the transaction that creates the order, so an order that
+    rolls back gives its number back.
+    """
+    business_day = business_day or get_business_day()
+    features = connection.features
+    if features.supports_update_conflicts_with_target and features.can_return_columns_from_insert:
+        return _upsert_next_number(business_day, order_type)
+    return _locked_next_number(business_day, order_type)
+
+
+def generate_order_code(order_type):
+    prefix = ORDER_CODE_PREFIXES.get(order_type, 'XX')
+    return f"{prefix}{str(next_order_number(order_type)).zfill(3)}"
@@ -0,0 +1,55 @@
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from .utils import get_business_details, get_or_create_customization, site_config_version
+
+BRANDING_KEY = "emails:branding:{version}"
+
+# Fragments are keyed on the site config version; old versions age out after a day
+FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+
+def _load_branding():
+    customization = get_or_create_customization()
+    business = get_business_details()
+    return {
+        "primary_color": customization.primary_color,
+        "accent_color": customization.accent_color,
+        "button_text_color": customization.button_text_color,
+        "business_name": business.business_name if business else "",
+        "email_address": business.email_address if business else "",
+        "contact_number": business.contact_number if business else "",
+        "store_address": business.store_address if business else "",
+    }
+
+
+def get_branding(version=None):
+    """Colors and contact details used by the emails, cached per site config version."""
+    version = version or site_config_version()
+    return cache.get_or_set(BRANDING_KEY.format(version=version), _load_branding, FRAGMENT_TIMEOUT)
+
+
+def render_order_status_email(order_code, status, orders, rejection_reason=None):
+    """
+    Return (subject, html) for an order status email.
+
+    The header, per-status message and footer are cached template fragments
+    keyed on the site config version; only the order code, rejection reason
+    and item table are rendered for each message.
+    """
+    items = list(orders)
+    version = site_config_version()
+
+    html = render_to_string("emails/order_status.html", {
+        "version": version,
+        "fragment_timeout": FRAGMENT_TIMEOUT,
+        "branding": get_branding(version),
+        "order_code": order_code,
+        "status": status,
+        "status_key": status.lower(),
+        "rejection_reason": rejection_reason,
+        "items": items,
+        # Checkout.price is already the line total (unit price x quantity)
+        "total_price": sum(item.price for item in items),
+    })
+    return f"Your order has been {status.capitalize()}", html
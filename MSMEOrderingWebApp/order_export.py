@@ -0,0 +1,92 @@
+import csv
+import json
+from datetime import datetime, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.timezone import make_aware
+
+from .models import Checkout
+
+# Checkout columns in export order
+EXPORT_FIELDS = [
+    "id", "order_code", "group_id", "created_at", "updated_at", "status",
+    "first_name", "last_name", "email", "contact_number", "address",
+    "order_type", "specific_order_type", "payment_method",
+    "product_id", "product_name", "quantity", "unit_price", "price", "sub_total",
+    "delivery_fee", "cash_given", "change",
+]
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+# Rows fetched per keyset page; memory use depends on this, not on the range
+PAGE_SIZE = 2000
+
+
+class ExportError(ValueError):
+    pass
+
+
+def export_filters(start=None, end=None, statuses=None):
+    """
+    Checkout lines created between two dates (YYYY-MM-DD, both inclusive)
+    in any of `statuses`. Raises ExportError for a malformed date.
+    """
+    lines = Checkout.objects.all()
+    try:
+        if start:
+            lines = lines.filter(created_at__gte=make_aware(datetime.strptime(start, "%Y-%m-%d")))
+        if end:
+            lines = lines.filter(created_at__lt=make_aware(datetime.strptime(end, "%Y-%m-%d")) + timedelta(days=1))
+    except ValueError:
+        raise ExportError("Dates must be YYYY-MM-DD")
+
+    statuses = [status.strip() for status in statuses or [] if status.strip()]
+    if statuses:
+        lines = lines.filter(status__in=statuses)
+    return lines
+
+
+def iter_export_rows(lines, page_size=PAGE_SIZE):
+    """
+    Yield one tuple of EXPORT_FIELDS per line, oldest first. Each page is a
+    short `WHERE id > last ORDER BY id LIMIT n` query, so neither this
+    process nor the database holds a cursor open over the whole range.
+    """
+    lines = lines.order_by("id").values_list(*EXPORT_FIELDS)
+    last_id = 0
+    while True:
+        page = list(lines.filter(id__gt=last_id)[:page_size].iterator(chunk_size=page_size))
+        if not page:
+            return
+        yield from page
+        last_id = page[-1][0]
+
+
+class _Echo:
+    """csv.writer target that hands each written row straight back."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row)), cls=DjangoJSONEncoder) + "\n"
+
+
+def iter_export(lines, export_format):
+    """The encoded export of `lines` as an iterator of str chunks."""
+    if export_format not in EXPORT_FORMATS:
+        raise ExportError(f"Unknown format: {export_format}")
+    encode = iter_csv if export_format == "csv" else iter_ndjson
+    return encode(iter_export_rows(lines))
@@ -0,0 +1,60 @@
+from django.core.paginator import Paginator
+from django.db.models import Count, Prefetch, Sum
+from django.db.models.functions import Lower
+
+from .models import Checkout, Order
+
+# Orders shown in the dashboards' "accepted" table
+ONGOING_STATUSES = ["accepted", "preparing", "packed", "out for delivery", "ready for pickup", "delivered"]
+
+
+def orders_with_status(status):
+    """
+    Orders in `status`, matched case-insensitively ("Preparing" and
+    "preparing" are both stored) on Lower("status") so order_status_key_idx
+    can serve the lookup; `status__iexact` compiles to UPPER(...) and can't.
+    """
+    return Order.objects.annotate(status_key=Lower('status')).filter(status_key=status.lower())
+
+
+def with_totals(orders):
+    """Annotate an Order queryset with item_count and total_price in SQL."""
+    return orders.annotate(
+        item_count=Count('items'),
+        total_price=Sum('items__price'),
+    )
+
+
+def order_page_queryset(orders, order_by='-created_at'):
+    """The query paginate_orders runs for one page of `orders`."""
+    return with_totals(orders).order_by(order_by, 'id').prefetch_related(
+        Prefetch('items', queryset=Checkout.objects.order_by('id'))
+    )
+
+
+def paginate_orders(orders, page_number, per_page=25, order_by='-created_at'):
+    """
+    Paginate Order headers at the database level; only the orders on the
+    requested page have their line items loaded (one prefetch query).
+
+    Each entry keeps the {'order_code', 'items', 'first', 'total_price'}
+    shape the dashboard templates already use.
+    """
+    page = Paginator(order_page_queryset(orders, order_by), per_page).get_page(page_number)
+
+    result = []
+    for order in page.object_list:
+        items = list(order.items.all())
+        if not items:
+            continue
+        result.append({
+            'order': order,
+            'order_code': order.order_code,
+            'group_id': order.group_id,
+            'items': items,
+            'first': items[0],
+            'item_count': order.item_count,
+            'total_price': order.total_price,
+        })
+    page.object_list = result
+    return page
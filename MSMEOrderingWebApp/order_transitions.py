@@ -0,0 +1,108 @@
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import Checkout, Order
+from .sales_rollup import record_order_outcome
+from .stock import consume_order_stock, release_order_stock
+
+# Sent once per transition, after the transaction commits.
+# kwargs: group_id, order_code, email, status
+order_status_changed = Signal()
+
+ORDER_STATUSES = [
+    "pending", "accepted", "rejected", "preparing", "packed", "ready for pickup",
+    "out for delivery", "delivered", "completed", "void",
+]
+
+FULFILMENT_STATUSES = ["accepted", "preparing", "packed", "ready for pickup", "out for delivery", "delivered"]
+
+# Statuses an order must currently be in (any case) to move to the given
+# status: forward only, as the dashboard offers them, and never back to pending
+ALLOWED_FROM = {
+    "pending": [],
+    "accepted": ["pending"],
+    "rejected": ["pending"],
+    "preparing": ["accepted"],
+    "packed": ["accepted", "preparing"],
+    "ready for pickup": ["accepted", "preparing", "packed"],
+    "out for delivery": ["accepted", "preparing", "packed"],
+    "delivered": ["out for delivery"],
+    "completed": FULFILMENT_STATUSES,
+    "void": FULFILMENT_STATUSES + ["completed"],
+}
+
+# Statuses that give back stock held at checkout (if the order still holds it)
+RELEASE_STOCK_STATUSES = {"rejected", "void"}
+
+# Order columns a transition may set; the Checkout lines only get the status
+TRANSITION_FIELDS = {
+    "is_seen_by_customer", "void_reason", "delivery_method", "tracking_url",
+    "eta_value", "eta_unit", "rider", "rejection_reason", "proof_of_delivery",
+}
+
+
+class InvalidTransition(Exception):
+    pass
+
+
+def transition_order(group_id, status, order_code=None, **fields):
+    """
+    Move one order group to `status` with a single UPDATE per table (the
+    Order header gets `fields` too, the lines only the status), then fire
+    `order_status_changed` once on commit.
+
+    Accepting an order consumes its stock and rejecting/voiding it returns
+    stock still held from checkout, in the same transaction; completing,
+    rejecting or voiding it also updates its day's DailySalesRollup.
+
+    Returns the number of Checkout lines updated; raises InvalidTransition
+    for an unknown status, unknown field or a move ALLOWED_FROM does not
+    list, and stock.InsufficientStock when an order cannot be filled.
+    """
+    if status.lower() not in ORDER_STATUSES:
+        raise InvalidTransition(f"Unknown status: {status}")
+    unknown = set(fields) - TRANSITION_FIELDS
+    if unknown:
+        raise InvalidTransition(f"Cannot set {', '.join(sorted(unknown))} on a status change")
+
+    lines = Checkout.objects.filter(group_id=group_id)
+    if order_code:
+        lines = lines.filter(order_code=order_code)
+
+    # Stored statuses are mixed case ("Preparing", "Completed")
+    movable = lines.annotate(status_key=Lower("status")).filter(status_key__in=ALLOWED_FROM[status.lower()])
+
+    changes = {"status": status, "updated_at": timezone.now()}
+
+    with transaction.atomic():
+        stock_lines = []
+        if status.lower() == "accepted" or status.lower() in RELEASE_STOCK_STATUSES:
+            stock_lines = list(movable.only("id", "product_id", "product_name", "quantity"))
+
+        updated = movable.update(**changes)
+        if not updated:
+            current = lines.values_list("status", flat=True).first()
+            if current is None:
+                raise InvalidTransition("Order not found")
+            raise InvalidTransition(f"Order is {current.lower()}; it cannot be marked as {status}")
+
+        if status.lower() == "accepted":
+            consume_order_stock(group_id, stock_lines)
+        elif status.lower() in RELEASE_STOCK_STATUSES:
+            release_order_stock(group_id, stock_lines)
+
+        Order.objects.filter(group_id=group_id).update(**fields, **changes)
+        record_order_outcome(group_id)
+        header = Order.objects.filter(group_id=group_id).values("order_code", "email").first()
+
+        transaction.on_commit(lambda: order_status_changed.send(
+            sender=Order,
+            group_id=group_id,
+            order_code=header["order_code"] if header else order_code,
+            email=header["email"] if header else None,
+            status=status,
+        ))
+
+    return updated
@@ -0,0 +1,265 @@
+import asyncio
+import json
+import logging
+import uuid
+
+import psycopg2
+from channels.db import database_sync_to_async
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+from django.db import connections, transaction
+
+from .models import ChannelGroupMembership, ChannelMessage
+
+# Seconds before the listener retries a lost database connection
+RECONNECT_DELAY = 2
+# Seconds between sweeps for missed messages and expired rows, busy or not
+SWEEP_INTERVAL = 30
+
+logger = logging.getLogger(__name__)
+
+# Quoted: the app label makes the table names mixed case
+MESSAGES = f'"{ChannelMessage._meta.db_table}"'
+GROUPS = f'"{ChannelGroupMembership._meta.db_table}"'
+
+# Inbox of a stored channel name, in SQL (see PostgresChannelLayer.inbox)
+INBOX_SQL = "CASE WHEN position('!' in channel) > 0 THEN split_part(channel, '!', 1) || '!' ELSE channel END"
+
+
+class PostgresChannelLayer(BaseChannelLayer):
+    """
+    Channel layer on the project's PostgreSQL database, so several daphne
+    processes share groups without running Redis.
+
+    Group memberships (with a TTL) and undelivered messages are rows in
+    ChannelGroupMembership / ChannelMessage. Sending inserts the messages and
+    NOTIFYs the receiving processes' inboxes in the same statement; a process
+    LISTENs on one connection and, when woken, claims every message for its
+    channels with a single DELETE ... RETURNING. Postgres folds repeated
+    NOTIFYs of an inbox within a transaction into one, so a burst of sends
+    costs one wake-up and one claim per process.
+
+    Messages must be JSON-serializable. Sending from inside a transaction
+    delivers on commit, and nothing at all on rollback.
+    """
+
+    extensions = ["groups", "flush"]
+
+    def __init__(self, expiry=60, group_expiry=86400, capacity=100, channel_capacity=None,
+                 database="default", notify_channel="channel_layer"):
+        super().__init__(expiry=expiry, capacity=capacity, channel_capacity=channel_capacity)
+        self.channel_capacity = self.compile_capacities(self.channel_capacity)
+        self.group_expiry = group_expiry
+        self.database = database
+        self.notify_channel = notify_channel
+        self.client_prefix = uuid.uuid4().hex
+
+        self.queues = {}  # channel -> asyncio.Queue of claimed messages
+        self.inboxes = set()  # inboxes LISTENed for by this process
+        self.listener = None
+        self.drain_task = None
+        self.drain_requested = False
+
+    def inbox(self, channel):
+        """Specific channels ("specific.<prefix>!<id>") share their process's inbox."""
+        return self.non_local_name(channel) if "!" in channel else channel
+
+    # Channel layer API
+
+    async def new_channel(self, prefix="specific"):
+        return f"{prefix}.{self.client_prefix}!{uuid.uuid4().hex}"
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_channel_name(channel)
+        assert "__asgi_channel__" not in message
+        if not await self._send(channel, json.dumps(message), self.get_capacity(channel)):
+            raise ChannelFull(channel)
+
+    async def receive(self, channel):
+        self.require_valid_channel_name(channel)
+        queue = self.queues.get(channel)
+        if queue is None:
+            queue = self.queues[channel] = asyncio.Queue()
+            self.inboxes.add(self.inbox(channel))
+            self.start_listener()
+            # ✅ Pick up anything sent before this channel was being received
+            self.request_drain()
+
+        try:
+            return await queue.get()
+        except asyncio.CancelledError:
+            # The consumer has gone; later messages stay in the table and expire
+            if queue.empty():
+                self.queues.pop(channel, None)
+            raise
+
+    async def group_add(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        await self._execute(
+            f"""INSERT INTO {GROUPS} ("group", channel, expires_at)
+                VALUES (%s, %s, now() + %s * interval '1 second')
+                ON CONFLICT ("group", channel) DO UPDATE SET expires_at = EXCLUDED.expires_at""",
+            [group, channel, self.group_expiry],
+        )
+
+    async def group_discard(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        await self._execute(f'DELETE FROM {GROUPS} WHERE "group" = %s AND channel = %s', [group, channel])
+
+    async def group_send(self, group, message):
+        """
+        Fan out to every member in one statement: one row per channel, one
+        NOTIFY per receiving process. Members at capacity miss the message,
+        as with the Redis layer.
+        """
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_group_name(group)
+        await self._execute(
+            f"""WITH sent AS (
+                    INSERT INTO {MESSAGES} (inbox, channel, message, expires_at)
+                    SELECT {INBOX_SQL}, channel, %s, now() + %s * interval '1 second'
+                    FROM {GROUPS} member
+                    WHERE "group" = %s AND expires_at > now()
+                      AND (SELECT count(*) FROM {MESSAGES} queued
+                           WHERE queued.channel = member.channel AND queued.expires_at > now()) < %s
+                    RETURNING inbox
+                )
+                SELECT pg_notify(%s, inbox) FROM (SELECT DISTINCT inbox FROM sent) inboxes""",
+            [json.dumps(message), self.expiry, group, self.capacity, self.notify_channel],
+        )
+
+    async def flush(self):
+        await self._execute(f"DELETE FROM {MESSAGES}")
+        await self._execute(f"DELETE FROM {GROUPS}")
+        for queue in self.queues.values():
+            while not queue.empty():
+                queue.get_nowait()
+
+    async def close(self):
+        if self.listener:
+            self.listener.cancel()
+            self.listener = None
+        self.inboxes.clear()
+
+    # Database access
+
+    @database_sync_to_async
+    def _execute(self, sql, params=None):
+        with connections[self.database].cursor() as cursor:
+            cursor.execute(sql, params)
+
+    @database_sync_to_async
+    def _send(self, channel, message, capacity):
+        with transaction.atomic(using=self.database), connections[self.database].cursor() as cursor:
+            cursor.execute(
+                f"""INSERT INTO {MESSAGES} (inbox, channel, message, expires_at)
+                    SELECT %s, %s, %s, now() + %s * interval '1 second'
+                    WHERE (SELECT count(*) FROM {MESSAGES} WHERE channel = %s AND expires_at > now()) < %s""",
+                [self.inbox(channel), channel, message, self.expiry, channel, capacity],
+            )
+            if not cursor.rowcount:
+                return False
+            cursor.execute("SELECT pg_notify(%s, %s)", [self.notify_channel, self.inbox(channel)])
+            return True
+
+    @database_sync_to_async
+    def _claim(self, channels):
+        """Take every live message for `channels`, oldest first."""
+        with connections[self.database].cursor() as cursor:
+            cursor.execute(
+                f"""WITH claimed AS (
+                        DELETE FROM {MESSAGES} WHERE channel = ANY(%s) AND expires_at > now()
+                        RETURNING id, channel, message
+                    )
+                    SELECT channel, message FROM claimed ORDER BY id""",
+                [channels],
+            )
+            return cursor.fetchall()
+
+    async def sweep(self):
+        """Drop expired messages and group memberships."""
+        try:
+            await self._execute(f"DELETE FROM {MESSAGES} WHERE expires_at <= now()")
+            await self._execute(f"DELETE FROM {GROUPS} WHERE expires_at <= now()")
+        except Exception as e:
+            logger.warning("Sweep failed: %s", e)
+
+    # Delivery
+
+    def start_listener(self):
+        if self.listener is None or self.listener.done():
+            self.listener = asyncio.get_running_loop().create_task(self._listen())
+
+    def _connect(self):
+        conn = psycopg2.connect(**connections[self.database].get_connection_params())
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.notify_channel}"')
+        return conn
+
+    async def _listen(self):
+        """Keep a LISTEN connection open, reconnecting (and catching up) as needed."""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                conn = await asyncio.to_thread(self._connect)
+            except psycopg2.Error as e:
+                logger.warning("LISTEN connection failed: %s", e)
+                await asyncio.sleep(RECONNECT_DELAY)
+                continue
+
+            fd = conn.fileno()
+            woken = asyncio.Event()
+            loop.add_reader(fd, woken.set)
+            try:
+                # Notifications sent while disconnected are lost; the claim isn't
+                self.request_drain()
+                next_sweep = loop.time() + SWEEP_INTERVAL
+                while True:
+                    try:
+                        await asyncio.wait_for(woken.wait(), max(next_sweep - loop.time(), 0))
+                    except asyncio.TimeoutError:
+                        pass
+                    if woken.is_set():
+                        woken.clear()
+                        conn.poll()
+                        inboxes = {notify.payload for notify in conn.notifies}
+                        conn.notifies.clear()
+                        if inboxes & self.inboxes:
+                            self.request_drain()
+                    # On a fixed schedule: steady traffic must not keep expired rows around
+                    if loop.time() >= next_sweep:
+                        await self.sweep()
+                        self.request_drain()
+                        next_sweep = loop.time() + SWEEP_INTERVAL
+            except psycopg2.Error as e:
+                logger.warning("LISTEN connection lost: %s", e)
+            finally:
+                loop.remove_reader(fd)
+                conn.close()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    def request_drain(self):
+        """Claim messages for this process's channels soon; overlapping requests share one claim."""
+        self.drain_requested = True
+        if self.drain_task is None or self.drain_task.done():
+            self.drain_task = asyncio.get_running_loop().create_task(self._drain())
+
+    async def _drain(self):
+        while self.drain_requested:
+            self.drain_requested = False
+            if not self.queues:
+                continue
+            try:
+                claimed = await self._claim(list(self.queues))
+            except Exception as e:
+                # Left in the table; retried on the next notification or sweep
+                logger.warning("Claiming messages failed: %s", e)
+                return
+            for channel, message in claimed:
+                queue = self.queues.get(channel)
+                if queue is not None:
+                    queue.put_nowait(json.loads(message))
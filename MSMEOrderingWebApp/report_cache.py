@@ -0,0 +1,125 @@
+import functools
+import hashlib
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .catalog import catalog_version
+from .data_versions import bump_data_version, data_version
+from .models import Order, ReportJob
+from .report_queries import report_period
+from .sales_rollup import SETTLED_ORDERS_VERSION
+from .utils import site_config_version
+
+REPORT_DATA_VERSION = "reports"
+REPORT_KEY = "reports:pdf:{digest}"
+CHART_KEY = "reports:chart:{digest}"
+
+CHART_TIMEOUT = 60 * 60 * 24 * 7
+
+# These read the product table (and all-time units sold), so the date range doesn't close them
+CATALOG_REPORTS = {"inventory"}
+
+# Orders in these statuses won't move again, so they can't change a past report
+SETTLED_STATUSES = ["completed", "rejected", "void"]
+
+
+def report_data_version():
+    """Changes whenever a Checkout line is written or an order changes status."""
+    return data_version(REPORT_DATA_VERSION)
+
+
+def bump_report_data_version():
+    bump_data_version(REPORT_DATA_VERSION)
+
+
+def _digest(*parts):
+    return hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def period_closed(start, end):
+    """The period is over and every order placed in it has settled."""
+    if end is None or end > timezone.now():
+        return False
+    return not (
+        Order.objects.filter(created_at__gte=start, created_at__lt=end)
+        .annotate(status_key=Lower("status"))
+        .exclude(status_key__in=SETTLED_STATUSES)
+        .exists()
+    )
+
+
+def report_cache_key(params):
+    """
+    (report type, date filter, resolved range, data version, site config
+    version) for a report; the PDF header shows the business name, logo and
+    address.
+
+    A closed period only changes when a settled order is reopened (e.g.
+    completed -> void) or deleted, so its version is the settled-orders
+    version rather than every write.
+    """
+    report_type = params.get("report_type")
+    start, end, _ = report_period(params)
+
+    if report_type in CATALOG_REPORTS:
+        version = f"catalog-{catalog_version()}-{report_data_version()}"
+    elif period_closed(start, end):
+        version = f"closed-{data_version(SETTLED_ORDERS_VERSION)}"
+    else:
+        version = report_data_version()
+
+    digest = _digest(
+        report_type, params.get("date_filter"),
+        start.isoformat() if start else "", end.isoformat() if end else "",
+        version, site_config_version(),
+    )
+    return REPORT_KEY.format(digest=digest)
+
+
+def get_cached_report(key):
+    """
+    The stored file of a finished job with the same cache key, or None.
+    Looked up in ReportJob rather than the cache, so the web process finds
+    files rendered by the report worker.
+    """
+    names = (
+        ReportJob.objects.filter(cache_key=key, status="done").exclude(file="")
+        .order_by("-finished_at").values_list("file", flat=True)
+    )
+    for name in names[:5]:
+        if default_storage.exists(name):
+            return name
+    return None
+
+
+def store_report(key, filename, content):
+    """
+    Save a rendered report under a path derived from its cache key, so every
+    job for the same report shares one file.
+    """
+    name = f"reports/{key.rsplit(':', 1)[-1][:32]}/{filename}"
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(content))
+    return name
+
+
+def cached_chart(func):
+    """
+    Cache a chart function's PNG by its arguments; the same counts always
+    draw the same chart. Returns a fresh BytesIO like the wrapped function.
+    """
+    @functools.wraps(func)
+    def wrapper(*args):
+        key = CHART_KEY.format(digest=_digest(func.__name__, repr(args)))
+        png = cache.get(key)
+        if png is None:
+            png = func(*args).getvalue()
+            cache.set(key, png, CHART_TIMEOUT)
+        return BytesIO(png)
+
+    return wrapper
@@ -0,0 +1,106 @@
+from io import BytesIO
+
+from matplotlib import colormaps
+from matplotlib.figure import Figure
+
+from .report_cache import cached_chart
+
+# Figures are built with matplotlib's object API instead of pyplot, so no
+# global figure list: safe to render from several threads, and each figure is
+# freed with its last reference. Charts are cached by their input data.
+
+# Charts are placed at 200-400pt wide in the PDF; 150 dpi still prints sharp
+CHART_DPI = 150
+
+
+def _png(fig, **kwargs):
+    img_stream = BytesIO()
+    fig.savefig(img_stream, format="png", dpi=CHART_DPI, **kwargs)
+    img_stream.seek(0)
+    return img_stream
+
+
+def _label_bars(ax, bars):
+    for bar in bars:
+        height = bar.get_height()
+        ax.annotate(f"{height}",
+                    xy=(bar.get_x() + bar.get_width() / 2, height),
+                    xytext=(0, 3), textcoords="offset points",
+                    ha="center", va="bottom", fontsize=10, fontweight="bold", color="black")
+
+
+@cached_chart
+def generate_order_status_bar_chart(completed, rejected, ongoing):
+    """Bar chart of completed / rejected / ongoing orders"""
+    fig = Figure(figsize=(8, 6), layout="tight")
+    ax = fig.subplots()
+    bars = ax.bar(["Completed", "Rejected", "Ongoing"], [completed, rejected, ongoing],
+                  color=["#28a745", "#dc3545", "#fd7e14"], edgecolor="black", linewidth=1.5)
+
+    ax.grid(axis="y", linestyle="--", alpha=0.7)
+    ax.set_ylabel("Number of Orders", fontsize=12, fontweight="bold")
+    ax.set_xlabel("Order Status", fontsize=12, fontweight="bold")
+    _label_bars(ax, bars)
+    return _png(fig)
+
+
+@cached_chart
+def generate_order_types_bar_chart(order_types):
+    """Bar chart of orders per order type (Dine-in, Pickup, Delivery, etc.)"""
+    fig = Figure(figsize=(8, 6), layout="tight")
+    ax = fig.subplots()
+    bars = ax.bar(list(order_types.keys()), list(order_types.values()),
+                  color=colormaps["Set2"].colors, edgecolor="black", linewidth=1.5)
+
+    ax.set_ylabel("Number of Orders", fontsize=12, fontweight="bold")
+    ax.set_xlabel("Order Type", fontsize=12, fontweight="bold")
+    ax.grid(axis="y", linestyle="--", alpha=0.7)
+    _label_bars(ax, bars)
+    return _png(fig)
+
+
+@cached_chart
+def generate_payment_methods_pie_chart(payment_methods):
+    """Pie chart of the share of each payment method"""
+    fig = Figure(figsize=(8, 8), layout="tight")
+    ax = fig.subplots()
+    _, texts, autotexts = ax.pie(list(payment_methods.values()), labels=list(payment_methods.keys()),
+                                 autopct="%1.1f%%", colors=colormaps["Paired"].colors, startangle=90,
+                                 wedgeprops={"edgecolor": "black", "linewidth": 1.5})
+
+    for autotext in autotexts:
+        autotext.set_fontsize(15)
+        autotext.set_weight("bold")
+        autotext.set_color("white")
+
+    for text in texts:
+        text.set_fontsize(20)
+        text.set_weight("bold")
+        text.set_color("black")
+
+    ax.axis("equal")  # Draw the pie as a circle
+    return _png(fig)
+
+
+@cached_chart
+def generate_products_overview_chart(total_products, products_with_sales, total_units_sold):
+    """Bar chart of total products vs products with sales vs units sold"""
+    fig = Figure(figsize=(5, 4))
+    ax = fig.subplots()
+    ax.bar(["Total Products", "With Sales", "Units Sold"], [total_products, products_with_sales, total_units_sold],
+           color=["#607D8B", "#4CAF50", "#2196F3"])
+    ax.set_title("Products & Sales Overview")
+    ax.set_ylabel("Count")
+    return _png(fig, bbox_inches="tight")
+
+
+@cached_chart
+def generate_top_products_chart(labels, counts):
+    """Horizontal bar chart of the best sellers, top seller first"""
+    fig = Figure(figsize=(6, 4))
+    ax = fig.subplots()
+    ax.barh(labels, counts)
+    ax.set_xlabel("Units Sold")
+    ax.set_title("Top 10 Products by Units Sold")
+    ax.invert_yaxis()
+    return _png(fig, bbox_inches="tight")
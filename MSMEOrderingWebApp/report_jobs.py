@@ -0,0 +1,165 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .metrics import group_send
+from .models import ReportJob
+from .report_cache import get_cached_report, report_cache_key, store_report
+
+REPORT_JOBS_GROUP = "report_jobs"
+
+# Session user types that may request reports and follow their jobs
+REPORT_USER_TYPES = {"owner", "cashier"}
+
+# A running job older than this is assumed to belong to a worker that died
+STALE_AFTER = timedelta(minutes=15)
+
+# Form fields that change the rendered report
+DATE_INPUTS = {
+    "daily": ["daily_date"],
+    "weekly": ["weekly_date"],
+    "monthly": ["monthly_date"],
+    "custom": ["custom_start", "custom_end"],
+}
+
+
+def report_params(data):
+    """The report form fields that matter, from request.GET or a dict."""
+    params = {
+        "report_type": data.get("report_type") or "",
+        "date_filter": data.get("date_filter") or "",
+    }
+    for field in DATE_INPUTS.get(params["date_filter"], []):
+        params[field] = data.get(field) or ""
+    return params
+
+
+def params_hash(params):
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+def report_job_payload(job):
+    return {
+        "id": job.pk,
+        "report_type": job.report_type,
+        "status": job.status,
+        "progress": job.progress,
+        "url": job.file.url if job.status == "done" and job.file else None,
+        "error": job.error,
+    }
+
+
+def broadcast_report_job(job):
+    if get_channel_layer() is None:
+        return
+    async_to_sync(group_send)(REPORT_JOBS_GROUP, {
+        "type": "send_report_job",
+        "data": report_job_payload(job),
+    })
+
+
+def request_report(data):
+    """
+    Queue a report for the run_report_jobs worker. A request matching a job
+    that is still queued or running returns that job instead of a new one,
+    and an identical report already in the report cache comes back done.
+    """
+    params = report_params(data)
+    key = params_hash(params)
+
+    ReportJob.objects.filter(status="running", started_at__lt=timezone.now() - STALE_AFTER).update(
+        status="failed", error="The report worker stopped before finishing.", finished_at=timezone.now(),
+    )
+
+    existing = ReportJob.objects.filter(params_hash=key, status__in=ReportJob.IN_PROGRESS).first()
+    if existing:
+        return existing
+
+    cache_key = report_cache_key(params)
+    cached = get_cached_report(cache_key)
+    if cached:
+        # Nothing to render; the job is born finished and points at the stored PDF
+        now = timezone.now()
+        return ReportJob.objects.create(
+            report_type=params["report_type"], params=params, params_hash=key, file=cached,
+            cache_key=cache_key, status="done", progress=100, started_at=now, finished_at=now,
+        )
+
+    try:
+        with transaction.atomic():
+            job = ReportJob.objects.create(report_type=params["report_type"], params=params, params_hash=key)
+    except IntegrityError:
+        # Same report requested at the same moment
+        return ReportJob.objects.get(params_hash=key, status__in=ReportJob.IN_PROGRESS)
+
+    transaction.on_commit(lambda: broadcast_report_job(job))
+    return job
+
+
+def _claim_next_job():
+    with transaction.atomic():
+        pending = ReportJob.objects.filter(status="pending").order_by("created_at", "id")
+        if connection.features.has_select_for_update_skip_locked:
+            # Several workers can share the queue without rendering a job twice
+            pending = pending.select_for_update(skip_locked=True)
+        job = pending.first()
+        if job is None:
+            return None
+
+        job.status = "running"
+        job.progress = 5
+        job.started_at = timezone.now()
+        job.save(update_fields=["status", "progress", "started_at"])
+
+    broadcast_report_job(job)
+    return job
+
+
+def _set_progress(job, percent):
+    job.progress = percent
+    ReportJob.objects.filter(pk=job.pk).update(progress=percent)
+    broadcast_report_job(job)
+
+
+def run_report_job(job):
+    # Rendering lives with the report views; imported here to avoid a cycle
+    from .views import render_report_pdf
+
+    try:
+        # Keyed on the data as it was before rendering; a change made meanwhile
+        # moves the version on, so this file isn't reused for the newer data
+        job.cache_key = report_cache_key(job.params)
+        cached = get_cached_report(job.cache_key)
+        if cached:
+            job.file.name = cached
+        else:
+            filename, content = render_report_pdf(job.params, progress=lambda percent: _set_progress(job, percent))
+            job.file.name = store_report(job.cache_key, filename, content)
+        job.status = "done"
+        job.progress = 100
+        job.error = ""
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=["file", "cache_key", "status", "progress", "error", "finished_at"])
+    broadcast_report_job(job)
+    return job
+
+
+def run_pending_report_jobs(limit=10):
+    """Render up to `limit` queued jobs; returns how many were processed."""
+    processed = 0
+    while processed < limit:
+        job = _claim_next_job()
+        if job is None:
+            break
+        run_report_job(job)
+        processed += 1
+    return processed
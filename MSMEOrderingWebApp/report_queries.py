@@ -0,0 +1,271 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import groupby
+from operator import attrgetter
+
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, Lower
+from django.utils.timezone import make_aware
+
+from .models import Checkout, DailySalesRollup, Order, ProductDailySales, Products
+from .sales_rollup import top_products
+
+# Report status buckets; "completed" wins for statuses in both lists
+ONGOING_STATUSES = ["accepted", "preparing", "packed", "out for delivery", "ready for pickup", "delivered"]
+COMPLETED_STATUSES = ["completed", "delivered", "picked up"]
+
+ZERO = Decimal("0")
+
+
+def report_period(params):
+    """
+    Resolve the report form's date filter to (start, end, label).
+    start/end are None when no period was chosen (all orders).
+    """
+    date_filter = params.get("date_filter")
+
+    if date_filter == "daily" and params.get("daily_date"):
+        start = make_aware(datetime.strptime(params["daily_date"], "%Y-%m-%d"))
+        end = start + timedelta(days=1)
+        return start, end, f"Daily Report for {start.strftime('%B %d, %Y')}"
+
+    if date_filter == "weekly" and params.get("weekly_date"):
+        year, week = params["weekly_date"].split("-W")
+        start = datetime.strptime(f"{year}-W{week}-1", "%Y-W%W-%w")
+        end = start + timedelta(weeks=1)
+        start, end = make_aware(start), make_aware(end)
+        return start, end, f"Weekly Report ({start.strftime('%b %d, %Y')} - {end.strftime('%b %d, %Y')})"
+
+    if date_filter == "monthly" and params.get("monthly_date"):
+        start = make_aware(datetime.strptime(params["monthly_date"], "%Y-%m"))
+        end = make_aware(datetime(start.year + (start.month // 12), (start.month % 12) + 1, 1))
+        return start, end, f"Monthly Report for {start.strftime('%B %Y')}"
+
+    if date_filter == "custom" and params.get("custom_start") and params.get("custom_end"):
+        start = make_aware(datetime.strptime(params["custom_start"], "%Y-%m-%d"))
+        end = make_aware(datetime.strptime(params["custom_end"], "%Y-%m-%d")) + timedelta(days=1)
+        return start, end, f"Custom Report ({start.strftime('%b %d, %Y')} - {(end - timedelta(days=1)).strftime('%b %d, %Y')})"
+
+    return None, None, ""
+
+
+# ===== SALES =====
+
+def report_days(start, end):
+    """The business days (first, last) covered by a report_period range."""
+    if start is None:
+        return None, None
+    return start.date(), (end - timedelta(days=1)).date()
+
+
+def rollup_sales_totals(first_day=None, last_day=None):
+    """
+    Revenue, items, orders and payment method / order type breakdowns summed
+    from DailySalesRollup: one row per business day instead of every line.
+    """
+    rows = DailySalesRollup.objects.all()
+    if first_day is not None:
+        rows = rows.filter(business_day__range=(first_day, last_day))
+
+    totals = rows.aggregate(
+        revenue=Sum("revenue", default=ZERO),
+        items=Sum("items_sold", default=0),
+        orders=Sum("completed_orders", default=0),
+    )
+
+    by_payment_method = defaultdict(Decimal)
+    by_order_type = defaultdict(Decimal)
+    for payment_methods, order_types in rows.values_list("by_payment_method", "by_order_type"):
+        for method, entry in payment_methods.items():
+            by_payment_method[method] += Decimal(entry["revenue"])
+        for order_type, entry in order_types.items():
+            by_order_type[order_type] += Decimal(entry["revenue"])
+
+    totals["by_payment_method"] = sorted(by_payment_method.items(), key=lambda item: -item[1])
+    totals["by_order_type"] = sorted(by_order_type.items(), key=lambda item: -item[1])
+    return totals
+
+
+def completed_lines(lines, days=None):
+    """
+    The completed Checkout lines of a report. With `days` (see report_days)
+    they are the lines of the orders the daily rollup counts as completed
+    on those business days, so line figures agree with the rollup totals;
+    `lines` is then not used.
+    """
+    if days is None:
+        return lines.filter(status="completed")
+
+    first_day, last_day = days
+    completed = Checkout.objects.filter(order__rollup_status="completed")
+    if first_day is not None:
+        completed = completed.filter(order__rollup_day__range=(first_day, last_day))
+    return completed
+
+
+def sales_metrics(lines, days=None):
+    """
+    Totals and breakdowns for the completed Checkout lines in `lines`,
+    computed with GROUP BY queries instead of walking every row.
+
+    With `days` the headline totals and breakdowns come from the daily
+    rollup, and products and customers from the same orders (completed_lines).
+    """
+    completed = completed_lines(lines, days)
+
+    if days is not None:
+        totals = rollup_sales_totals(*days)
+    else:
+        totals = completed.aggregate(
+            revenue=Sum("price", default=ZERO),
+            items=Sum("quantity", default=0),
+            orders=Count("group_id", distinct=True),
+        )
+        totals["by_payment_method"] = list(
+            completed.values_list("payment_method")
+            .annotate(total=Sum("price"))
+            .order_by("-total")
+        )
+        totals["by_order_type"] = list(
+            completed.exclude(order_type__isnull=True).exclude(order_type="")
+            .values_list("order_type")
+            .annotate(total=Sum("price"))
+            .order_by("-total")
+        )
+    totals["avg_order_value"] = totals["revenue"] / totals["orders"] if totals["orders"] else ZERO
+
+    totals["products"] = list(
+        completed.values("product_name")
+        .annotate(quantity=Sum("quantity"), revenue=Sum("price"))
+        .order_by("-revenue", "product_name")
+    )
+    totals["top_customers"] = list(
+        completed.values("first_name", "last_name")
+        .annotate(orders=Count("group_id", distinct=True), revenue=Sum("price"))
+        .order_by("-revenue")[:10]
+    )
+    return totals
+
+
+def iter_completed_orders(lines, days=None):
+    """
+    Yield (first_line, lines) per completed order (see completed_lines),
+    oldest first, streaming only the columns the sales table shows.
+    """
+    rows = (
+        completed_lines(lines, days)
+        .only("group_id", "order_code", "created_at", "first_name", "last_name",
+              "product_name", "quantity", "price")
+        .order_by("order__created_at", "group_id", "id")
+        .iterator(chunk_size=500)
+    )
+    for _, items in groupby(rows, key=attrgetter("group_id")):
+        items = list(items)
+        yield items[0], items
+
+
+# ===== ORDERS =====
+
+def order_headers(lines):
+    """The Order headers of the Checkout lines in `lines`."""
+    return Order.objects.filter(pk__in=lines.values("order_id"))
+
+
+def order_metrics(lines):
+    """Order-level status, payment method and order type counts."""
+    headers = order_headers(lines).annotate(status_key=Lower("status"))
+    ongoing = [s for s in ONGOING_STATUSES if s not in COMPLETED_STATUSES]
+
+    counts = headers.aggregate(
+        total=Count("pk"),
+        completed=Count("pk", filter=Q(status_key__in=COMPLETED_STATUSES)),
+        completed_only=Count("pk", filter=Q(status_key="completed")),
+        rejected=Count("pk", filter=Q(status_key="rejected")),
+        pending=Count("pk", filter=Q(status_key="pending")),
+        ongoing=Count("pk", filter=Q(status_key__in=ongoing)),
+    )
+    counts["payment_methods"] = list(
+        order_headers(lines).values_list("payment_method")
+        .annotate(count=Count("pk"))
+        .order_by("-count")
+    )
+    counts["order_types"] = list(
+        order_headers(lines).values_list("order_type")
+        .annotate(count=Count("pk"))
+        .order_by("-count")
+    )
+    return counts
+
+
+def iter_order_details(lines):
+    """One row per order for the details table, streamed oldest first."""
+    return (
+        order_headers(lines)
+        .order_by("created_at", "id")
+        .values("created_at", "order_code", "first_name", "last_name", "status", "payment_method")
+        .annotate(total_items=Count("items"))
+        .iterator(chunk_size=500)
+    )
+
+
+# ===== INVENTORY =====
+
+def inventory_metrics():
+    """Product counts and stock levels in one query each."""
+    products = Products.objects.all()
+    counts = products.aggregate(
+        out_of_stock=Count("pk", filter=Q(track_stocks=True, stocks=0)),
+        low_stock=Count("pk", filter=Q(track_stocks=True, stocks__lte=5, stocks__gt=0)),
+        normal_stock=Count("pk", filter=Q(track_stocks=True, stocks__gt=5)),
+    )
+    # Products are counted by (name, category); variations share a name
+    counts["total_products"] = products.values("name", "category").distinct().count()
+    counts["tracked_products"] = products.filter(track_stocks=True).values("name", "category").distinct().count()
+    counts["untracked_products"] = products.filter(track_stocks=False).values("name", "category").distinct().count()
+    counts["categories"] = list(
+        products.values_list("category__name")
+        .annotate(count=Count("name", distinct=True))
+        .order_by("category__name")
+    )
+    return counts
+
+
+def iter_inventory_by_category():
+    """
+    Yield (category_name, products) per category, streaming the product
+    table. Each product carries `units_sold`, all time, from ProductDailySales.
+    """
+    units_sold = (
+        ProductDailySales.objects.filter(product=OuterRef("pk"))
+        .values("product").annotate(total=Sum("quantity")).values("total")
+    )
+    rows = (
+        Products.objects.select_related("category")
+        .annotate(units_sold=Coalesce(Subquery(units_sold), 0))
+        .order_by("category__name", "category_id", "name", "id")
+        .iterator(chunk_size=500)
+    )
+    for _, products in groupby(rows, key=attrgetter("category_id")):
+        products = list(products)
+        yield products[0].category.name, products
+
+
+# ===== TOP PRODUCTS =====
+
+def product_metrics(first_day=None, last_day=None):
+    """
+    Units sold and performance buckets per product (variations combined)
+    between two business days, from ProductDailySales.
+    """
+    sold = [row["quantity"] for row in top_products(first_day, last_day, limit=None)]
+    total_products = Products.objects.values("name").distinct().count()
+    return {
+        "total_products": total_products,
+        "products_with_sales": len(sold),
+        "total_units_sold": sum(sold),
+        "high_performers": sum(1 for quantity in sold if quantity >= 50),
+        "medium_performers": sum(1 for quantity in sold if 10 <= quantity <= 49),
+        "low_performers": sum(1 for quantity in sold if 1 <= quantity <= 9),
+        "no_sales": max(total_products - len(sold), 0),
+    }
@@ -5,6 +5,8 @@ websocket_urlpatterns = [
     re_path(r'ws/notifications/$', consumers.NotificationConsumer.as_asgi()),
     re_path(r'ws/customer-notifications/$', consumers.CustomerNotificationConsumer.as_asgi()),
     re_path(r"ws/print/$", consumers.PrintConsumer.as_asgi()),
+    re_path(r"ws/shop-status/$", consumers.ShopStatusConsumer.as_asgi()),
+    re_path(r"ws/report-jobs/$", consumers.ReportJobConsumer.as_asgi()),
     re_path(r"ws/delivery-fee/owners/$", consumers.DeliveryFeeOwnerConsumer.as_asgi()),
     re_path(r"ws/delivery-fee/customer/$", consumers.DeliveryFeeCustomerConsumer.as_asgi()),
 ]
\ No newline at end of file
@@ -0,0 +1,262 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Lower
+
+from .data_versions import bump_data_version
+from .models import Checkout, DailySalesRollup, Order, ProductDailySales
+from .utils import get_business_day
+
+# Order statuses counted in the rollup; revenue only comes from completed orders
+ROLLUP_STATUSES = {"completed", "rejected", "void"}
+
+# Data version bumped when an order leaves a final status (e.g. completed -> void),
+# the one change that can reach a period otherwise treated as closed
+SETTLED_ORDERS_VERSION = "orders:settled"
+
+COUNT_FIELDS = {
+    "completed": "completed_orders",
+    "rejected": "rejected_orders",
+    "void": "void_orders",
+}
+
+BREAKDOWNS = {
+    "payment_method": "by_payment_method",
+    "order_type": "by_order_type",
+    "specific_order_type": "by_specific_order_type",
+}
+
+ZERO = Decimal("0")
+
+
+def _contribution(order, items, revenue):
+    """What one order adds to its day's row."""
+    status = order.status.lower()
+    contribution = {COUNT_FIELDS[status]: 1}
+    if status != "completed":
+        return contribution
+
+    contribution.update(
+        items_sold=items or 0,
+        revenue=revenue or ZERO,
+        delivery_fees=order.delivery_fee or ZERO,
+    )
+    for field, breakdown in BREAKDOWNS.items():
+        key = getattr(order, field)
+        if key:
+            contribution[breakdown] = {key: {"orders": 1, "revenue": str(revenue or ZERO)}}
+    return contribution
+
+
+def _merge_breakdown(current, change, sign):
+    merged = dict(current)
+    for key, values in change.items():
+        entry = merged.get(key, {"orders": 0, "revenue": "0"})
+        entry = {
+            "orders": entry["orders"] + sign * values["orders"],
+            "revenue": str(Decimal(entry["revenue"]) + sign * Decimal(values["revenue"])),
+        }
+        if entry["orders"]:
+            merged[key] = entry
+        else:
+            merged.pop(key, None)
+    return merged
+
+
+def _apply(business_day, contribution, sign):
+    """Add (sign=1) or take back (sign=-1) an order's contribution under a row lock."""
+    # ✅ Insert-if-missing never raises on a race, so the lock below always finds the row
+    DailySalesRollup.objects.bulk_create([DailySalesRollup(business_day=business_day)], ignore_conflicts=True)
+    row = DailySalesRollup.objects.select_for_update().get(business_day=business_day)
+
+    for field, value in contribution.items():
+        if field in BREAKDOWNS.values():
+            setattr(row, field, _merge_breakdown(getattr(row, field), value, sign))
+        else:
+            setattr(row, field, getattr(row, field) + sign * value)
+    row.save()
+
+
+def _product_lines(group_id):
+    """Per-product quantity and revenue of one order."""
+    return list(
+        Checkout.objects.filter(group_id=group_id)
+        .values("product_id", "product__name")
+        .annotate(quantity=Sum("quantity"), revenue=Sum("price"))
+        .order_by()
+    )
+
+
+def _apply_products(business_day, lines, sign):
+    """Add (or take back) an order's units and revenue with one UPDATE for all its products."""
+    lines = [line for line in lines if line["product_id"]]
+    if not lines:
+        return
+
+    ProductDailySales.objects.bulk_create(
+        [ProductDailySales(business_day=business_day, product_id=line["product_id"], product_name=line["product__name"])
+         for line in lines],
+        ignore_conflicts=True,
+    )
+    quantity = Case(*[When(product_id=line["product_id"], then=Value(sign * line["quantity"])) for line in lines],
+                    output_field=IntegerField())
+    revenue = Case(*[When(product_id=line["product_id"], then=Value(sign * line["revenue"])) for line in lines],
+                   output_field=DecimalField())
+    ProductDailySales.objects.filter(
+        business_day=business_day, product_id__in=[line["product_id"] for line in lines],
+    ).update(quantity=F("quantity") + quantity, revenue=F("revenue") + revenue)
+
+
+def record_order_outcome(group_id):
+    """
+    Bring DailySalesRollup and ProductDailySales in line with one order's
+    current status. Call it in the transaction that changes the status; an
+    order is counted once, on the business day it reached its final status,
+    and moved if that status changes (e.g. completed -> void).
+    """
+    with transaction.atomic():
+        order = Order.objects.select_for_update().filter(group_id=group_id).first()
+        if order is None:
+            return
+
+        status = order.status.lower()
+        counted = status in ROLLUP_STATUSES
+        if not counted and not order.rollup_status:
+            return
+        if counted and order.rollup_status == status:
+            return
+
+        lines = _product_lines(group_id)
+        items = sum(line["quantity"] for line in lines)
+        revenue = sum((line["revenue"] for line in lines), ZERO)
+
+        if order.rollup_status:
+            transaction.on_commit(partial(bump_data_version, SETTLED_ORDERS_VERSION))
+            previous = Order(
+                status=order.rollup_status, delivery_fee=order.delivery_fee, payment_method=order.payment_method,
+                order_type=order.order_type, specific_order_type=order.specific_order_type,
+            )
+            _apply(order.rollup_day, _contribution(previous, items, revenue), -1)
+            if order.rollup_status == "completed":
+                _apply_products(order.rollup_day, lines, -1)
+
+        if counted:
+            order.rollup_day = get_business_day(order.updated_at)
+            order.rollup_status = status
+            _apply(order.rollup_day, _contribution(order, items, revenue), 1)
+            if status == "completed":
+                _apply_products(order.rollup_day, lines, 1)
+        else:
+            order.rollup_day = None
+            order.rollup_status = ""
+
+        Order.objects.filter(pk=order.pk).update(rollup_day=order.rollup_day, rollup_status=order.rollup_status)
+
+
+def rebuild_sales_rollups():
+    """
+    Recompute every DailySalesRollup and ProductDailySales row from the
+    orders table. Returns the number of days written.
+    """
+    line_totals = defaultdict(list)
+    for line in (
+        Checkout.objects.values("group_id", "product_id", "product__name")
+        .annotate(quantity=Sum("quantity"), revenue=Sum("price"))
+        .order_by()
+        .iterator(chunk_size=1000)
+    ):
+        line_totals[line["group_id"]].append(line)
+
+    days = defaultdict(dict)
+    product_days = {}
+    placements = defaultdict(list)
+    orders = (
+        Order.objects.annotate(status_key=Lower("status"))
+        .filter(status_key__in=ROLLUP_STATUSES)
+        .only("pk", "group_id", "status", "updated_at", "delivery_fee", "payment_method",
+              "order_type", "specific_order_type")
+        .iterator(chunk_size=1000)
+    )
+    for order in orders:
+        lines = line_totals.get(order.group_id, [])
+        items = sum(line["quantity"] for line in lines)
+        revenue = sum((line["revenue"] for line in lines), ZERO)
+        day = get_business_day(order.updated_at)
+
+        row = days[day]
+        for field, value in _contribution(order, items, revenue).items():
+            if field in BREAKDOWNS.values():
+                row[field] = _merge_breakdown(row.get(field, {}), value, 1)
+            else:
+                row[field] = row.get(field, 0) + value
+        placements[(day, order.status_key)].append(order.pk)
+
+        if order.status_key == "completed":
+            for line in lines:
+                if not line["product_id"]:
+                    continue
+                sales = product_days.setdefault((day, line["product_id"]), ProductDailySales(
+                    business_day=day, product_id=line["product_id"], product_name=line["product__name"],
+                    quantity=0, revenue=ZERO,
+                ))
+                sales.quantity += line["quantity"]
+                sales.revenue += line["revenue"]
+
+    with transaction.atomic():
+        DailySalesRollup.objects.all().delete()
+        DailySalesRollup.objects.bulk_create(
+            [DailySalesRollup(business_day=day, **fields) for day, fields in days.items()], batch_size=500,
+        )
+        ProductDailySales.objects.all().delete()
+        ProductDailySales.objects.bulk_create(product_days.values(), batch_size=500)
+        Order.objects.exclude(rollup_status="").update(rollup_day=None, rollup_status="")
+        for (day, status), pks in placements.items():
+            for i in range(0, len(pks), 500):
+                Order.objects.filter(pk__in=pks[i:i + 500]).update(rollup_day=day, rollup_status=status)
+
+    return len(days)
+
+
+def day_totals(business_day):
+    """The rollup row for one business day, or an empty (unsaved) one."""
+    return DailySalesRollup.objects.filter(business_day=business_day).first() or DailySalesRollup(
+        business_day=business_day, revenue=ZERO, delivery_fees=ZERO,
+    )
+
+
+def recent_days(days, until=None):
+    """(first, last) business day of the `days` days ending with `until` (default: today)."""
+    last = until or get_business_day()
+    return last - timedelta(days=days - 1), last
+
+
+def top_products(first_day=None, last_day=None, limit=10):
+    """
+    Best-selling products (variations combined) between two business days,
+    inclusive, read from ProductDailySales; no bounds means all time.
+    Returns dicts with name, quantity and revenue, best first.
+    """
+    rows = ProductDailySales.objects.all()
+    if first_day is not None:
+        rows = rows.filter(business_day__gte=first_day)
+    if last_day is not None:
+        rows = rows.filter(business_day__lte=last_day)
+
+    ranked = (
+        rows.values("product_name")
+        .annotate(quantity=Sum("quantity"), revenue=Sum("revenue"))
+        .filter(quantity__gt=0)
+        .order_by("-quantity", "product_name")
+    )
+    if limit is not None:
+        ranked = ranked[:limit]
+    return [{"name": row["product_name"], "quantity": row["quantity"], "revenue": row["revenue"]} for row in ranked]
+
+
+def units_sold(product_id):
+    """All-time units sold of one product variation, from ProductDailySales."""
+    return ProductDailySales.objects.filter(product_id=product_id).aggregate(total=Sum("quantity"))["total"] or 0
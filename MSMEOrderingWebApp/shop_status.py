@@ -0,0 +1,32 @@
+from asgiref.sync import async_to_sync
+
+from .metrics import group_send
+from .utils import get_business_details
+
+SHOP_STATUS_GROUP = "shop_status"
+
+
+def shop_status_payload(business=None):
+    """force_closed flag and opening schedule, in the shape the customer pages use."""
+    business = business or get_business_details()
+    if not business:
+        return {"force_closed": False}
+
+    return {
+        "force_closed": business.force_closed,
+        "opening_time": business.opening_time.strftime("%H:%M:%S") if business.opening_time else "00:00:00",
+        "closing_time": business.closing_time.strftime("%H:%M:%S") if business.closing_time else "23:59:59",
+        "start_day": business.start_day or "",
+        "end_day": business.end_day or "",
+    }
+
+
+def broadcast_shop_status(business=None):
+    """Push the current shop status to every connected customer page."""
+    async_to_sync(group_send)(
+        SHOP_STATUS_GROUP,
+        {
+            "type": "send_shop_status",
+            "data": shop_status_payload(business),
+        }
+    )
@@ -1,44 +1,44 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import Checkout
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
+from .models import Checkout, Customization, BusinessDetails, BusinessOwnerAccount, Products, ProductCategory
+from .catalog import bump_catalog_version
+from .notification_counts import queue_order_notification, queue_version_bump
+from .report_cache import REPORT_DATA_VERSION
+from .sales_rollup import SETTLED_ORDERS_VERSION
+from .order_transitions import order_status_changed
+from .utils import invalidate_site_config
 
 @receiver(post_save, sender=Checkout)
 def notify_orders(sender, instance, **kwargs):
-    channel_layer = get_channel_layer()
+    # ✅ Coalesced: every line saved in one transaction shares a single
+    # dashboard + customer broadcast, sent from transaction.on_commit
+    queue_order_notification(instance.email, instance.status, instance.group_id)
+    # ✅ Reports over a period that is still open are cached per data version,
+    # bumped once per transaction with the broadcast
+    queue_version_bump(REPORT_DATA_VERSION)
 
-    # ✅ Dashboard: total pending orders (card) and unseen (badge)
-    pending_count = Checkout.objects.filter(status="pending").values("order_code").distinct().count()
-    unseen_count = Checkout.objects.filter(status="pending", is_seen_by_owner=False).values("order_code").distinct().count()
+@receiver(order_status_changed)
+def notify_order_status(sender, group_id, email, status, **kwargs):
+    # ✅ One event per transition (bulk UPDATE skips post_save)
+    queue_order_notification(email, status, group_id)
+    queue_version_bump(REPORT_DATA_VERSION)
 
-    # ✅ Send to business dashboard WebSocket group
-    async_to_sync(channel_layer.group_send)(
-        "notifications",
-        {
-            "type": "send_pending_count",
-            "pending_count": pending_count,
-            "unseen_count": unseen_count,
-        }
-    )
+@receiver(post_delete, sender=Checkout)
+def refresh_reports(sender, **kwargs):
+    # ✅ A deleted line can belong to a closed period, so closed reports go stale too
+    queue_version_bump(REPORT_DATA_VERSION, SETTLED_ORDERS_VERSION)
 
-    # ✅ Handle customer notifications
-    status_list = ["accepted", "rejected", "Preparing", "Packed", "Ready for Pickup", "Out for Delivery", "Completed"]
+@receiver([post_save, post_delete], sender=Customization)
+@receiver([post_save, post_delete], sender=BusinessDetails)
+@receiver([post_save, post_delete], sender=BusinessOwnerAccount)
+def refresh_site_config(sender, **kwargs):
+    # ✅ Cached singletons (and the email fragments) are keyed on this version;
+    # bumped after commit so a rolled-back save can't be cached under the new one
+    transaction.on_commit(invalidate_site_config)
 
-    customer_count = Checkout.objects.filter(
-        email=instance.email,
-        status__in=status_list,
-        is_seen_by_customer=False
-    ).values("order_code").distinct().count()
-
-    sanitized_email = instance.email.replace("@", "_at_").replace(".", "_dot_")
-    group_name = f"customer_{sanitized_email}"
-
-    async_to_sync(channel_layer.group_send)(
-        group_name,
-        {
-            "type": "send_customer_notification",
-            "message": f"Your order has been {instance.status}",
-            "customer_count": customer_count,
-        }
-    )
+@receiver([post_save, post_delete], sender=Products)
+@receiver([post_save, post_delete], sender=ProductCategory)
+def refresh_catalog(sender, **kwargs):
+    # ✅ POS / customer home render from the catalog snapshot; rebuild it after commit
+    transaction.on_commit(bump_catalog_version)
@@ -0,0 +1,38 @@
+// Older notification pages: the .feed-more block at the end of a feed holds
+// the URL of the next page. It loads when scrolled into view or clicked and
+// is replaced by the returned cards (plus the next .feed-more, if any).
+(function () {
+    let loading = false;
+
+    function loadOlder(more) {
+        if (loading || !more) return;
+        loading = true;
+
+        fetch(more.dataset.nextUrl)
+            .then(response => response.json())
+            .then(data => {
+                more.insertAdjacentHTML('beforebegin', data.html);
+                if (data.next_url) {
+                    more.dataset.nextUrl = data.next_url;
+                } else {
+                    more.remove();
+                }
+            })
+            .finally(() => { loading = false; });
+    }
+
+    function nearBottom(more) {
+        return more.getBoundingClientRect().top < window.innerHeight + 300;
+    }
+
+    document.addEventListener('click', function (e) {
+        if (e.target.closest('.feed-more-btn')) {
+            loadOlder(e.target.closest('.feed-more'));
+        }
+    });
+
+    window.addEventListener('scroll', function () {
+        const more = document.querySelector('.feed-more');
+        if (more && nearBottom(more)) loadOlder(more);
+    }, { passive: true });
+})();
@@ -0,0 +1,31 @@
+// Notification WebSocket messages carry the orders that changed as
+// {group_id, action: "upsert" | "remove", html}. Patch those cards in place
+// instead of re-fetching the whole list; only switching to or from the empty
+// state falls back to reloading the list from refreshUrl.
+function applyOrderDeltas(container, orders, cardSelector, refreshUrl) {
+    if (!container || !orders || !orders.length) return;
+
+    let reload = false;
+    orders.forEach(delta => {
+        const card = container.querySelector(`${cardSelector}[data-group-id="${delta.group_id}"]`);
+        if (delta.action === 'remove') {
+            if (card) card.remove();
+        } else if (card) {
+            card.outerHTML = delta.html;
+        } else {
+            // New or newly visible order goes on top of the newest-first list
+            const first = container.querySelector(cardSelector);
+            if (first) {
+                first.insertAdjacentHTML('beforebegin', delta.html);
+            } else {
+                reload = true;
+            }
+        }
+    });
+
+    if (reload || !container.querySelector(cardSelector)) {
+        fetch(refreshUrl)
+            .then(response => response.text())
+            .then(html => { container.innerHTML = html; });
+    }
+}
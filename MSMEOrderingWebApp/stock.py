@@ -0,0 +1,91 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .catalog import bump_catalog_version
+from .models import Order, Products
+
+
+class InsufficientStock(Exception):
+    """`shortages` is a list of (line, available) for every line that could not be filled."""
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        super().__init__("Not enough stock for " + ", ".join(
+            f"{line.product_name} (available: {available})" for line, available in shortages
+        ))
+
+
+class _ShortStock(Exception):
+    pass
+
+
+def _quantities(lines):
+    wanted = defaultdict(int)
+    for line in lines:
+        if line.product_id:
+            wanted[line.product_id] += line.quantity
+    return wanted
+
+
+def _per_product(wanted):
+    return Case(*[When(pk=pk, then=Value(qty)) for pk, qty in wanted.items()], output_field=IntegerField())
+
+
+def reserve_stock(lines):
+    """
+    Take stock for every Cart/Checkout line of one order with a single
+    conditional UPDATE (stocks = stocks - q WHERE stocks >= q).
+
+    Either every tracked product is decremented or none is; InsufficientStock
+    names the lines that could not be filled. Untracked products and lines
+    without a product are skipped.
+    """
+    lines = list(lines)
+    wanted = _quantities(lines)
+    if not wanted:
+        return
+
+    quantity = _per_product(wanted)
+    tracked = Products.objects.filter(pk__in=wanted, track_stocks=True)
+
+    try:
+        with transaction.atomic():
+            updated = tracked.filter(stocks__gte=quantity).update(stocks=F('stocks') - quantity)
+            if updated < tracked.count():
+                raise _ShortStock
+    except _ShortStock:
+        short = dict(tracked.filter(stocks__lt=quantity).values_list('pk', 'stocks'))
+        raise InsufficientStock([(line, short[line.product_id]) for line in lines if line.product_id in short])
+
+    # ✅ .update() skips post_save; the catalog shows stocks
+    transaction.on_commit(bump_catalog_version)
+
+
+def release_stock(lines):
+    """Give back stock taken by reserve_stock for these lines."""
+    wanted = _quantities(lines)
+    if not wanted:
+        return
+
+    quantity = _per_product(wanted)
+    Products.objects.filter(pk__in=wanted, track_stocks=True).update(stocks=F('stocks') + quantity)
+    transaction.on_commit(bump_catalog_version)
+
+
+def consume_order_stock(group_id, lines):
+    """
+    Stock for an accepted order: already held since checkout, or taken now
+    for orders placed before checkout started holding stock.
+    """
+    with transaction.atomic():
+        if not Order.objects.filter(group_id=group_id, stock_reserved=True).update(stock_reserved=False):
+            reserve_stock(lines)
+
+
+def release_order_stock(group_id, lines):
+    """Return the stock held at checkout when an order is rejected or voided before acceptance."""
+    with transaction.atomic():
+        if Order.objects.filter(group_id=group_id, stock_reserved=True).update(stock_reserved=False):
+            release_stock(lines)
@@ -1,3 +1,989 @@
-from django.test import TestCase
+import asyncio
+import tempfile
+import uuid
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from smtplib import SMTPException
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.exceptions import ChannelFull
+from channels.testing import WebsocketCommunicator
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .consumers import ReportJobConsumer
+from .data_versions import data_version
+from .email_outbox import SENDING_TIMEOUT, enqueue_email, send_due_emails
+from .models import (
+    BusinessDetails, BusinessOwnerAccount, Cart, ChannelGroupMembership, ChannelMessage, Checkout, DailySalesRollup,
+    Order, OrderCodeSequence, OutboundEmail, ProductCategory, ProductDailySales, Products, ReportJob, User,
+)
+from .notification_counts import queue_order_notification
+from .notification_feed import decode_cursor, feed_page, owner_feed
+from .order_codes import _locked_next_number, _upsert_next_number, generate_order_code, next_order_number
+from .order_emails import render_order_status_email
+from .order_export import EXPORT_FIELDS, ExportError, export_filters, iter_export, iter_export_rows
+from .order_groups import orders_with_status
+from .order_transitions import InvalidTransition, order_status_changed, transition_order
+from .pg_channel_layer import PostgresChannelLayer
+from .report_cache import REPORT_DATA_VERSION
+from .sales_rollup import SETTLED_ORDERS_VERSION, rebuild_sales_rollups, record_order_outcome, top_products, units_sold
+from .stock import InsufficientStock
+from .utils import get_business_day
+
+# TestCase keeps each test in one transaction; the Postgres channel layer's
+# database_sync_to_async would close that connection under it
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+def make_product(name='Burger', price='50.00', stocks=10, **fields):
+    category, _ = ProductCategory.objects.get_or_create(name='Food')
+    return Products.objects.create(category=category, name=name, price=Decimal(price), stocks=stocks, **fields)
+
+
+def make_order(lines, status='pending', email='jo@example.com', order_code='PU001', **fields):
+    """An Order with one Checkout line per (product, quantity)."""
+    sub_total = sum(product.price * quantity for product, quantity in lines)
+    customer = dict(first_name='Jo', last_name='Cruz', contact_number='0917', address='Manila', email=email)
+    order = Order.objects.create(
+        group_id=uuid.uuid4(), order_code=order_code, sub_total=sub_total, order_type='pickup',
+        payment_method='cod', status=status, **customer, **fields,
+    )
+    for product, quantity in lines:
+        Checkout.objects.create(
+            order=order, group_id=order.group_id, order_code=order_code, product=product,
+            product_name=product.name, quantity=quantity, price=product.price * quantity,
+            sub_total=sub_total, order_type='pickup', payment_method='cod', status=status, **customer,
+        )
+    return order
+
+
+class TrackedFieldsTests(TestCase):
+    def test_changed_fields_lists_edited_tracked_fields_since_load(self):
+        product = Products.objects.get(pk=make_product(price='50.00', stocks=10).pk)
+
+        product.price = Decimal('55.00')
+        product.stocks = 10
+        product.name = 'Cheeseburger'  # not tracked
+
+        self.assertEqual(product.changed_fields(), {'price': (Decimal('50.00'), Decimal('55.00'))})
+        self.assertTrue(product.has_changed('price'))
+        self.assertFalse(product.has_changed('stocks'))
+
+        product.save()
+        self.assertEqual(product.changed_fields(), {})
+
+    def test_deferred_fields_are_not_reported(self):
+        product = Products.objects.only('id', 'price').get(pk=make_product().pk)
+
+        self.assertEqual(product.changed_fields(), {})
+        self.assertTrue(product.has_changed('stocks'))
+
+    def test_checkout_updated_at_moves_only_with_its_status(self):
+        order = make_order([(make_product(), 1)])
+        line = order.items.get()
+        Checkout.objects.filter(pk=line.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        line = Checkout.objects.get(pk=line.pk)
+        stamped = line.updated_at
+
+        line.quantity = 2
+        line.save()
+        self.assertEqual(Checkout.objects.get(pk=line.pk).updated_at, stamped)
+
+        line.status = 'accepted'
+        line.save()
+        self.assertGreater(Checkout.objects.get(pk=line.pk).updated_at, stamped)
+
+
+class OrdersWithStatusTests(TestCase):
+    def test_status_matches_whatever_case_was_stored(self):
+        burger = make_product()
+        preparing = make_order([(burger, 1)], status='Preparing')
+        make_order([(burger, 1)], status='preparing', order_code='PU002')
+        make_order([(burger, 1)], status='packed', order_code='PU003')
+
+        self.assertEqual(orders_with_status('preparing').count(), 2)
+        self.assertIn(preparing, orders_with_status('PREPARING'))
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class EmailOutboxTests(TestCase):
+    def test_enqueue_stores_a_pending_email(self):
+        outbound = enqueue_email('jo@example.com', 'Order accepted', html_body='<p>Accepted</p>')
+
+        self.assertEqual(outbound.status, 'pending')
+        self.assertEqual(outbound.attempts, 0)
+        self.assertTrue(outbound.body)  # plain-text fallback
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_send_delivers_due_emails(self):
+        enqueue_email('jo@example.com', 'Order accepted', html_body='<p>Accepted</p>')
+        enqueue_email('ann@example.com', 'Order rejected', html_body='<p>Rejected</p>')
+
+        self.assertEqual(send_due_emails(), (2, 0))
+
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ['ann@example.com', 'jo@example.com'])
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        self.assertFalse(OutboundEmail.objects.exclude(status='sent').exists())
+        self.assertEqual(send_due_emails(), (0, 0))
+
+    def test_emails_not_yet_due_wait(self):
+        outbound = enqueue_email('jo@example.com', 'Later')
+        OutboundEmail.objects.filter(pk=outbound.pk).update(next_attempt_at=timezone.now() + timedelta(minutes=5))
+
+        self.assertEqual(send_due_emails(), (0, 0))
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_failed_send_is_retried_with_backoff(self):
+        outbound = enqueue_email('jo@example.com', 'Order accepted')
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                        side_effect=SMTPException('mailbox unavailable')):
+            self.assertEqual(send_due_emails(), (0, 1))
+
+        outbound.refresh_from_db()
+        self.assertEqual(outbound.status, 'pending')
+        self.assertEqual(outbound.attempts, 1)
+        self.assertIn('mailbox unavailable', outbound.last_error)
+        self.assertGreater(outbound.next_attempt_at, timezone.now() + timedelta(seconds=50))
+
+        # Due again once the backoff has passed, and delivered this time
+        OutboundEmail.objects.filter(pk=outbound.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(send_due_emails(), (1, 0))
+        outbound.refresh_from_db()
+        self.assertEqual(outbound.status, 'sent')
+        self.assertEqual(outbound.attempts, 2)
+        self.assertEqual(outbound.last_error, '')
+
+    def test_email_fails_after_max_attempts(self):
+        outbound = enqueue_email('jo@example.com', 'Order accepted')
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                        side_effect=SMTPException('mailbox unavailable')):
+            for _ in range(3):
+                OutboundEmail.objects.filter(pk=outbound.pk).update(next_attempt_at=timezone.now())
+                send_due_emails(max_attempts=3)
+
+        outbound.refresh_from_db()
+        self.assertEqual(outbound.status, 'failed')
+        self.assertEqual(outbound.attempts, 3)
+        self.assertEqual(send_due_emails(max_attempts=3), (0, 0))
+
+    def test_crash_mid_batch_keeps_emails_already_sent(self):
+        first = enqueue_email('jo@example.com', 'Order accepted')
+        second = enqueue_email('ann@example.com', 'Order accepted')
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                        side_effect=[1, KeyboardInterrupt]):
+            with self.assertRaises(KeyboardInterrupt):
+                send_due_emails()
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.status, second.status), ('sent', 'sending'))
+
+        # Still claimed by the dead worker, then due again once the claim is stale
+        self.assertEqual(send_due_emails(), (0, 0))
+        OutboundEmail.objects.filter(pk=second.pk).update(locked_at=timezone.now() - SENDING_TIMEOUT - timedelta(seconds=1))
+        self.assertEqual(send_due_emails(), (1, 0))
+        self.assertEqual([m.to[0] for m in mail.outbox], ['ann@example.com'])
+
+
+class OrderStatusEmailTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_total_adds_up_the_line_totals(self):
+        order = make_order([(make_product(price='50.00'), 2), (make_product('Fries', price='30.00'), 1)])
+
+        _, html = render_order_status_email(order.order_code, 'accepted', order.items.all())
+
+        self.assertIn('₱130.00', html)
+
+    def test_rejection_reason_is_rendered_per_message(self):
+        order = make_order([(make_product(), 1)])
+
+        for reason in ('Out of buns', 'Closed early'):
+            _, html = render_order_status_email(order.order_code, 'rejected', order.items.all(), reason)
+            self.assertIn(reason, html)
+            self.assertIn('your order has been rejected', html)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class NotificationBatchTests(TestCase):
+    def setUp(self):
+        self.products = [make_product(name) for name in ('Burger', 'Fries', 'Cola')]
+
+    def test_report_version_is_bumped_once_per_transaction(self):
+        with mock.patch('MSMEOrderingWebApp.notification_counts.bump_data_version') as bump:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                order = make_order([(product, 1) for product in self.products])
+                order.items.all().delete()
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(sorted(call.args for call in bump.call_args_list), [
+            (SETTLED_ORDERS_VERSION,), (REPORT_DATA_VERSION,),
+        ])
+
+    def test_rolled_back_changes_are_not_broadcast(self):
+        with mock.patch('MSMEOrderingWebApp.notification_counts.broadcast_customer_count') as broadcast:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                with self.assertRaises(ValueError), transaction.atomic():
+                    queue_order_notification(email='ana@example.com', status='accepted')
+                    raise ValueError
+                queue_order_notification(email='ben@example.com', status='rejected')
+
+        self.assertEqual(len(callbacks), 1)
+        broadcast.assert_called_once_with('ben@example.com', 'rejected', [])
+
+
+class TransitionOrderTests(TestCase):
+    def setUp(self):
+        self.burger = make_product('Burger', stocks=10)
+        self.fries = make_product('Fries', price='30.00', stocks=5)
+
+    def test_accept_moves_every_line_and_the_header(self):
+        order = make_order([(self.burger, 2), (self.fries, 1)])
+
+        self.assertEqual(transition_order(order.group_id, 'accepted'), 2)
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'accepted')
+        self.assertEqual(set(order.items.values_list('status', flat=True)), {'accepted'})
+
+    def test_accept_takes_stock_for_orders_not_holding_any(self):
+        order = make_order([(self.burger, 2), (self.fries, 1)])
+
+        transition_order(order.group_id, 'accepted')
+
+        self.burger.refresh_from_db()
+        self.fries.refresh_from_db()
+        self.assertEqual((self.burger.stocks, self.fries.stocks), (8, 4))
+
+    def test_accept_keeps_stock_held_since_checkout(self):
+        order = make_order([(self.burger, 2)], stock_reserved=True)
+
+        transition_order(order.group_id, 'accepted')
+
+        self.burger.refresh_from_db()
+        order.refresh_from_db()
+        self.assertEqual(self.burger.stocks, 10)
+        self.assertFalse(order.stock_reserved)
+
+    def test_accept_without_enough_stock_changes_nothing(self):
+        order = make_order([(self.burger, 2), (self.fries, 6)])
+
+        with self.assertRaises(InsufficientStock):
+            transition_order(order.group_id, 'accepted')
+
+        self.burger.refresh_from_db()
+        order.refresh_from_db()
+        self.assertEqual(self.burger.stocks, 10)
+        self.assertEqual(order.status, 'pending')
+        self.assertEqual(set(order.items.values_list('status', flat=True)), {'pending'})
+
+    def test_reject_returns_stock_held_since_checkout(self):
+        order = make_order([(self.burger, 3)], stock_reserved=True)
+
+        transition_order(order.group_id, 'rejected', rejection_reason='Closed early')
+
+        self.burger.refresh_from_db()
+        order.refresh_from_db()
+        self.assertEqual(self.burger.stocks, 13)
+        self.assertEqual(order.status, 'rejected')
+        self.assertEqual(order.rejection_reason, 'Closed early')
+        self.assertFalse(order.stock_reserved)
+
+    def test_reject_without_held_stock_leaves_stock_alone(self):
+        order = make_order([(self.burger, 3)])
+
+        transition_order(order.group_id, 'rejected')
+
+        self.burger.refresh_from_db()
+        self.assertEqual(self.burger.stocks, 10)
+
+    def test_only_pending_orders_can_be_accepted_or_rejected(self):
+        order = make_order([(self.burger, 1)], status='accepted')
+
+        for status in ('accepted', 'rejected'):
+            with self.assertRaises(InvalidTransition):
+                transition_order(order.group_id, status)
+
+        self.burger.refresh_from_db()
+        self.assertEqual(self.burger.stocks, 10)
+
+    def test_orders_only_move_forward(self):
+        for current, status in [
+            ('pending', 'preparing'), ('Completed', 'preparing'), ('rejected', 'completed'),
+            ('Void', 'completed'), ('Completed', 'completed'), ('delivered', 'pending'), ('packed', 'delivered'),
+        ]:
+            order = make_order([(self.burger, 1)], status=current)
+            with self.subTest(current=current, status=status), self.assertRaises(InvalidTransition):
+                transition_order(order.group_id, status)
+            order.refresh_from_db()
+            self.assertEqual(order.status, current)
+            order.delete()
+
+    def test_forward_moves_match_stored_status_in_any_case(self):
+        order = make_order([(self.burger, 1), (self.fries, 1)], status='Preparing')
+
+        self.assertEqual(transition_order(order.group_id, 'Out for Delivery'), 2)
+        self.assertEqual(transition_order(order.group_id, 'delivered'), 2)
+        self.assertEqual(transition_order(order.group_id, 'Completed'), 2)
+        self.assertEqual(transition_order(order.group_id, 'Void', void_reason='returned'), 2)
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'Void')
+        self.assertEqual(set(order.items.values_list('status', flat=True)), {'Void'})
+
+    def test_unknown_status_field_or_order_is_rejected(self):
+        order = make_order([(self.burger, 1)])
+
+        with self.assertRaises(InvalidTransition):
+            transition_order(order.group_id, 'teleported')
+        with self.assertRaises(InvalidTransition):
+            transition_order(order.group_id, 'preparing', price=0)
+        with self.assertRaises(InvalidTransition):
+            transition_order(uuid.uuid4(), 'preparing')
+
+    def test_status_change_is_announced_once_after_commit(self):
+        order = make_order([(self.burger, 1), (self.fries, 1)], status='accepted')
+        received = []
+
+        def receiver(**kwargs):
+            received.append((kwargs['group_id'], kwargs['status']))
+
+        order_status_changed.connect(receiver)
+        self.addCleanup(order_status_changed.disconnect, receiver)
+        with self.captureOnCommitCallbacks(execute=True):
+            transition_order(order.group_id, 'preparing')
+
+        self.assertEqual(received, [(order.group_id, 'preparing')])
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class MarkAsDeliveredTests(TestCase):
+    def post(self, order_code, group_id):
+        proof = SimpleUploadedFile('proof.png', b'png', content_type='image/png')
+        return self.client.post('/mark-as-delivered/', {
+            'order_code': order_code, 'group_id': group_id, 'proof_delivery': proof,
+        })
+
+    def test_marks_the_order_delivered(self):
+        order = make_order([(make_product(), 1)], status='out for delivery')
+
+        response = self.post(order.order_code, order.group_id)
+
+        self.assertEqual(response.status_code, 302)
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'delivered')
+        self.assertTrue(order.proof_of_delivery.name)
+        self.assertEqual(set(order.items.values_list('status', flat=True)), {'delivered'})
+
+    def test_unknown_or_malformed_group_id_is_reported_not_raised(self):
+        order = make_order([(make_product(), 1)], status='out for delivery')
+
+        for group_id in (uuid.uuid4(), 'not-a-uuid'):
+            response = self.post(order.order_code, group_id)
+            self.assertEqual(response.status_code, 302)
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'out for delivery')
+
+    def test_rider_page_reads_delivery_details_from_the_order(self):
+        order = make_order([(make_product(), 1)], status='preparing')
+        transition_order(order.group_id, 'out for delivery', delivery_method='in_house', rider='Ben', eta_value=20, eta_unit='minutes')
+        make_order([(make_product('Fries'), 1)], status='preparing', order_code='PU002', delivery_method='third_party')
+
+        response = self.client.get(reverse('deliveryrider_home'))
+
+        self.assertEqual([group['order'] for group in response.context['delivery_orders']], [order])
+        self.assertContains(response, 'data-rider="Ben"')
+        self.assertContains(response, 'data-eta="20 minutes"')
+
+
+class AddToCartTests(TestCase):
+    def setUp(self):
+        # Same name and variation: only the posted id tells them apart
+        make_product('Burger', price='80.00', variation_name='Large')
+        self.burger = make_product('Burger', price='85.00', variation_name='Large')
+
+    def post(self, url, data):
+        return self.client.post(url, data, content_type='application/json')
+
+    def test_pos_line_is_the_posted_product(self):
+        response = self.post(reverse('pos_add_to_cart'), {
+            'product_id': self.burger.pk, 'product_name': 'Burger - Large', 'quantity': 2,
+        })
+
+        self.assertTrue(response.json()['success'])
+        line = Cart.objects.get()
+        self.assertEqual((line.product, line.quantity, line.unit_price), (self.burger, 2, Decimal('85.00')))
+
+    def test_customer_line_is_the_posted_product(self):
+        user = User.objects.create(
+            first_name='Jo', last_name='Cruz', contact_number='0917', email='jo@example.com',
+            address='1 Rizal St', city='Manila', province='NCR', zipcode='1000', password='x',
+        )
+        session = self.client.session
+        session.update({'user_id': user.pk, 'user_type': 'customer'})
+        session.save()
+
+        response = self.post(reverse('add_to_cart'), {
+            'product_id': self.burger.pk, 'product_name': 'Burger - Large', 'quantity': 1, 'price': '85.00',
+        })
+
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(Cart.objects.get().product, self.burger)
+
+    def test_unknown_product_is_reported(self):
+        response = self.post(reverse('pos_add_to_cart'), {'product_id': 0, 'product_name': 'Burger - Large', 'quantity': 1})
+
+        self.assertFalse(response.json()['success'])
+        self.assertFalse(Cart.objects.exists())
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class ReportJobAccessTests(TestCase):
+    def login(self, user_type):
+        session = self.client.session
+        session['user_type'] = user_type
+        session.save()
+
+    def test_job_status_needs_an_owner_or_cashier_session(self):
+        job = ReportJob.objects.create(report_type='sales', params={}, params_hash='x' * 64)
+        url = reverse('report_job_status', args=[job.pk])
+
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.login('customer')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.login('cashier')
+        self.assertEqual(self.client.get(url).json()['job']['id'], job.pk)
+
+    def test_socket_needs_an_owner_or_cashier_session(self):
+        async def connects(session):
+            communicator = WebsocketCommunicator(ReportJobConsumer.as_asgi(), '/ws/report-jobs/')
+            communicator.scope['session'] = session
+            connected, _ = await communicator.connect()
+            await communicator.disconnect()
+            return connected
+
+        self.assertFalse(async_to_sync(connects)({}))
+        self.assertFalse(async_to_sync(connects)({'user_type': 'customer'}))
+        self.assertTrue(async_to_sync(connects)({'user_type': 'owner'}))
+
+
+class OrderCodeTests(TestCase):
+    def setUp(self):
+        self.today = get_business_day()
+
+    def test_numbers_count_up_per_business_day_and_order_type(self):
+        self.assertEqual([generate_order_code('pickup') for _ in range(3)], ['PU001', 'PU002', 'PU003'])
+        self.assertEqual(generate_order_code('delivery'), 'DL001')
+        self.assertEqual(OrderCodeSequence.objects.get(business_day=self.today, order_type='pickup').last_number, 3)
+
+    def test_numbers_restart_on_the_next_business_day(self):
+        next_order_number('walkin', self.today)
+        next_order_number('walkin', self.today)
+
+        self.assertEqual(next_order_number('walkin', self.today + timedelta(days=1)), 1)
+        self.assertEqual(next_order_number('walkin', self.today), 3)
+
+    def test_business_day_matches_the_sales_rollup(self):
+        # Open overnight, 18:00 - 03:00; at 10:00 the new business day has already begun
+        BusinessDetails.objects.create(business_name='Shop', opening_time=time(18), closing_time=time(3))
+        cache.clear()
+        ten_am = timezone.make_aware(datetime.combine(self.today, time(10)))
+
+        with mock.patch('django.utils.timezone.now', return_value=ten_am):
+            next_order_number('pickup')
+
+        self.assertEqual(OrderCodeSequence.objects.get().business_day, get_business_day(ten_am))
+        self.assertEqual(get_business_day(ten_am), self.today)
+
+    def test_upsert_and_row_lock_share_one_sequence(self):
+        if connection.features.supports_update_conflicts_with_target and connection.features.can_return_columns_from_insert:
+            self.assertEqual(_upsert_next_number(self.today, 'pickup'), 1)
+            self.assertEqual(_upsert_next_number(self.today, 'pickup'), 2)
+        else:
+            next_order_number('pickup', self.today)
+            next_order_number('pickup', self.today)
+        self.assertEqual(_locked_next_number(self.today, 'pickup'), 3)
+
+    def test_rolled_back_order_gives_its_number_back(self):
+        with self.assertRaises(InsufficientStock):
+            with transaction.atomic():
+                generate_order_code('pickup')
+                raise InsufficientStock([])
+
+        self.assertEqual(generate_order_code('pickup'), 'PU001')
+
+
+class RecordOrderOutcomeTests(TestCase):
+    def setUp(self):
+        self.burger = make_product('Burger', price='50.00')
+        self.fries = make_product('Fries', price='30.00')
+        self.today = get_business_day(timezone.now())
+        # Cached data versions would outlive the rolled-back test transaction
+        cache.clear()
+
+    def set_status(self, order, status):
+        Order.objects.filter(pk=order.pk).update(status=status, updated_at=timezone.now())
+        record_order_outcome(order.group_id)
+
+    def rollup(self):
+        return DailySalesRollup.objects.get(business_day=self.today)
+
+    def product_sales(self):
+        return dict(ProductDailySales.objects.filter(business_day=self.today).values_list('product_name', 'quantity'))
+
+    def test_completed_order_is_counted_once(self):
+        order = make_order([(self.burger, 2), (self.fries, 1)])
+
+        self.set_status(order, 'completed')
+        record_order_outcome(order.group_id)
+
+        row = self.rollup()
+        self.assertEqual((row.completed_orders, row.items_sold, row.revenue), (1, 3, Decimal('130.00')))
+        self.assertEqual(row.by_payment_method['cod']['orders'], 1)
+        self.assertEqual(Decimal(row.by_payment_method['cod']['revenue']), Decimal('130'))
+        self.assertEqual(self.product_sales(), {'Burger': 2, 'Fries': 1})
+        order.refresh_from_db()
+        self.assertEqual((order.rollup_day, order.rollup_status), (self.today, 'completed'))
+
+    def test_orders_still_in_progress_are_not_counted(self):
+        order = make_order([(self.burger, 1)])
+
+        self.set_status(order, 'preparing')
+
+        self.assertFalse(DailySalesRollup.objects.exists())
+
+    def test_completed_then_void_moves_the_order(self):
+        order = make_order([(self.burger, 2)])
+        self.set_status(order, 'completed')
+
+        self.set_status(order, 'void')
+
+        row = self.rollup()
+        self.assertEqual((row.completed_orders, row.void_orders), (0, 1))
+        self.assertEqual((row.items_sold, row.revenue), (0, Decimal('0')))
+        self.assertEqual(row.by_payment_method, {})
+        self.assertEqual(self.product_sales(), {'Burger': 0})
+        order.refresh_from_db()
+        self.assertEqual(order.rollup_status, 'void')
+
+    def test_reopened_order_is_taken_back_out(self):
+        order = make_order([(self.burger, 1)])
+        self.set_status(order, 'completed')
+
+        self.set_status(order, 'preparing')
+
+        row = self.rollup()
+        self.assertEqual((row.completed_orders, row.revenue), (0, Decimal('0')))
+        order.refresh_from_db()
+        self.assertEqual((order.rollup_day, order.rollup_status), (None, ''))
+
+    def test_leaving_completed_invalidates_closed_period_reports(self):
+        order = make_order([(self.burger, 1)])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.set_status(order, 'completed')
+        before = data_version(SETTLED_ORDERS_VERSION)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.set_status(order, 'void')
+
+        self.assertNotEqual(data_version(SETTLED_ORDERS_VERSION), before)
+
+    def test_rebuild_matches_incremental_rollup(self):
+        kept = make_order([(self.burger, 2), (self.fries, 1)], order_code='PU001')
+        voided = make_order([(self.fries, 3)], order_code='PU002')
+        self.set_status(kept, 'completed')
+        self.set_status(voided, 'completed')
+        self.set_status(voided, 'void')
+        incremental = DailySalesRollup.objects.values().get(business_day=self.today)
+
+        rebuild_sales_rollups()
+
+        rebuilt = DailySalesRollup.objects.values().get(business_day=self.today)
+        fields = ['completed_orders', 'void_orders', 'items_sold', 'revenue', 'by_payment_method']
+        self.assertEqual({f: rebuilt[f] for f in fields}, {f: incremental[f] for f in fields})
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class ProductSalesTests(TestCase):
+    def setUp(self):
+        self.burger = make_product('Burger', price='50.00')
+        self.fries = make_product('Fries', price='30.00')
+        self.today = get_business_day(timezone.now())
+
+    def sell(self, product, quantity, days_ago=0):
+        ProductDailySales.objects.create(
+            business_day=self.today - timedelta(days=days_ago), product=product, product_name=product.name,
+            quantity=quantity, revenue=product.price * quantity,
+        )
+
+    def test_top_products_only_counts_days_in_the_window(self):
+        self.sell(self.burger, 1)
+        self.sell(self.fries, 2)
+        self.sell(self.burger, 5, days_ago=10)
+
+        week = top_products(self.today - timedelta(days=6), self.today)
+        self.assertEqual([(row['name'], row['quantity']) for row in week], [('Fries', 2), ('Burger', 1)])
+        all_time = top_products()
+        self.assertEqual([(row['name'], row['quantity']) for row in all_time], [('Burger', 6), ('Fries', 2)])
+        self.assertEqual(all_time[0]['revenue'], Decimal('300.00'))
+        self.assertEqual(top_products(self.today - timedelta(days=9), self.today - timedelta(days=8)), [])
+
+    def test_top_products_combines_variations(self):
+        large = make_product('Fries', price='45.00')
+        self.sell(self.fries, 2)
+        self.sell(large, 3, days_ago=1)
+
+        self.assertEqual([(row['name'], row['quantity']) for row in top_products(limit=1)], [('Fries', 5)])
+
+    def test_units_sold_reads_daily_sales_for_one_variation(self):
+        self.sell(self.burger, 2)
+        self.sell(self.burger, 4, days_ago=3)
+
+        self.assertEqual(units_sold(self.burger.pk), 6)
+        self.assertEqual(units_sold(self.fries.pk), 0)
+
+    def test_accepting_an_order_takes_stock_but_counts_no_sale_yet(self):
+        order = make_order([(self.burger, 2)])
+        session = self.client.session
+        session['user_type'] = 'owner'
+        session.save()
+
+        response = self.client.post(
+            reverse('update_order_status'),
+            {'order_code': order.order_code, 'group_id': str(order.group_id), 'status': 'accepted'},
+            content_type='application/json',
+        )
+
+        self.assertTrue(response.json()['success'])
+        self.assertFalse(ProductDailySales.objects.exists())
+        self.burger.refresh_from_db()
+        self.assertEqual(self.burger.stocks, 8)
+
+class OrderExportTests(TestCase):
+    def setUp(self):
+        burger = make_product()
+        for n in range(5):
+            make_order([(burger, 1)], status='completed' if n % 2 else 'rejected', order_code=f'PU00{n}')
+
+    def test_pages_cover_every_line_once_in_id_order(self):
+        # Three pages of two, then the empty page that ends it
+        with self.assertNumQueries(4):
+            rows = list(iter_export_rows(Checkout.objects.all(), page_size=2))
+
+        ids = [row[0] for row in rows]
+        self.assertEqual(ids, sorted(Checkout.objects.values_list('id', flat=True)))
+        self.assertEqual(len(rows[0]), len(EXPORT_FIELDS))
+
+    def test_filters_dates_inclusively_and_by_status(self):
+        Checkout.objects.filter(order_code='PU000').update(created_at=timezone.make_aware(datetime(2026, 1, 31, 23, 59)))
+        Checkout.objects.filter(order_code='PU001').update(created_at=timezone.make_aware(datetime(2026, 2, 1)))
+
+        january = export_filters(start='2026-01-01', end='2026-01-31')
+        self.assertEqual(list(january.values_list('order_code', flat=True)), ['PU000'])
+        self.assertEqual(export_filters(statuses=['completed', ' ']).count(), 2)
+        with self.assertRaises(ExportError):
+            export_filters(start='31/01/2026')
+
+    def test_csv_has_a_header_and_one_row_per_line(self):
+        chunks = list(iter_export(Checkout.objects.all(), 'csv'))
+
+        self.assertEqual(chunks[0].strip(), ','.join(EXPORT_FIELDS))
+        self.assertEqual(len(chunks), 6)
+        with self.assertRaises(ExportError):
+            iter_export(Checkout.objects.all(), 'xlsx')
+
+
+class FeedPageTests(TestCase):
+    def setUp(self):
+        burger = make_product('Burger')
+        start = timezone.now() - timedelta(hours=1)
+        # Two orders share a timestamp so the group_id tiebreak is exercised
+        moments = [start, start + timedelta(minutes=1), start + timedelta(minutes=1),
+                   start + timedelta(minutes=2), start + timedelta(minutes=3)]
+        self.orders = []
+        for n, moment in enumerate(moments):
+            order = make_order([(burger, 1)], order_code=f'PU{n:03d}')
+            Order.objects.filter(pk=order.pk).update(created_at=moment)
+            Checkout.objects.filter(order=order).update(created_at=moment)
+            order.refresh_from_db()
+            self.orders.append(order)
+        self.newest_first = [o.group_id for o in sorted(self.orders, key=lambda o: (o.created_at, o.group_id), reverse=True)]
+
+    def test_pages_cover_every_order_once_newest_first(self):
+        seen, cursor, pages = [], None, 0
+        while True:
+            entries, cursor = feed_page(owner_feed(), cursor, page_size=2)
+            seen += [entry['group_id'] for entry in entries]
+            pages += 1
+            if cursor is None:
+                break
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(seen, self.newest_first)
+
+    def test_page_is_not_shifted_by_newer_orders(self):
+        entries, cursor = feed_page(owner_feed(), page_size=2)
+        make_order([(make_product('Fries'), 1)], order_code='PU099')
+
+        older, _ = feed_page(owner_feed(), cursor, page_size=2)
+
+        self.assertEqual([entry['group_id'] for entry in older], self.newest_first[2:4])
+
+    def test_last_page_has_no_cursor(self):
+        entries, cursor = feed_page(owner_feed(), page_size=5)
+
+        self.assertEqual(len(entries), 5)
+        self.assertIsNone(cursor)
+
+    def test_only_feed_orders_are_listed(self):
+        Order.objects.filter(pk=self.orders[0].pk).update(status='accepted')
+
+        entries, _ = feed_page(owner_feed())
+
+        self.assertNotIn(self.orders[0].group_id, [entry['group_id'] for entry in entries])
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            decode_cursor('not-a-cursor')
+
+        response = self.client.get('/partial/pending-orders/older/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'PostgresChannelLayer needs a PostgreSQL database')
+class PostgresChannelLayerTests(TransactionTestCase):
+    """Two layer instances stand in for two daphne processes sharing the database."""
+
+    def run_layers(self, check, **options):
+        async def run():
+            sender, receiver = PostgresChannelLayer(**options), PostgresChannelLayer(**options)
+            try:
+                await check(sender, receiver)
+            finally:
+                await sender.close()
+                await receiver.close()
+                # The layer's queries ran on the sync thread; let the test database go
+                await sync_to_async(connections.close_all)()
+
+        asyncio.run(run())
+
+    def test_group_send_reaches_every_member(self):
+        async def check(sender, receiver):
+            first, second = await receiver.new_channel(), await receiver.new_channel()
+            await receiver.group_add('orders', first)
+            await receiver.group_add('orders', second)
+
+            await sender.group_send('orders', {'type': 'order.update', 'n': 1})
+
+            for channel in (first, second):
+                message = await asyncio.wait_for(receiver.receive(channel), 5)
+                self.assertEqual(message, {'type': 'order.update', 'n': 1})
+
+        self.run_layers(check)
+
+    def test_messages_arrive_in_order(self):
+        async def check(sender, receiver):
+            channel = await receiver.new_channel()
+            await receiver.group_add('orders', channel)
+
+            for n in range(5):
+                await sender.group_send('orders', {'type': 'order.update', 'n': n})
+
+            received = [(await asyncio.wait_for(receiver.receive(channel), 5))['n'] for _ in range(5)]
+            self.assertEqual(received, list(range(5)))
+
+        self.run_layers(check)
+
+    def test_discarded_channel_gets_nothing(self):
+        async def check(sender, receiver):
+            gone, staying = await receiver.new_channel(), await receiver.new_channel()
+            await receiver.group_add('orders', gone)
+            await receiver.group_add('orders', staying)
+            await receiver.group_discard('orders', gone)
+
+            await sender.group_send('orders', {'type': 'order.update'})
+
+            await asyncio.wait_for(receiver.receive(staying), 5)
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(receiver.receive(gone), 0.5)
+
+        self.run_layers(check)
+
+    def test_send_to_a_specific_channel(self):
+        async def check(sender, receiver):
+            channel = await receiver.new_channel()
+
+            await sender.send(channel, {'type': 'print.job', 'order': 'PU001'})
+
+            message = await asyncio.wait_for(receiver.receive(channel), 5)
+            self.assertEqual(message, {'type': 'print.job', 'order': 'PU001'})
+
+        self.run_layers(check)
+
+    def test_send_beyond_capacity_raises_channel_full(self):
+        async def check(sender, receiver):
+            channel = await receiver.new_channel()
+            await sender.send(channel, {'type': 'print.job'})
+
+            with self.assertRaises(ChannelFull):
+                await sender.send(channel, {'type': 'print.job'})
+
+        self.run_layers(check, capacity=1)
+
+    def test_expired_rows_are_swept_under_steady_traffic(self):
+        expired = timezone.now() - timedelta(minutes=1)
+        ChannelMessage.objects.create(inbox='gone', channel='gone', message='{}', expires_at=expired)
+        ChannelGroupMembership.objects.create(group='orders', channel='gone', expires_at=expired)
+
+        async def check(sender, receiver):
+            channel = await receiver.new_channel()
+            # A message every 50ms never leaves the listener idle for a whole interval
+            for _ in range(20):
+                await sender.send(channel, {'type': 'print.job'})
+                await asyncio.wait_for(receiver.receive(channel), 5)
+                await asyncio.sleep(0.05)
+
+        with mock.patch('MSMEOrderingWebApp.pg_channel_layer.SWEEP_INTERVAL', 0.3):
+            self.run_layers(check)
+
+        self.assertFalse(ChannelMessage.objects.filter(channel='gone').exists())
+        self.assertFalse(ChannelGroupMembership.objects.filter(channel='gone').exists())
+
+
+class MetricsViewTests(TestCase):
+    REMOTE = {'REMOTE_ADDR': '203.0.113.5'}
+
+    @override_settings(METRICS_TOKEN='')
+    def test_without_a_token_only_localhost_and_the_owner_may_read(self):
+        self.assertEqual(self.client.get('/metrics', **self.REMOTE).status_code, 403)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='127.0.0.1').status_code, 200)
+
+        owner = BusinessOwnerAccount.objects.create(email='owner@example.com', password='x', first_login2=False)
+        cache.clear()
+        session = self.client.session
+        session['owner_id'] = owner.id
+        session.save()
+        self.assertEqual(self.client.get('/metrics', **self.REMOTE).status_code, 200)
+
+    @override_settings(METRICS_TOKEN='scrape-me')
+    def test_token_is_required_when_set(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='127.0.0.1').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong', **self.REMOTE).status_code, 403)
+
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-me', **self.REMOTE)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('# TYPE http_requests_total counter', response.content.decode())
+
+
+class MigrationTestCase(TransactionTestCase):
+    """Rows are created at `migrate_from`, then `migrate_to` runs over them."""
+    migrate_from = migrate_to = None
+
+    def setUp(self):
+        self.addCleanup(call_command, 'migrate', 'MSMEOrderingWebApp', verbosity=0)
+        self.apps = self.migrate(self.migrate_from)
+
+    def migrate(self, target):
+        call_command('migrate', 'MSMEOrderingWebApp', target, verbosity=0)
+        return MigrationExecutor(connection).loader.project_state(('MSMEOrderingWebApp', target)).apps
+
+    def run_migration(self):
+        self.apps = self.migrate(self.migrate_to)
+
+    def line(self, model_name, **fields):
+        """A Cart/Checkout row of the historical model, customer fields filled in."""
+        defaults = dict(first_name='Jo', last_name='Cruz', contact_number='0917', address='Manila', email='jo@example.com',
+                        quantity=1, price=Decimal('50.00'))
+        if model_name == 'Checkout':
+            defaults.update(sub_total=Decimal('50.00'), order_type='pickup', payment_method='cod')
+        return self.apps.get_model('MSMEOrderingWebApp', model_name).objects.create(**{**defaults, **fields})
+
+
+class UnifyWalkinGroupsMigrationTests(MigrationTestCase):
+    migrate_from = '0001_initial'
+    migrate_to = '0002_unify_walkin_group_ids'
+
+    def test_walkin_lines_of_one_order_share_a_group(self):
+        today, yesterday = timezone.now(), timezone.now() - timedelta(days=1)
+        first = self.line('Checkout', product_name='Burger', order_code='WI001', order_type='walkin', created_at=today)
+        second = self.line('Checkout', product_name='Fries', order_code='WI001', order_type='walkin', created_at=today)
+        older = self.line('Checkout', product_name='Cola', order_code='WI001', order_type='walkin', created_at=yesterday)
+        pickup = self.line('Checkout', product_name='Cola', order_code='WI001', created_at=today)
+
+        self.run_migration()
+
+        group_ids = dict(self.apps.get_model('MSMEOrderingWebApp', 'Checkout').objects.values_list('id', 'group_id'))
+        self.assertEqual(group_ids[second.id], first.group_id)
+        self.assertEqual(group_ids[older.id], older.group_id)
+        self.assertEqual(group_ids[pickup.id], pickup.group_id)
+        self.assertNotEqual(older.group_id, first.group_id)
+
+
+class BackfillOrdersMigrationTests(MigrationTestCase):
+    migrate_from = '0003_order_header'
+    migrate_to = '0004_backfill_orders'
+
+    def test_one_order_per_group_from_its_first_line(self):
+        group_id = uuid.uuid4()
+        self.line('Checkout', product_name='Burger', group_id=group_id, order_code='DL001', order_type='delivery',
+                  status='Out for Delivery', rider='Ben', delivery_fee=Decimal('40.00'))
+        self.line('Checkout', product_name='Fries', group_id=group_id, order_code='DL001', order_type='delivery',
+                  status='Out for Delivery', rider='Ben', delivery_fee=Decimal('40.00'))
+        other = self.line('Checkout', product_name='Cola', order_code='PU001', status='rejected', rejection_reason='Closed')
+
+        self.run_migration()
+
+        Order = self.apps.get_model('MSMEOrderingWebApp', 'Order')
+        Checkout = self.apps.get_model('MSMEOrderingWebApp', 'Checkout')
+        self.assertEqual(Order.objects.count(), 2)
+        order = Order.objects.get(group_id=group_id)
+        self.assertEqual(
+            (order.order_code, order.order_type, order.status, order.rider, order.delivery_fee),
+            ('DL001', 'delivery', 'Out for Delivery', 'Ben', Decimal('40.00')),
+        )
+        self.assertEqual(Order.objects.get(group_id=other.group_id).rejection_reason, 'Closed')
+        self.assertEqual(set(Checkout.objects.filter(group_id=group_id).values_list('order_id', flat=True)), {order.id})
+        self.assertFalse(Checkout.objects.filter(order__isnull=True).exists())
+
+
+class BackfillLineItemProductsMigrationTests(MigrationTestCase):
+    migrate_from = '0007_line_item_product'
+    migrate_to = '0008_backfill_line_item_products'
+
+    def product(self, name, variation_name, price):
+        category, _ = self.apps.get_model('MSMEOrderingWebApp', 'ProductCategory').objects.get_or_create(name='Food')
+        return self.apps.get_model('MSMEOrderingWebApp', 'Products').objects.create(
+            category=category, name=name, variation_name=variation_name, price=Decimal(price),
+        )
+
+    def test_lines_are_linked_by_their_display_name(self):
+        small = self.product('Ember Lulu', 'Small', '100.00')
+        self.product('Ember Lulu', 'Small', '120.00')  # a later duplicate
+        fries = self.product('Fries', 'Default', '30.00')
+        cart = self.line('Cart', product_name='ember lulu - small (₱100.00)')
+        line = self.line('Checkout', product_name='Fries')
+        unknown = self.line('Checkout', product_name='Halo-halo - Large')
+
+        self.run_migration()
+
+        Cart = self.apps.get_model('MSMEOrderingWebApp', 'Cart')
+        Checkout = self.apps.get_model('MSMEOrderingWebApp', 'Checkout')
+        cart = Cart.objects.get(pk=cart.pk)
+        self.assertEqual((cart.product_id, cart.unit_price), (small.id, Decimal('100.00')))
+        line = Checkout.objects.get(pk=line.pk)
+        self.assertEqual((line.product_id, line.unit_price), (fries.id, None))
+        self.assertIsNone(Checkout.objects.get(pk=unknown.pk).product_id)
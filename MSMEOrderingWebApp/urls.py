@@ -61,6 +61,8 @@ urlpatterns = [
     path('pos/place-order/', views.pos_place_order, name='pos_place_order'),
     path('business/pending-orders/', views.partial_pending_orders, name='partial_pending_orders'),
     path('partial/pending-orders/', views.partial_pending_orders, name='partial_pending_orders'),
+    path('partial/pending-orders/older/', views.older_pending_orders, name='older_pending_orders'),
+    path('partial/customer-notifications/older/', views.older_customer_notifications, name='older_customer_notifications'),
     path('partial/customer-notifications/', views.partial_customer_notifications, name='partial_customer_notifications'),
     path('update-order-status/', views.update_order_status, name='update_order_status'),
     path('partial/customer-notifications/', views.partial_customer_notifications, name='partial_customer_notifications'),
@@ -82,6 +84,8 @@ urlpatterns = [
     path('reject-order/<str:order_code>/', views.reject_order, name="reject_order"),
 
     path("reports/sales/", views.sales_report_pdf, name="sales_report_pdf"),
+    path("reports/jobs/<int:job_id>/", views.report_job_status, name="report_job_status"),
+    path("reports/export/", views.export_orders, name="export_orders"),
 
     path('reset_customization/', views.reset_customization, name='reset_customization'),
     path("upload-logo/", views.upload_logo, name="upload_logo"),
@@ -1,23 +1,144 @@
-def get_or_create_customization():
-    # Your logic here, e.g.:
-    from .models import CustomizationSettings
-    obj, _ = CustomizationSettings.objects.get_or_create(id=1)
-    return obj
-
 from datetime import datetime, timedelta
+
+from django.core.cache import cache
 from django.utils import timezone
-from .models import BusinessDetails
+from .data_versions import bump_data_version, data_version
+from .models import BusinessDetails, BusinessOwnerAccount, Customization
+
+SITE_CONFIG_VERSION = "site_config"
+SITE_CONFIG_KEY = "site_config:{name}:{version}"
+
+
+def site_config_version():
+    """Changes whenever Customization, BusinessDetails or the owner account is saved (see signals)."""
+    return data_version(SITE_CONFIG_VERSION)
+
+
+def invalidate_site_config():
+    bump_data_version(SITE_CONFIG_VERSION)
+
+
+def _cached(name, loader):
+    """Read-through cache for a site configuration value; None is cached too."""
+    key = SITE_CONFIG_KEY.format(name=name, version=site_config_version())
+    entry = cache.get(key)
+    if entry is None:
+        entry = {"value": loader()}
+        cache.set(key, entry, None)
+    return entry["value"]
+
+
+def _load_customization():
+    # Fetch customization settings or create default if not found
+    customization, created = Customization.objects.get_or_create(id=1)
+
+    # If newly created, assign default values
+    if created:
+        customization.general_background_type = 'solid'
+        customization.general_solid_color = '#ffffff'
+        customization.general_gradient_color_1 = '#ffffff'
+        customization.general_gradient_color_2 = '#000000'
+        customization.general_gradient_color_3 = None
+        customization.general_gradient_direction = 'to right'
+        customization.general_radial_shape = None
+        customization.general_radial_position = None
+
+        # Login background settings
+        customization.login_background_type = 'solid'
+        customization.login_solid_color = '#ffffff'
+        customization.login_gradient_color_1 = '#ffffff'
+        customization.login_gradient_color_2 = '#000000'
+        customization.login_gradient_color_3 = None
+        customization.login_gradient_direction = 'to right'
+        customization.login_radial_shape = None
+        customization.login_radial_position = None
+
+        # Register background settings
+        customization.register_background_type = 'solid'
+        customization.register_solid_color = '#ffffff'
+        customization.register_gradient_color_1 = '#ffffff'
+        customization.register_gradient_color_2 = '#000000'
+        customization.register_gradient_color_3 = None
+        customization.register_gradient_direction = 'to right'
+        customization.register_radial_shape = None
+        customization.register_radial_position = None
+
+        # Navigation background settings
+        customization.navigation_background_type = 'solid'
+        customization.navigation_solid_color = '#ffffff'
+        customization.navigation_gradient_color_1 = '#ffffff'
+        customization.navigation_gradient_color_2 = '#000000'
+        customization.navigation_gradient_color_3 = None
+        customization.navigation_gradient_direction = 'to right'
+        customization.navigation_radial_shape = None
+        customization.navigation_radial_position = None
+
+        # Navigation text, hover, and border color settings
+        customization.navigation_text_color = '#000000'
+        customization.navigation_hover_color = '#a8a8a8'
+        customization.navigation_border_color = '#cccccc'
+
+        # Font settings
+        customization.header_font_family = 'Arial'
+        customization.header_font_size = 24
+        customization.header_font_color = '#000000'
+        customization.header_font_style = 'normal'
+
+        # Body font settings
+        customization.body_font_family = 'Arial'
+        customization.body_font_size = 16
+        customization.body_font_color = '#000000'
+
+        # New Fields - Default Values Added
+        customization.input_rounded_corner = 1  # Default rounded corner for input fields
+        customization.primary_color = "#000000"  # Default primary color
+        customization.secondary_color = "#424242"  # Default secondary color
+        customization.accent_color = "#303030"  # Default accent color
+        customization.button_rounded_corner = 1  # Default rounded corner for buttons
+        customization.button_text_color = '#ffffff'
+        customization.input_border_width = 1
+        customization.input_border_style = 'solid'
+
+        # Homepage image defaults (optional: you may point to a default image path or leave blank)
+        customization.homepage_image_1 = None
+        customization.homepage_image_2 = None
+        customization.homepage_image_3 = None
+        customization.homepage_image_4 = None
+        customization.homepage_image_5 = None
+        
+        # Save the default customization settings
+        customization.save()
+
+    return customization
+
+
+
+def get_or_create_customization():
+    return _cached("customization", _load_customization)
+
+
+def get_business_details():
+    return _cached("business", lambda: BusinessDetails.objects.first())
+
+
+def owner_requires_setup(owner_id):
+    """True while the owner still has to finish the first-login settings (first_login2)."""
+    return _cached(
+        f"owner_setup:{owner_id}",
+        lambda: BusinessOwnerAccount.objects.filter(id=owner_id, first_login2=True).exists()
+    )
+
+def get_business_day_range(moment=None):
+    """The (start, end) of the business day `moment` (default: now) falls in."""
+    business = get_business_details()
+    now = timezone.localtime(moment) if moment else timezone.localtime()
 
-def get_business_day_range():
-    business = BusinessDetails.objects.first()
     if not business or not business.opening_time or not business.closing_time:
         # fallback to calendar day
-        today = timezone.localtime()
-        start = today.replace(hour=0, minute=0, second=0, microsecond=0)
+        start = now.replace(hour=0, minute=0, second=0, microsecond=0)
         end = start + timedelta(days=1)
         return start, end
 
-    now = timezone.localtime()
     today = now.date()
 
     opening_time = business.opening_time
@@ -36,3 +157,8 @@ def get_business_day_range():
         end -= timedelta(days=1)
 
     return start, end
+
+
+def get_business_day(moment=None):
+    """The date a business day is filed under: the day it opened."""
+    return get_business_day_range(moment)[0].date()
@@ -1,7 +1,7 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from .models import OTP, BusinessOwnerAccount, User, Products, ProductCategory, OnlinePaymentDetails, BusinessDetails, StaffAccount, ArchivedProducts, ProductEditHistory
 from django.contrib import messages
-from django.db.models import Min, Max
+from django.db.models import Min, Max, Prefetch
 from collections import defaultdict
 from django.core.serializers.json import DjangoJSONEncoder
 from django.http import JsonResponse
@@ -10,11 +10,11 @@ import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from django.utils.http import urlencode
-from secrets import token_urlsafe
+from secrets import compare_digest, token_urlsafe
 from urllib.parse import urlencode
 from .decorators import login_required_session
 from django.http import JsonResponse
-from .models import Cart, Checkout
+from .models import Cart, Checkout, Order, ReportJob
 import json
 import re
 from django.views.decorators.csrf import csrf_exempt
@@ -29,18 +29,39 @@ from django.views.decorators.csrf import csrf_exempt
 from datetime import time
 from django.utils.timezone import make_aware, now
 from datetime import datetime, timedelta, time, date
-from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 from django.template.loader import render_to_string
 from django.http import HttpResponse
-from django.http import HttpResponseForbidden
-from .utils import get_or_create_customization
+from django.http import HttpResponseForbidden, StreamingHttpResponse
+from .utils import get_or_create_customization, get_business_details
 from django.utils.timezone import make_aware, localtime, get_current_timezone
 from django.shortcuts import redirect
 from django.urls import resolve, reverse
 from escpos.printer import Usb
-from .utils import get_business_day_range
+from .utils import get_business_day_range, get_business_day
+from .order_groups import ONGOING_STATUSES, orders_with_status, paginate_orders
+from .notification_feed import feed_page, owner_feed, customer_feed
+from .notification_counts import broadcast_owner_counts, refresh_customer_count
+from .order_transitions import transition_order, InvalidTransition
+from django.core.exceptions import ValidationError
+from .email_outbox import enqueue_email
+from .order_emails import render_order_status_email
+from .shop_status import broadcast_shop_status
+from .catalog import get_catalog, best_sellers, BEST_SELLER_DAYS
+from .line_items import products_for
+from .stock import reserve_stock, InsufficientStock
+from .order_codes import generate_order_code
+from .sales_rollup import record_order_outcome, day_totals, recent_days, top_products, units_sold
+from .report_jobs import request_report, report_job_payload, REPORT_USER_TYPES
+from .order_export import export_filters, iter_export, ExportError, EXPORT_FORMATS
+from .metrics import render_metrics, group_send
+from .report_queries import (
+    sales_metrics, iter_completed_orders, order_metrics, iter_order_details,
+    inventory_metrics, iter_inventory_by_category, product_metrics,
+    report_period, report_days,
+)
 import uuid
+import logging
 
 from django.utils.timezone import make_aware
 from datetime import datetime, timedelta
@@ -50,23 +71,27 @@ from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
-from django.utils.timezone import localdate
-from django.db.models import F
+from django.db.models import Sum
+from django.db import transaction
+from decimal import Decimal, InvalidOperation
 from django.core.mail import EmailMultiAlternatives
 from django.conf import settings as django_settings
 
+logger = logging.getLogger(__name__)
+
 @csrf_exempt
 def toggle_shop_status(request):
-    business = BusinessDetails.objects.first()  # adjust if multi-business
-
     if request.method == "POST":
-        # Toggle forced closed
+        # Toggle forced closed (read the live row; saving invalidates the cache)
+        business = BusinessDetails.objects.first()  # adjust if multi-business
         business.force_closed = not business.force_closed
         business.save()
+        broadcast_shop_status(business)  # ✅ customer pages update instantly
         return JsonResponse({"force_closed": business.force_closed})
 
     elif request.method == "GET":
         # Return current force_closed status
+        business = get_business_details()
         return JsonResponse({"force_closed": business.force_closed})
 
     return JsonResponse({"error": "Invalid request"}, status=400)
@@ -118,7 +143,7 @@ def print_receipt(order, orders):
         p.text("Thank you!\n\n")
         p.cut()
     except Exception as e:
-        print("Failed to print receipt:", e)
+        logger.warning("Failed to print receipt: %s", e)
 
 def notifications_redirect(request):
     user_type = request.session.get('user_type')
@@ -143,133 +168,10 @@ def notifications_redirect(request):
         return redirect('login')  # fallback if session is missing or unknown
     
 def send_order_status_email(recipient_email, order_code, status, orders, rejection_reason=None):
-    # Get customization settings
-    customization = get_or_create_customization()
-    business = BusinessDetails.objects.first()
-
-    # Prepare subject
-    subject = f"Your order has been {status.capitalize()}"
-
-    # Generate item lines dynamically from the passed 'orders' list
-    item_lines = []
-    total_price = sum(order.price * order.quantity for order in orders)
-    item_list = "\n".join([f"<tr><td style='padding: 10px; text-align: left;'>{order.product_name} (x{order.quantity})</td><td style='padding: 10px; text-align: right;'>₱{order.price:.2f}</td></tr>" for order in orders])
-
-    # Message Content Based on Status
-    message_content = ""
-    if status.lower() == "rejected":
-        message_content = f"""
-        <p style="font-size: 16px; color: #8B0000; font-weight: bold; line-height: 1.6;">Reason for rejection: <span style="font-size: 16px; color: #888;">{rejection_reason}</span></p>
-        <p style="font-size: 14px; color: #d9534f; margin: 0;">We're sorry, but your order has been rejected.</p>
-        <p style="font-size: 14px; color: #333; margin-top: 2 px;">Please review your order details, correct any errors, and try submitting a new order.</p>
-        """
-    elif status.lower() == "accepted":
-        message_content = f"""
-        <p style="padding-left: 20px; padding-right:20px; font-size: 15px; color: #555; font-weight: bold; line-height: 1.6;">Good news! Your order has been accepted and is being processed.</p>
-        <p style="padding-left: 20px; padding-right:20px; font-size: 13px; color: #555; margin-top: 2px;">We are working to get your order ready for shipment. Stay tuned for updates.</p>
-        """
-    elif status == "Preparing":
-        message_content = f"""
-        <p style="padding-left: 20px; padding-right:20px; font-size: 15px; color: #555; font-weight: bold; line-height: 1.6;">Your order is now being prepared!</p>
-        <p style="padding-left: 20px; padding-right:20px; font-size: 13px; color: #555; margin-top: 2px;">We are preparing your orders and getting them ready for packing.</p>
-        """
-    elif status == "Packed":
-        message_content = f"""
-        <p style="padding-left: 20px; padding-right:20px; font-size: 15px; color: #555; font-weight: bold; line-height: 1.6;">Your order has been packed!</p>
-        """
-    elif status == "Ready for Pickup":
-        message_content = f"""
-        <p style="padding-left: 20px; padding-right:20px; font-size: 15px; color: #555; margin-top: 2px;">Your order is now ready for you to pick up at the store location. Please bring a valid ID or show this email including your order code.</p>
-        """
-    elif status == "Out for Delivery":
-        message_content = f"""
-        <p style="padding-left: 20px; padding-right:20px; font-size: 14px; color: #333; margin-top: 10px;">Your order is on its way and should reach you soon! If you have any questions, feel free to reach out.</p>
-        """
-    elif status == "Completed":
-        message_content = f"""
-        <p style="font-size: 15px; color: #008000; font-weight: bold; line-height: 1.6;">Your order has been successfully completed!</p>
-        <p style="font-size: 13px; color: #333; margin-top: 10px;">Thank you for shopping with us. We hope you love your purchase! Please feel free to reach out for any future needs.</p>
-        """
-    else:
-        message_content = f"""
-        <p style="font-size: 15px; color: #333; line-height: 1.6;">Your order status is now {status}.</p>
-        <p style="font-size: 13px; color: #333; margin-top: 10px;">We will notify you once there are any changes or updates regarding your order.</p>
-        """
+    subject, body = render_order_status_email(order_code, status, orders, rejection_reason)
 
-    # Build the body of the email
-    body = f"""
-    <html>
-        <body style="font-family: Arial, sans-serif; margin: 0; padding: 0; color: #333;">
-            <div style="width: 100%; height: 100%; padding: 40px 0;">
-                <table align="center" width="700" style="border-collapse: collapse; background: #ffffff; border-radius: 12px; box-shadow: 0 4px 20px rgba(0, 0, 0, 0.08); margin: 0 auto;">
-                    <tr>
-                        <td align="center" style="padding: 40px; background: linear-gradient(135deg, {customization.primary_color} 0%, {customization.accent_color} 100%); border-top-left-radius: 12px; border-top-right-radius: 12px;">
-                            <h1 style="font-size: 28px; font-weight: bold; color: {customization.button_text_color}; margin: 0;">Order Update Notification</h1>
-                        </td>
-                    </tr>
-                    <tr>
-                        <td style="padding: 30px; text-align: center; font-size: 18px; line-height: 1.6; color: #555;">
-                            <p style="font-size: 16px; color: #333; margin-bottom: 20px;">
-                              Your order with code <span style="color: {customization.primary_color}; font-weight: bold;">{order_code}</span> has been <span style="color: #8B0000; font-weight: bold; text-transform: uppercase;">{status}</span>.
-                            </p>
-                            {message_content}
-                            <p style="margin-top: 5px; font-size: 16px; color: #333;">Here are the items in your order:</p>
-                            <table align="center" width="100%" style="border-collapse: collapse; margin-top: 20px; font-size: 14px; color: #333;">
-                                <thead>
-                                    <tr style="background-color: #f0f0f0;">
-                                        <th style="padding: 10px; text-align: left;">Item</th>
-                                        <th style="padding: 10px; text-align: right;">Price</th>
-                                    </tr>
-                                </thead>
-                                <tbody>{item_list}</tbody>
-                            </table>
-                            <div style="font-size: 16px; color: #333; margin-top: 3px;">
-                                <p><strong>Total: </strong>₱{total_price:.2f}</p>
-                            </div>
-                        </td>
-                    </tr>
-
-                    <!-- Footer Section (this will always show) -->
-                    <tr>
-                        <td style="padding: 20px; background-color: #f5f5f5; text-align: center; border-bottom-left-radius: 12px; border-bottom-right-radius: 12px;">
-                            <p style="font-size: 14px; color: #333; margin: 0;">Thank you for shopping with us!</p>
-                            <div style="font-size: 14px; color: #495057; margin-bottom: 10px; line-height: 1.5; text-align: center;">
-                                <div style="display: inline-flex; justify-content: center">
-                                    <p style="margin: 5px 10px 0 0; display: inline-flex; align-items: center;">
-                                        <strong>✉️ Email:</strong> 
-                                        <a href="mailto:{business.email_address}" style="color: {customization.primary_color}; text-decoration: none; margin-left: 5px;">
-                                            {business.email_address}
-                                        </a>
-                                    </p>
-                                    <p style="margin: 5px 10px 0 0; display: inline-flex; align-items: center;">
-                                        <strong>📞 Contact:</strong> {business.contact_number}
-                                    </p>
-                                </div>
-                                <div>
-                                    <p style="margin: 5px 0;"><strong>📍 Address:</strong> {business.store_address}</p>
-                                </div>
-                            </div>
-                            <p style="font-size: 12px; color: #888; margin-top: 10px;">- {business.business_name}</p>
-                        </td>
-                    </tr>
-                </table>
-            </div>
-        </body>
-    </html>
-    """
-
-    try:
-        email = EmailMultiAlternatives(
-            subject=subject,
-            body="This is an HTML email. Please use an HTML-compatible client.",
-            from_email=django_settings.EMAIL_HOST_USER,
-            to=[recipient_email],
-        )
-        email.attach_alternative(body, "text/html")
-        email.send()
-        print(f"✅ Email sent to {recipient_email}")
-    except Exception as e:
-        print(f"❌ Failed to send email: {e}")
+    # ✅ Queued; the send_queued_emails worker delivers it
+    enqueue_email(recipient_email, subject, html_body=body)
 
 @csrf_exempt
 def update_order_status(request):
@@ -285,31 +187,35 @@ def update_order_status(request):
         # Filter orders based on order_code and group_id
         orders = Checkout.objects.filter(order_code=order_code, group_id=group_id)
 
-        if not orders.exists():
-            return JsonResponse({"success": False, "error": "Order not found"})
-
         # Restrict "accepted" update to only pending orders
         if status == "accepted":
             orders = orders.filter(status="pending")
-            if not orders.exists():
+
+        orders = list(orders)  # ✅ load the lines once (email, print job, stock)
+        if not orders:
+            if status == "accepted":
                 return JsonResponse({"success": False, "error": "No pending orders to accept"})
+            return JsonResponse({"success": False, "error": "Order not found"})
 
-        reference_order = orders.first()
+        reference_order = orders[0]
         customer_email = reference_order.email
 
-        # Update status for all matching orders
+        # ✅ One UPDATE for the whole order group (accepting also takes the stock)
+        try:
+            transition_order(group_id, status, order_code=order_code)
+        except InvalidTransition as e:
+            return JsonResponse({"success": False, "error": str(e)})
+        except InsufficientStock as e:
+            return JsonResponse({"success": False, "error": str(e), "shortages": stock_shortages(e)})
         for order in orders:
             order.status = status
-            order.save()
 
         # Send email to customer
         send_order_status_email(customer_email, order_code, status, orders)
 
-        channel_layer = get_channel_layer()
-
         if status == "accepted":
             # Fetch business details
-            business = BusinessDetails.objects.first()
+            business = get_business_details()
             business_name = business.business_name if business else ""
             store_address = business.store_address if business else ""
 
@@ -343,7 +249,7 @@ def update_order_status(request):
                 print_data["order"]["delivery_fee"] = float(reference_order.delivery_fee)
 
             # Send to printer group
-            async_to_sync(channel_layer.group_send)(
+            async_to_sync(group_send)(
                 "printers",
                 {
                     "type": "send_print_job",
@@ -351,213 +257,23 @@ def update_order_status(request):
                 }
             )
 
-            # Deduct stock quantities and update sold_count (grouped by base product name)
-            product_sales = defaultdict(int)  # Track total sales per base product
-
-            for order in orders:
-                raw_name = order.product_name.strip()
-
-                try:
-                    product_name, variation_name = [part.strip() for part in raw_name.split(" - ", 1)]
-                except ValueError:
-                    product_name = raw_name
-                    variation_name = "Default"
-
-                try:
-                    product = Products.objects.get(
-                        name__iexact=product_name,
-                        variation_name__iexact=variation_name
-                    )
-                    # ✅ Deduct stocks for this variation
-                    if product.track_stocks:
-                        product.stocks = max(0, product.stocks - order.quantity)
-                    product.save()
-
-                    # ✅ Accumulate sales for the base product
-                    product_sales[product_name.lower()] += order.quantity
-
-                except Products.DoesNotExist:
-                    print(f"❌ Product not found for: {product_name} - {variation_name}")
-                except Products.MultipleObjectsReturned:
-                    print(f"⚠️ Multiple products found for: {product_name} - {variation_name}")
-                    product = Products.objects.filter(
-                        name__iexact=product_name,
-                        variation_name__iexact=variation_name
-                    ).first()
-                    if product:
-                        if product.track_stocks:
-                            product.stocks = max(0, product.stocks - order.quantity)
-                        product.save()
-                        product_sales[product_name.lower()] += order.quantity
-
-            # ✅ Update sold_count per base product (sum across variations)
-            for base_name, qty in product_sales.items():
-                Products.objects.filter(name__iexact=base_name).update(
-                    sold_count=F('sold_count') + qty
-                )
-
-        # WebSocket: Customer side
-        sanitized_email = customer_email.replace("@", "at").replace(".", "_")
-        group_name = f"customer_{sanitized_email}"
-        customer_count = Checkout.objects.filter(
-            email=customer_email, status__in=["accepted", "rejected"]
-        ).values("order_code").distinct().count()
-
-        async_to_sync(channel_layer.group_send)(
-            group_name,
-            {
-                "type": "send_customer_notification",
-                "message": f"Your order has been {status}.",
-                "customer_count": customer_count,
-            }
-        )
+            # Stock was taken by transition_order; units sold are counted in
+            # ProductDailySales when the order completes (sales_rollup)
 
-        # WebSocket: Business owner side
-        pending_count = Checkout.objects.filter(status="pending", is_seen_by_owner=False).count()
-        async_to_sync(channel_layer.group_send)(
-            "notifications",
-            {
-                "type": "send_pending_count",
-                "count": pending_count
-            }
-        )
+        # WebSocket: owner and customer counters are broadcast by the order_status_changed receiver on commit
 
         return JsonResponse({"success": True})
 
     return JsonResponse({"success": False, "error": "Invalid request"})
 
-def send_email_notification(recipient_email, status, order_code, orders):
-    # Get customization settings
-    customization = get_or_create_customization()
-    business = BusinessDetails.objects.first()
-
-    # Prepare subject
-    subject = f"Your order has been {status.capitalize()}"
-
-    # Generate item lines dynamically from the passed 'orders' list
-    item_lines = []
-    total_price = 0  # Initialize total price variable
-    for order in orders:
-        item_lines.append(f"<tr><td style='padding: 10px; text-align: left;'>{order.product_name} (x{order.quantity})</td><td style='padding: 10px; text-align: right;'>₱{order.price:.2f}</td></tr>")
-        total_price += order.price * order.quantity  # Calculate total price
-
-    item_list = "\n".join(item_lines)
-
-    # Message Content Based on Status
-    message_content = ""
-    if status.lower() == "rejected":
-        message_content = f"""
-        <p style="font-size: 16px; color: #8B0000; font-weight: bold; line-height: 1.6;">Reason for rejection:</p>
-        <p style="font-size: 16px; color: #888;">{rejection_reason}</p>
-        <p style="font-size: 14px; color: #d9534f; margin: 0;">We're sorry, but your order has been rejected.</p>
-        <p style="font-size: 14px; color: #333; margin-top: 10px;">Please review your order details, correct any errors, and try submitting a new order.</p>
-        """
-    elif status.lower() == "accepted":
-        message_content = f"""
-        <p style="padding-left: 20px; padding-right:20px; font-size: 15px; color: #555; font-weight: bold; line-height: 1.6;">Good news! Your order has been accepted and is being processed.</p>
-        <p style="padding-left: 20px; padding-right:20px; font-size: 13px; color: #555; margin-top: 2px;">We are working to get your order ready for shipment. Stay tuned for updates.</p>
-        """
-    elif status == "Preparing":
-        message_content = f"""
-        <p style="padding-left: 20px; padding-right:20px; font-size: 15px; color: #555; font-weight: bold; line-height: 1.6;">Your order is now being prepared!</p>
-        <p style="padding-left: 20px; padding-right:20px; font-size: 13px; color: #555; margin-top: 2px;">We are preparing your orders and getting them ready for packing.</p>
-        """
-    elif status == "Packed":
-        message_content = f"""
-        <p style="padding-left: 20px; padding-right:20px; font-size: 15px; color: #555; font-weight: bold; line-height: 1.6;">Your order has been packed!</p>
-        """
-    elif status == "Ready for Pickup":
-        message_content = f"""
-        <p style="padding-left: 20px; padding-right:20px; font-size: 15px; color: #555; margin-top: 2px;">Your order is now ready for you to pick up at the store location. Please bring a valid ID or show this email including your order code.</p>
-        """
-    elif status == "Out for Delivery":
-        message_content = f"""
-        <p style="padding-left: 20px; padding-right:20px; font-size: 14px; color: #333; margin-top: 10px;">Your order is on its way and should reach you soon! If you have any questions, feel free to reach out.</p>
-        """
-    elif status == "Completed":
-        message_content = f"""
-        <p style="font-size: 15px; color: #008000; font-weight: bold; line-height: 1.6;">Your order has been successfully completed!</p>
-        <p style="font-size: 13px; color: #333; margin-top: 10px;">Thank you for shopping with us. We hope you love your purchase! Please feel free to reach out for any future needs.</p>
-        """
-    else:
-        message_content = f"""
-        <p style="font-size: 15px; color: #333; line-height: 1.6;">Your order status is now {status}.</p>
-        <p style="font-size: 13px; color: #333; margin-top: 10px;">We will notify you once there are any changes or updates regarding your order.</p>
-        """
-
-    # Build the body of the email
-    body = f"""
-    <html>
-        <body style="font-family: Arial, sans-serif; margin: 0; padding: 0; color: #333;">
-            <div style="width: 100%; height: 100%; padding: 40px 0;">
-                <table align="center" width="700" style="border-collapse: collapse; background: #ffffff; border-radius: 12px; box-shadow: 0 4px 20px rgba(0, 0, 0, 0.08); margin: 0 auto;">
-                    <tr>
-                        <td align="center" style="padding: 40px; background: linear-gradient(135deg, {customization.primary_color} 0%, {customization.accent_color} 100%); border-top-left-radius: 12px; border-top-right-radius: 12px;">
-                            <h1 style="font-size: 28px; font-weight: bold; color: {customization.button_text_color}; margin: 0;">Order Update Notification</h1>
-                        </td>
-                    </tr>
-                    <tr>
-                        <td style="padding: 30px; text-align: center; font-size: 18px; line-height: 1.6; color: #555;">
-                            <p style="font-size: 16px; color: #333; margin-bottom: 20px;">
-                              Your order with code <span style="color: {customization.primary_color}; font-weight: bold;">{order_code}</span> has been <span style="color: #8B0000; font-weight: bold; text-transform: uppercase;">{status}</span>.
-                            </p>
-                            {message_content}
-                            <p style="margin-top: 15px; font-size: 16px; color: #333;">Here are the items in your order:</p>
-                            <table align="center" width="100%" style="border-collapse: collapse; margin-top: 20px; font-size: 14px; color: #333;">
-                                <thead>
-                                    <tr style="background-color: #f0f0f0;">
-                                        <th style="padding: 10px; text-align: left;">Item</th>
-                                        <th style="padding: 10px; text-align: right;">Price</th>
-                                    </tr>
-                                </thead>
-                                <tbody>{item_list}</tbody>
-                            </table>
-                            <div style="font-size: 16px; color: #333; margin-top: 5px;">
-                                <p><strong>Total: </strong>₱{total_price:.2f}</p>
-                            </div>
-                        </td>
-                    </tr>
-
-                    <!-- Footer Section (this will always show) -->
-                    <tr>
-                        <td style="padding: 20px; background-color: #f5f5f5; text-align: center; border-bottom-left-radius: 12px; border-bottom-right-radius: 12px;">
-                            <p style="font-size: 14px; color: #333; margin: 0;">Thank you for shopping with us!</p>
-                            <div style="font-size: 14px; color: #495057; margin-bottom: 10px; line-height: 1.5; text-align: center;">
-                                <div style="display: inline-flex; justify-content: center">
-                                    <p style="margin: 5px 10px 0 0; display: inline-flex; align-items: center;">
-                                        <strong>✉️ Email:</strong> 
-                                        <a href="mailto:{business.email_address}" style="color: {customization.primary_color}; text-decoration: none; margin-left: 5px;">
-                                            {business.email_address}
-                                        </a>
-                                    </p>
-                                    <p style="margin: 5px 10px 0 0; display: inline-flex; align-items: center;">
-                                        <strong>📞 Contact:</strong> {business.contact_number}
-                                    </p>
-                                </div>
-                                <div>
-                                    <p style="margin: 5px 0;"><strong>📍 Address:</strong> {business.store_address}</p>
-                                </div>
-                            </div>
-                            <p style="font-size: 12px; color: #888; margin-top: 10px;">- {business.business_name}</p>
-                        </td>
-                    </tr>
-                </table>
-            </div>
-        </body>
-    </html>
-    """
+def stock_shortages(error):
+    return [
+        {"product_name": line.product_name, "requested": line.quantity, "available": available}
+        for line, available in error.shortages
+    ]
 
-    try:
-        email = EmailMultiAlternatives(
-            subject=subject,
-            from_email=django_settings.EMAIL_HOST_USER,
-            to=[recipient_email],
-        )
-        email.attach_alternative(body, "text/html")
-        email.send()
-        print(f"✅ Email sent to {recipient_email}")
-    except Exception as e:
-        print(f"❌ Failed to send email to {recipient_email}: {str(e)}")
+def send_email_notification(recipient_email, status, order_code, orders):
+    send_order_status_email(recipient_email, order_code, status, orders)
 
 @csrf_exempt
 def update_order_status_progress(request):
@@ -583,60 +299,28 @@ def update_order_status_progress(request):
             if not orders.exists():
                 return JsonResponse({'success': False, 'error': 'No active order found for this code'})
 
-            channel_layer = get_channel_layer()
-
-            for order in orders:
-                order.status = status
-                order.is_seen_by_customer = False  # 🔄 Mark as unseen
-                order.updated_at = now()
-
-                # ✅ Save void reason if status is "void"
-                if status.lower() == "void":
-                    order.void_reason = void_reason
-                else:
-                    order.void_reason = None
-
-                # ✅ Save delivery method, tracking URL & ETA if applicable
-                if status.lower() == "out for delivery":
-                    order.delivery_method = delivery_method
-                    order.tracking_url = tracking_url if delivery_method == "third_party" else None
-                    order.eta_value = eta_value if eta_value else None
-                    order.eta_unit = eta_unit if eta_unit else None
-                    order.rider = rider_name if delivery_method == "in_house" else None
-                else:
-                    order.delivery_method = None
-                    order.tracking_url = None
-                    order.eta_value = None
-                    order.eta_unit = None
-                    order.rider = None
-
-                order.save()
-                
+            # ✅ Delivery method, tracking URL & ETA only apply while out for delivery
+            out_for_delivery = status.lower() == "out for delivery"
+
+            try:
+                transition_order(
+                    group_id, status, order_code=order_code,
+                    is_seen_by_customer=False,  # 🔄 Mark as unseen
+                    void_reason=void_reason if status.lower() == "void" else None,
+                    delivery_method=delivery_method if out_for_delivery else None,
+                    tracking_url=tracking_url if out_for_delivery and delivery_method == "third_party" else None,
+                    eta_value=(eta_value or None) if out_for_delivery else None,
+                    eta_unit=(eta_unit or None) if out_for_delivery else None,
+                    rider=rider_name if out_for_delivery and delivery_method == "in_house" else None,
+                )
+            except InvalidTransition as e:
+                return JsonResponse({'success': False, 'error': str(e)})
+
             # ✅ Email notification (sent once for the group)
             reference_order = orders.first()
             send_email_notification(reference_order.email, status, order_code, orders)
 
-            # ✅ WebSocket Notification
-            sanitized_email = reference_order.email.replace('@', 'at').replace('.', 'dot')
-            group_name = f"customer_{sanitized_email}"
-
-            customer_count = Checkout.objects.filter(
-                email=reference_order.email,
-                status__in=["accepted", "rejected", "Preparing", "Packed",
-                            "Ready for Pickup", "Out for Delivery", "Completed", "Void"],
-                is_seen_by_customer=False,
-                group_id=group_id  # ✅ Only this order group
-            ).values("order_code").distinct().count()
-
-            async_to_sync(channel_layer.group_send)(
-                group_name,
-                {
-                    "type": "send_customer_notification",
-                    "message": f"Your order is now {status}"
-                              + (f" ({void_reason})" if status.lower() == "void" and void_reason else ""),
-                    "customer_count": customer_count,
-                }
-            )
+            # ✅ WebSocket counters are broadcast by the order_status_changed receiver on commit
 
             return JsonResponse({'success': True})
 
@@ -648,39 +332,32 @@ def update_order_status_progress(request):
 
 def partial_pending_orders(request):
     customization = get_or_create_customization()
-    pending_orders = Checkout.objects.filter(status="pending").order_by('-created_at')
-
-    # Group by order_code AND group_id
-    grouped = defaultdict(list)
-    for order in pending_orders:
-        composite_key = f"{order.order_code}_{order.group_id}" if order.group_id else order.order_code
-        grouped[composite_key].append(order)
-
-    # Convert to display format with clean order codes
-    grouped_orders = []
-    for composite_key, items in grouped.items():
-        clean_order_code = composite_key.split('_')[0] if '_' in composite_key else composite_key
-        grouped_orders.append({
-            'order_code': clean_order_code,
-            'first': items[0],
-            'items': items,
-            'total_price': sum(item.price for item in items)
-        })
-
-    # Sort by most recent created_at
-    grouped_orders.sort(key=lambda x: x['first'].created_at if x['first'].created_at else datetime.min, reverse=True)
+    # ✅ First page only; older orders load through older_pending_orders
+    grouped_orders, next_cursor = feed_page(owner_feed())
 
     html = render_to_string("partials/pending_orders_list.html", {
         'grouped_orders': grouped_orders,
+        'next_cursor': next_cursor,
         'customization': customization,
         'title': 'Notification'
     })
     return HttpResponse(html)
+
+def older_pending_orders(request):
+    try:
+        grouped_orders, next_cursor = feed_page(owner_feed(), request.GET.get('cursor'))
+    except ValueError as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
+
+    return JsonResponse({
+        "success": True,
+        "html": render_to_string("partials/pending_order_cards.html", {'grouped_orders': grouped_orders}),
+        "next_url": f"{reverse('older_pending_orders')}?{urlencode({'cursor': next_cursor})}" if next_cursor else None,
+    })
 def notify_business_owners():
-    channel_layer = get_channel_layer()
     pending_count = Checkout.objects.filter(status="pending").count()
 
-    async_to_sync(channel_layer.group_send)(
+    async_to_sync(group_send)(
         "notifications",
         {
             "type": "send_pending_count",
@@ -692,8 +369,7 @@ def notify_pending_order():
     from .models import Checkout
     count = Checkout.objects.filter(status='pending').count()
 
-    channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
+    async_to_sync(group_send)(
         "notifications",
         {
             "type": "send_notification",
@@ -725,10 +401,10 @@ def reject_order(request, order_code):
             if not orders.exists():
                 return JsonResponse({"success": False, "error": "No matching orders found."})
 
-            for order in orders:
-                order.status = "rejected"
-                order.rejection_reason = reason
-                order.save()
+            try:
+                transition_order(group_id, "rejected", order_code=order_code, rejection_reason=reason)
+            except InvalidTransition as e:
+                return JsonResponse({"success": False, "error": str(e)})
 
             # ✅ Email notify only once
             send_order_status_email(
@@ -912,8 +588,8 @@ def customization_settings(request):
         return redirect('settings')  # Redirect to settings page after saving
 
     else:
-        # If it's a GET request, fetch the customization settings from the database
-        customization = Customization.objects.first()
+        # If it's a GET request, fetch the customization settings (cached)
+        customization = get_or_create_customization()
 
         context = {
             'general_background_type': customization.general_background_type,
@@ -979,89 +655,6 @@ def customization_settings(request):
 
         return render(request, 'MSMEOrderingWebApp/settings.html', context)
 
-def get_or_create_customization():
-    # Fetch customization settings or create default if not found
-    customization, created = Customization.objects.get_or_create(id=1)
-
-    # If newly created, assign default values
-    if created:
-        customization.general_background_type = 'solid'
-        customization.general_solid_color = '#ffffff'
-        customization.general_gradient_color_1 = '#ffffff'
-        customization.general_gradient_color_2 = '#000000'
-        customization.general_gradient_color_3 = None
-        customization.general_gradient_direction = None
-        customization.general_radial_shape = None
-        customization.general_radial_position = None
-
-        # Login background settings
-        customization.login_background_type = 'solid'
-        customization.login_solid_color = '#ffffff'
-        customization.login_gradient_color_1 = '#ffffff'
-        customization.login_gradient_color_2 = '#000000'
-        customization.login_gradient_color_3 = None
-        customization.login_gradient_direction = 'to right'
-        customization.login_radial_shape = None
-        customization.login_radial_position = None
-
-        # Register background settings
-        customization.register_background_type = 'solid'
-        customization.register_solid_color = '#ffffff'
-        customization.register_gradient_color_1 = '#ffffff'
-        customization.register_gradient_color_2 = '#000000'
-        customization.register_gradient_color_3 = None
-        customization.register_gradient_direction = 'to right'
-        customization.register_radial_shape = None
-        customization.register_radial_position = None
-
-        # Navigation background settings
-        customization.navigation_background_type = 'solid'
-        customization.navigation_solid_color = '#ffffff'
-        customization.navigation_gradient_color_1 = '#ffffff'
-        customization.navigation_gradient_color_2 = '#000000'
-        customization.navigation_gradient_color_3 = None
-        customization.navigation_gradient_direction = 'to right'
-        customization.navigation_radial_shape = None
-        customization.navigation_radial_position = None
-
-        # Navigation text, hover, and border color settings
-        customization.navigation_text_color = '#000000'
-        customization.navigation_hover_color = '#a8a8a8'
-        customization.navigation_border_color = '#cccccc'
-
-        # Font settings
-        customization.header_font_family = 'Arial'
-        customization.header_font_size = 24
-        customization.header_font_color = '#000000'
-        customization.header_font_style = 'normal'
-
-        # Body font settings
-        customization.body_font_family = 'Arial'
-        customization.body_font_size = 16
-        customization.body_font_color = '#000000'
-
-        # New Fields - Default Values Added
-        customization.input_rounded_corner = 1  # Default rounded corner for input fields
-        customization.primary_color = "#000000"  # Default primary color
-        customization.secondary_color = "#424242"  # Default secondary color
-        customization.accent_color = "#303030"  # Default accent color
-        customization.button_rounded_corner = 1  # Default rounded corner for buttons
-        customization.button_text_color = '#ffffff'
-        customization.input_border_width = 1
-        customization.input_border_style = 'solid'
-
-        # Homepage image defaults (optional: you may point to a default image path or leave blank)
-        customization.homepage_image_1 = None
-        customization.homepage_image_2 = None
-        customization.homepage_image_3 = None
-        customization.homepage_image_4 = None
-        customization.homepage_image_5 = None
-        
-        # Save the default customization settings
-        customization.save()
-
-    return customization
-
 
 @csrf_exempt  # CSRF exemption (ensure it's safe in your application)
 @login_required_session
@@ -1209,6 +802,7 @@ def business_settings(request):
             business.additional_fare_per_km = 0
 
         business.save()
+        broadcast_shop_status(business)  # ✅ opening hours / days may have changed
 
         # ✅ Update first_login2 right after saving business
         owner_id = request.session.get('owner_id')
@@ -1229,7 +823,7 @@ def business_settings(request):
 
     else:
         # Get the owner and business details
-        business = BusinessDetails.objects.first()
+        business = get_business_details()
         owner = BusinessOwnerAccount.objects.first()  # Fetch the Business Owner Account
         days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
 
@@ -1390,7 +984,7 @@ def login_view(request):
 
          # Get customization and business details, as they are needed throughout
         customization = get_or_create_customization()
-        business = BusinessDetails.objects.first()
+        business = get_business_details()
 
         # 1. Try BusinessOwnerAccount login
         try:
@@ -1522,7 +1116,7 @@ def login_view(request):
 
     # GET request: Render login page
     customization = get_or_create_customization()
-    business = BusinessDetails.objects.first()
+    business = get_business_details()
 
     if request.FILES.get('login_background_image'):
         customization.login_background_image = request.FILES.get('login_background_image')
@@ -1540,53 +1134,53 @@ def logout_view(request):
 def verify_email(request):
     token = request.GET.get('token')
     if not token:
-        print("No token provided")
+        logger.debug("No token provided")
         return render(request, 'MSMEOrderingWebApp/verification_failed.html')
 
     # Try User first
     try:
         user = User.objects.get(verification_token=token)
-        print(f"User found: {user}")
+        logger.debug("User found: %s", user)
         if user.status != 'verified':
             user.status = 'verified'
             user.verification_token = None
             user.save()
         return redirect('login')
     except User.DoesNotExist:
-        print("User not found")
+        logger.debug("User not found")
         pass
 
     # Then try BusinessOwnerAccount
     try:
         owner = BusinessOwnerAccount.objects.get(verification_token=token)
-        print(f"BusinessOwnerAccount found: {owner}")
+        logger.debug("BusinessOwnerAccount found: %s", owner)
         if owner.status != 'verified':
             owner.status = 'verified'
             owner.verification_token = None
             owner.save()
         return redirect('login')
     except BusinessOwnerAccount.DoesNotExist:
-        print("BusinessOwnerAccount not found")
+        logger.debug("BusinessOwnerAccount not found")
         pass
 
     # Then try StaffAccount
     try:
         staff = StaffAccount.objects.get(verification_token=token)
-        print(f"StaffAccount found: {staff}")
+        logger.debug("StaffAccount found: %s", staff)
         if staff.status != 'verified':
             staff.status = 'verified'
             staff.verification_token = None
             staff.save()
         return redirect('login')
     except StaffAccount.DoesNotExist:
-        print("StaffAccount not found")
+        logger.debug("StaffAccount not found")
         return render(request, 'MSMEOrderingWebApp/verification_failed.html')
 
 def register_user(request):
     customization = get_or_create_customization()
-    business = BusinessDetails.objects.first()
+    business = get_business_details()
     logo_url = request.build_absolute_uri(business.logo.url) if business and business.logo else 'https://via.placeholder.com/150'
-    print(f"Logo URL: {logo_url}")
+    logger.debug("Logo URL: %s", logo_url)
 
     if request.method == 'POST':
         # Collect inputs
@@ -1765,7 +1359,7 @@ def register_user(request):
             email.attach_alternative(body, "text/html")
             email.send()
         except Exception as e:
-            print(f"Error sending email: {e}")
+            logger.error("Error sending email: %s", e)
             return render(request, 'MSMEOrderingWebApp/register_user.html', {
                 "error": "Failed to send verification email.",
                 "customization": customization,
@@ -1783,110 +1377,34 @@ def register_user(request):
 
 def dashboard(request):
     customization = get_or_create_customization()
-    business = BusinessDetails.objects.first()
-
-    # Count unique orders based on order_code + date combinations
-    def count_unique_orders(queryset, use_updated=False):
-        unique_orders = set()
-        for order in queryset:
-            order_date = order.updated_at.date() if use_updated and order.updated_at else (
-                order.created_at.date() if order.created_at else None
-            )
-            composite_key = f"{order.order_code}_{order_date}" if order_date else order.order_code
-            unique_orders.add(composite_key)
-        return len(unique_orders)
+    business = get_business_details()
 
     total_inventory = Products.objects.values('name').distinct().count()
-    total_pending = count_unique_orders(Checkout.objects.filter(status__iexact="pending"))
-    total_preparing = count_unique_orders(Checkout.objects.filter(status__iexact="preparing"))
-    total_declined = count_unique_orders(Checkout.objects.filter(status__iexact="rejected"))
-
-    # ✅ Completed orders updated today (for stats and sales)
-    today = localdate()
-    tz = get_current_timezone()
-    start_of_day = make_aware(datetime.combine(today, datetime.min.time()), tz)
-    end_of_day = make_aware(datetime.combine(today, datetime.max.time()), tz)
-
-    completed_today_qs = Checkout.objects.filter(
-        status__iexact="completed",
-        updated_at__range=(start_of_day, end_of_day)
+    total_pending = orders_with_status("pending").count()
+    total_preparing = orders_with_status("preparing").count()
+    total_declined = orders_with_status("rejected").count()
+
+    # ✅ Today's completed orders and sales, from the business day's rollup row
+    today_sales = day_totals(get_business_day())
+    total_completed = today_sales.completed_orders
+    total_sales = today_sales.revenue  # ✅ Daily sales only
+
+    # Group ACCEPTED orders (oldest first)
+    accepted_orders = paginate_orders(
+        Order.objects.filter(status__in=ONGOING_STATUSES),
+        request.GET.get('accepted_page'), per_page=50, order_by='created_at'
     )
 
-    total_completed = count_unique_orders(completed_today_qs, use_updated=True)
-
-    # Group ACCEPTED orders
-    ongoing_statuses = ["accepted", "preparing", "packed", "out for delivery", "ready for pickup", "delivered"]
-    accepted_orders_raw = Checkout.objects.filter(status__in=ongoing_statuses).order_by('created_at')
-    grouped_accepted_orders = defaultdict(list)
-    for order in accepted_orders_raw:
-        order_date = order.created_at.date() if order.created_at else None
-        composite_key = f"{order.order_code}_{order_date}" if order_date else order.order_code
-        grouped_accepted_orders[composite_key].append(order)
-
-    accepted_orders_grouped = []
-    for composite_key, items in grouped_accepted_orders.items():
-        clean_order_code = composite_key.split('_')[0]
-        accepted_orders_grouped.append({
-            'order_code': clean_order_code,
-            'items': items,
-            'first': items[0],
-            'total_price': sum(item.price for item in items),
-        })
-    accepted_orders_grouped.sort(key=lambda x: x['first'].created_at or make_aware(datetime.min, tz))
-
     # Group UNSUCCESSFUL orders (Rejected + Void)
-    unsuccessful_orders_raw = Checkout.objects.filter(
-        status__in=["rejected", "void"]
-    ).order_by('-created_at')
-
-    grouped_unsuccessful_orders = defaultdict(list)
-    for order in unsuccessful_orders_raw:
-        order_date = order.created_at.date() if order.created_at else None
-        composite_key = f"{order.order_code}_{order_date}" if order_date else order.order_code
-        grouped_unsuccessful_orders[composite_key].append(order)
-
-    unsuccessful_orders_grouped = []
-    for composite_key, items in grouped_unsuccessful_orders.items():
-        clean_order_code = composite_key.split('_')[0]
-        unsuccessful_orders_grouped.append({
-            'order_code': clean_order_code,
-            'items': items,
-            'first': items[0],
-            'total_price': sum(item.price for item in items),
-        })
-    unsuccessful_orders_grouped.sort(
-        key=lambda x: x['first'].created_at or make_aware(datetime.min, tz),
-        reverse=True
+    unsuccessful_orders = paginate_orders(
+        Order.objects.filter(status__in=["rejected", "void"]),
+        request.GET.get('unsuccessful_page')
     )
 
-    # ✅ Completed orders for table (all time)
-    completed_all_qs = Checkout.objects.filter(status__iexact="completed").order_by('-updated_at')
-
-    grouped_completed_orders = defaultdict(list)
-    for order in completed_all_qs:
-        order_date = order.updated_at.date() if order.updated_at else None
-        composite_key = f"{order.order_code}_{order_date}" if order_date else order.order_code
-        grouped_completed_orders[composite_key].append(order)
-
-    completed_orders_grouped = []
-    total_sales = Decimal("0.00")  # ✅ Daily sales only
-    for composite_key, items in grouped_completed_orders.items():
-        clean_order_code = composite_key.split('_')[0]
-        subtotal = sum(item.price for item in items)
-
-        # ✅ Count sales only if order is completed today
-        if items[0].updated_at and start_of_day <= items[0].updated_at <= end_of_day:
-            total_sales += subtotal
-
-        completed_orders_grouped.append({
-            'order_code': clean_order_code,
-            'items': items,
-            'first': items[0],
-            'total_price': subtotal,
-        })
-    completed_orders_grouped.sort(
-        key=lambda x: x['first'].updated_at or make_aware(datetime.min, tz),
-        reverse=True
+    # ✅ Completed orders for table (all time, paginated)
+    completed_orders = paginate_orders(
+        orders_with_status("completed"),
+        request.GET.get('completed_page'), order_by='-updated_at'
     )
 
     riders = StaffAccount.objects.filter(role="rider", access="enabled")
@@ -1897,9 +1415,9 @@ def dashboard(request):
         'title': 'Dashboard',
         'business': business,
         'total_inventory': total_inventory,
-        'accepted_orders_grouped': accepted_orders_grouped,
-        'unsuccessful_orders_grouped': unsuccessful_orders_grouped,
-        'completed_orders_grouped': completed_orders_grouped,  # ✅ all completed orders
+        'accepted_orders_grouped': accepted_orders,
+        'unsuccessful_orders_grouped': unsuccessful_orders,
+        'completed_orders_grouped': completed_orders,  # ✅ all completed orders
         'total_pending': total_pending,
         'total_preparing': total_preparing,
         'total_declined': total_declined,
@@ -1910,59 +1428,35 @@ def dashboard(request):
 
     return render(request, 'MSMEOrderingWebApp/dashboard.html', context)
 
-def sales_report_pdf(request):
-    report_type = request.GET.get("report_type")
-    date_filter = request.GET.get("date_filter")
+def render_report_pdf(params, progress=None):
+    """
+    Build a report PDF from the report form parameters.
 
-    orders = Checkout.objects.all()
-    period_label = ""
+    Returns (filename, pdf_bytes). `progress(percent)` is called as the
+    report is built; the run_report_jobs worker pushes it to the dashboard.
+    """
+    progress = progress or (lambda percent: None)
+    report_type = params.get("report_type")
+    date_filter = params.get("date_filter")
 
     # --- Apply Date Filtering ---
-    if date_filter == "daily":
-        daily_date = request.GET.get("daily_date")
-        if daily_date:
-            start = make_aware(datetime.strptime(daily_date, "%Y-%m-%d"))
-            end = start + timedelta(days=1)
-            orders = orders.filter(created_at__range=(start, end))
-            period_label = f"Daily Report for {start.strftime('%B %d, %Y')}"
-
-    elif date_filter == "weekly":
-        weekly_date = request.GET.get("weekly_date")
-        if weekly_date:
-            year, week = weekly_date.split("-W")
-            start = datetime.strptime(f"{year}-W{week}-1", "%Y-W%W-%w")
-            end = start + timedelta(weeks=1)
-            start, end = make_aware(start), make_aware(end)
-            orders = orders.filter(created_at__range=(start, end))
-            period_label = f"Weekly Report ({start.strftime('%b %d, %Y')} - {end.strftime('%b %d, %Y')})"
-
-    elif date_filter == "monthly":
-        monthly_date = request.GET.get("monthly_date")
-        if monthly_date:
-            start = make_aware(datetime.strptime(monthly_date, "%Y-%m"))
-            end = make_aware(datetime(start.year + (start.month // 12), (start.month % 12) + 1, 1))
-            orders = orders.filter(created_at__range=(start, end))
-            period_label = f"Monthly Report for {start.strftime('%B %Y')}"
-
-    elif date_filter == "custom":
-        custom_start = request.GET.get("custom_start")
-        custom_end = request.GET.get("custom_end")
-        if custom_start and custom_end:
-            start = make_aware(datetime.strptime(custom_start, "%Y-%m-%d"))
-            end = make_aware(datetime.strptime(custom_end, "%Y-%m-%d")) + timedelta(days=1)
-            orders = orders.filter(created_at__range=(start, end))
-            period_label = f"Custom Report ({start.strftime('%b %d, %Y')} - {(end - timedelta(days=1)).strftime('%b %d, %Y')})"
+    start, end, period_label = report_period(params)
+    days = report_days(start, end)
+    orders = Checkout.objects.all()
+    if start is not None:
+        orders = orders.filter(created_at__range=(start, end))
 
     # --- Handle no data ---
 
-    if not orders.exists() and request.GET.get("report_type") not in ["inventory", "top_products"]:
-        return _generate_no_data_pdf()
+    if not orders.exists() and report_type not in ["inventory", "top_products"]:
+        return "no_data_report.pdf", _generate_no_data_pdf()
+    progress(10)
 
     # --- PDF buffer and styles ---
     buffer = io.BytesIO()
     styles = _get_report_styles()
 
-    business = BusinessDetails.objects.first()
+    business = get_business_details()
     logo_path = business.logo.path if business and business.logo else None
     header_table = _build_report_header(
         logo_path=logo_path,
@@ -1997,24 +1491,77 @@ def sales_report_pdf(request):
 
     # --- Build story ---
     story = []
-    report_type = request.GET.get("report_type")
     if report_type == "sales":
-        story += _generate_sales_report(orders, period_label, styles)
+        story += _generate_sales_report(orders, period_label, styles, days)
     elif report_type == "orders":
         story += _generate_orders_report(orders, period_label, styles)
     elif report_type == "inventory":
         story += _generate_inventory_report(period_label, styles)
     elif report_type == "top_products":
-        story += _generate_products_report(period_label, styles)
+        story += _generate_products_report(period_label, styles, days)
+
+    progress(70)
 
     # --- Build PDF ---
     doc.build(story)
-    buffer.seek(0)
+    progress(90)
 
     filename = f"{report_type}_report_{datetime.now().strftime('%Y%m%d')}.pdf"
-    return HttpResponse(buffer, content_type="application/pdf", headers={
-        "Content-Disposition": f'attachment; filename="{filename}"'
-    })
+    return filename, buffer.getvalue()
+
+def reports_allowed(request):
+    return request.session.get('user_type') in REPORT_USER_TYPES
+
+def sales_report_pdf(request):
+    if not reports_allowed(request):
+        return JsonResponse({"success": False, "error": "Only the owner or a cashier can run reports."}, status=403)
+
+    # ✅ Rendered by the run_report_jobs worker; progress arrives on ws/report-jobs/
+    job = request_report(request.GET)
+    return JsonResponse({"success": True, "job": report_job_payload(job)})
+
+def report_job_status(request, job_id):
+    if not reports_allowed(request):
+        return JsonResponse({"success": False, "error": "Only the owner or a cashier can view reports."}, status=403)
+
+    job = get_object_or_404(ReportJob, pk=job_id)
+    return JsonResponse({"success": True, "job": report_job_payload(job)})
+
+def export_orders(request):
+    # ✅ Streams Checkout lines page by page; memory stays flat for any range
+    if not request.session.get('owner_id'):
+        return HttpResponseForbidden("Only the business owner can export orders.")
+
+    export_format = request.GET.get('format', 'csv')
+    try:
+        lines = export_filters(
+            start=request.GET.get('start'),
+            end=request.GET.get('end'),
+            statuses=request.GET.getlist('status'),
+        )
+        chunks = iter_export(lines, export_format)
+    except ExportError as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
+
+    response = StreamingHttpResponse(chunks, content_type=EXPORT_FORMATS[export_format])
+    filename = f"orders_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+# Scrapers on the same host may read /metrics without a METRICS_TOKEN
+LOOPBACK_ADDRESSES = {'127.0.0.1', '::1'}
+
+def metrics(request):
+    # ✅ Prometheus text format; with METRICS_TOKEN set it must come as a Bearer token,
+    # without one only local scrapers and the logged-in owner may read it
+    token = django_settings.METRICS_TOKEN
+    if token:
+        allowed = compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}")
+    else:
+        allowed = request.META.get('REMOTE_ADDR') in LOOPBACK_ADDRESSES or bool(request.session.get('owner_id'))
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
 
 from reportlab.platypus import Image, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib.colors import HexColor
@@ -2133,13 +1680,10 @@ def _generate_no_data_pdf():
     styles = getSampleStyleSheet()
     story = [Paragraph("No data available for the selected period", styles["Title"])]
     doc.build(story)
-    buffer.seek(0)
-    return HttpResponse(buffer, content_type="application/pdf", headers={
-        "Content-Disposition": 'attachment; filename="no_data_report.pdf"'
-    })
+    return buffer.getvalue()
 
 
-def _generate_sales_report(orders, period_label, styles):
+def _generate_sales_report(orders, period_label, styles, days=None):
     """Generate simplified but comprehensive sales report."""
     story = []
     story.append(Paragraph("SALES REPORT", styles['title']))
@@ -2147,20 +1691,13 @@ def _generate_sales_report(orders, period_label, styles):
     if period_label:
         story.append(Paragraph(period_label, styles['subtitle']))
 
-    # ✅ Only completed orders
-    completed_orders = orders.filter(status="completed").order_by("created_at")
-
-    # ===== GROUP ORDERS =====
-    grouped_orders = defaultdict(list)
-    for order in completed_orders:
-        key = (order.order_code, order.created_at.strftime("%Y-%m-%d %H:%M"))
-        grouped_orders[key].append(order)
-
     # ===== METRICS =====
-    total_revenue = sum(float(order.price) for order in completed_orders)
-    total_orders = len(grouped_orders)  # ✅ unique orders
-    total_items = sum(order.quantity for order in completed_orders)
-    avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
+    # ✅ Aggregated in the database (completed orders only)
+    metrics = sales_metrics(orders, days)
+    total_revenue = float(metrics["revenue"])
+    total_orders = metrics["orders"]  # ✅ unique orders
+    total_items = metrics["items"]
+    avg_order_value = float(metrics["avg_order_value"])
 
     # ===== EXECUTIVE SUMMARY =====
     story.append(Paragraph("EXECUTIVE SUMMARY", styles['heading']))
@@ -2184,8 +1721,8 @@ def _generate_sales_report(orders, period_label, styles):
     # ✅ Always initialize sales_data before loop
     sales_data = [["Customer", "Date & Time", "Order Code", "Ordered Items", "Order Value"]]
 
-    for (order_code, order_datetime), items in sorted(grouped_orders.items(), key=lambda x: x[0][1]):
-        first_order = items[0]
+    # ✅ Lines are streamed one order at a time
+    for first_order, items in iter_completed_orders(orders, days):
         customer_name = f"{first_order.first_name} {first_order.last_name}"
 
         # Bullet list for items
@@ -2195,8 +1732,8 @@ def _generate_sales_report(orders, period_label, styles):
 
         sales_data.append([
             customer_name,
-            order_datetime,
-            order_code,
+            first_order.created_at.strftime("%Y-%m-%d %H:%M"),
+            first_order.order_code,
             Paragraph(ordered_items, styles['normal']),
             f"Php {total_value:,.2f}",
         ])
@@ -2211,9 +1748,7 @@ def _generate_sales_report(orders, period_label, styles):
     story.append(Paragraph("REVENUE BREAKDOWN", styles['heading']))
 
     # --- Sales by Payment Method (Pie Chart + Totals) ---
-    payment_summary = defaultdict(float)
-    for order in completed_orders:
-        payment_summary[order.payment_method] += float(order.price)
+    payment_summary = {method: float(total) for method, total in metrics["by_payment_method"]}
 
     if payment_summary:
         story.append(Paragraph("Sales by Payment Method", styles['normal']))
@@ -2231,23 +1766,21 @@ def _generate_sales_report(orders, period_label, styles):
         story.append(Spacer(1, 20))
 
     # Narrative analysis
-    sorted_methods = sorted(payment_summary.items(), key=lambda x: x[1], reverse=True)
-    top_method, top_value = sorted_methods[0]
-    total_payment_sales = sum(payment_summary.values())
-    top_pct = (top_value / total_payment_sales * 100) if total_payment_sales > 0 else 0
-
-    analysis_text = f"The leading payment method is <b>{top_method.title()}</b>, accounting for Php {top_value:,.2f} ({top_pct:.1f}%) of total revenue."
-    if len(sorted_methods) > 1:
-        second_method, second_value = sorted_methods[1]
-        second_pct = (second_value / total_payment_sales * 100) if total_payment_sales > 0 else 0
-        analysis_text += f" The second most used is <b>{second_method.title()}</b> at Php {second_value:,.2f} ({second_pct:.1f}%)."
-    story.append(Paragraph(analysis_text, styles['summary']))
+    sorted_methods = list(payment_summary.items())
+    if sorted_methods:
+        top_method, top_value = sorted_methods[0]
+        total_payment_sales = sum(payment_summary.values())
+        top_pct = (top_value / total_payment_sales * 100) if total_payment_sales > 0 else 0
+
+        analysis_text = f"The leading payment method is <b>{top_method.title()}</b>, accounting for Php {top_value:,.2f} ({top_pct:.1f}%) of total revenue."
+        if len(sorted_methods) > 1:
+            second_method, second_value = sorted_methods[1]
+            second_pct = (second_value / total_payment_sales * 100) if total_payment_sales > 0 else 0
+            analysis_text += f" The second most used is <b>{second_method.title()}</b> at Php {second_value:,.2f} ({second_pct:.1f}%)."
+        story.append(Paragraph(analysis_text, styles['summary']))
 
     # --- Sales by Order Type (Bar Chart + Totals) ---
-    order_type_summary = defaultdict(float)
-    for order in completed_orders:
-        if order.order_type:
-            order_type_summary[order.order_type] += float(order.price)
+    order_type_summary = {otype: float(total) for otype, total in metrics["by_order_type"]}
 
     if order_type_summary:
         story.append(Paragraph("Sales by Order Type", styles['normal']))
@@ -2264,39 +1797,34 @@ def _generate_sales_report(orders, period_label, styles):
         story.append(type_table)
         story.append(Spacer(1, 20))
 
-    sorted_types = sorted(order_type_summary.items(), key=lambda x: x[1], reverse=True)
-    top_type, top_value = sorted_types[0]
-    total_type_sales = sum(order_type_summary.values())
-    top_pct = (top_value / total_type_sales * 100) if total_type_sales > 0 else 0
-
-    analysis_text = f"The majority of sales come from <b>{top_type.title()}</b> orders, generating Php {top_value:,.2f} ({top_pct:.1f}%)."
-    if len(sorted_types) > 1:
-        second_type, second_value = sorted_types[1]
-        second_pct = (second_value / total_type_sales * 100) if total_type_sales > 0 else 0
-        analysis_text += f" In comparison, <b>{second_type.title()}</b> orders contributed Php {second_value:,.2f} ({second_pct:.1f}%)."
-    story.append(Paragraph(analysis_text, styles['summary']))
+    sorted_types = list(order_type_summary.items())
+    if sorted_types:
+        top_type, top_value = sorted_types[0]
+        total_type_sales = sum(order_type_summary.values())
+        top_pct = (top_value / total_type_sales * 100) if total_type_sales > 0 else 0
+
+        analysis_text = f"The majority of sales come from <b>{top_type.title()}</b> orders, generating Php {top_value:,.2f} ({top_pct:.1f}%)."
+        if len(sorted_types) > 1:
+            second_type, second_value = sorted_types[1]
+            second_pct = (second_value / total_type_sales * 100) if total_type_sales > 0 else 0
+            analysis_text += f" In comparison, <b>{second_type.title()}</b> orders contributed Php {second_value:,.2f} ({second_pct:.1f}%)."
+        story.append(Paragraph(analysis_text, styles['summary']))
 
 
     # ===== PRODUCT PERFORMANCE BREAKDOWN =====
     story.append(Paragraph("PRODUCT PERFORMANCE BREAKDOWN", styles['heading']))
-    product_sales = defaultdict(lambda: {"quantity": 0, "revenue": 0, "unit_price": 0})
-
-    for order in completed_orders:
-        variation = getattr(order, 'variation_name', None)
-        if variation and variation.lower() != "default":
-            key = f"{order.product_name} - {variation}"
-        else:
-            key = order.product_name  # ✅ no "- Default" if variation is missing or 'Default'
-
-        product_sales[key]["quantity"] += order.quantity
-        product_sales[key]["revenue"] += float(order.price)
-        product_sales[key]["unit_price"] = (
-            float(order.price) / order.quantity if order.quantity > 0 else 0
-        )
+    # ✅ Ranked by revenue in the query; unit price is the average selling price
+    ranked = [
+        (p["product_name"], {
+            "quantity": p["quantity"],
+            "revenue": float(p["revenue"]),
+            "unit_price": float(p["revenue"]) / p["quantity"] if p["quantity"] else 0,
+        })
+        for p in metrics["products"]
+    ]
 
-    if product_sales:
-        total_sales = sum(p["revenue"] for p in product_sales.values())
-        ranked = sorted(product_sales.items(), key=lambda x: x[1]["revenue"], reverse=True)
+    if ranked:
+        total_sales = sum(data["revenue"] for _, data in ranked)
 
         prod_data = [["Rank", "Product", "Unit Price", "Units Sold", "% of Sales"]]
         for i, (prod, data) in enumerate(ranked, 1):
@@ -2316,10 +1844,8 @@ def _generate_sales_report(orders, period_label, styles):
     story.append(Spacer(1, 20))
 
     # ===== PRODUCT PERFORMANCE ANALYSIS =====
-    if product_sales:
-        ranked = sorted(product_sales.items(), key=lambda x: x[1]["revenue"], reverse=True)
+    if ranked:
         best_product, best_data = ranked[0]
-        total_sales = sum(p["revenue"] for p in product_sales.values())
         best_pct = (best_data["revenue"] / total_sales * 100) if total_sales > 0 else 0
 
         analysis_text = (
@@ -2339,19 +1865,13 @@ def _generate_sales_report(orders, period_label, styles):
 
     # ===== TOP CUSTOMERS =====
     story.append(Paragraph("TOP CUSTOMERS BY REVENUE", styles['heading']))
-    customer_sales = defaultdict(lambda: {"orders": 0, "revenue": 0})
-    for (order_code, order_datetime), items in grouped_orders.items():
-        first_order = items[0]
-        key = f"{first_order.first_name} {first_order.last_name}"
-        customer_sales[key]["orders"] += 1
-        customer_sales[key]["revenue"] += sum(float(o.price) for o in items)
-
-    if customer_sales:
-        ranked_customers = sorted(customer_sales.items(), key=lambda x: x[1]["revenue"], reverse=True)[:10]
+    ranked_customers = metrics["top_customers"]
+
+    if ranked_customers:
         cust_data = [["Customer", "Times Ordered", "Total Revenue"]]
-        for cust, data in ranked_customers:
+        for data in ranked_customers:
             cust_data.append([
-                cust,
+                f"{data['first_name']} {data['last_name']}",
                 str(data["orders"]),
                 f"Php {data['revenue']:,.2f}",
             ])
@@ -2362,121 +1882,19 @@ def _generate_sales_report(orders, period_label, styles):
     story.append(Spacer(1, 20))
     return story
 
-
-import matplotlib.pyplot as plt
 from io import BytesIO
 from collections import defaultdict
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, Image
 from reportlab.platypus import BaseDocTemplate, PageTemplate, Frame, Paragraph, Table, TableStyle, Spacer
 from django.utils.text import capfirst
-import matplotlib
-matplotlib.use('Agg')  # Switch to non-GUI backend
+from .report_charts import (
+    generate_order_status_bar_chart, generate_order_types_bar_chart, generate_payment_methods_pie_chart,
+    generate_products_overview_chart, generate_top_products_chart,
+)
 
-import matplotlib.pyplot as plt
 
 
-# Define the ongoing statuses
-ongoing_statuses = ["accepted", "preparing", "packed", "out for delivery", "ready for pickup", "delivered"]
-completed_statuses = ["completed", "delivered", "picked up"]
-
-def generate_order_status_bar_chart(completed, rejected, ongoing):
-    """Generate a bar chart for order status with improved design and no title"""
-    labels = ['Completed', 'Rejected', 'Ongoing']
-    data = [completed, rejected, ongoing]
-    
-    # Define colors for the bars
-    colors = ['#28a745', '#dc3545', '#fd7e14']  # More refined color palette
-    
-    # Create the bar chart
-    fig, ax = plt.subplots(figsize=(8, 6))  # Adjust size for better visual appeal
-    bars = ax.bar(labels, data, color=colors, edgecolor='black', linewidth=1.5)
-    
-    # Add grid lines for better readability
-    ax.grid(axis='y', linestyle='--', alpha=0.7)
-    
-    # Customize labels and axis
-    ax.set_ylabel("Number of Orders", fontsize=12, fontweight='bold')
-    ax.set_xlabel("Order Status", fontsize=12, fontweight='bold')
-    
-    # Add annotations (value labels on top of bars)
-    for bar in bars:
-        height = bar.get_height()
-        ax.annotate(f'{height}', 
-                    xy=(bar.get_x() + bar.get_width() / 2, height), 
-                    xytext=(0, 3),  # 3 points vertical offset
-                    textcoords="offset points", 
-                    ha='center', va='bottom', fontsize=10, fontweight='bold', color='black')
-    
-    # Make the chart layout cleaner and more fitting
-    plt.tight_layout()
-    
-    # Save the chart to a BytesIO object and return it as an image
-    img_stream = BytesIO()
-    plt.savefig(img_stream, format='png', dpi=300)  # High DPI for better resolution
-    img_stream.seek(0)  # Go to the start of the stream
-    plt.close(fig)  # Close the plot to free memory
-    return img_stream
-
-def generate_order_types_bar_chart(order_types):
-    """Generate a bar chart for order types (Dine-in, Pickup, Delivery, etc.)"""
-    labels = list(order_types.keys())
-    data = list(order_types.values())
-    
-    fig, ax = plt.subplots(figsize=(8, 6))
-    bars = ax.bar(labels, data, color=plt.cm.Set2.colors, edgecolor="black", linewidth=1.5)
-    
-    ax.set_ylabel("Number of Orders", fontsize=12, fontweight="bold")
-    ax.set_xlabel("Order Type", fontsize=12, fontweight="bold")
-    ax.grid(axis="y", linestyle="--", alpha=0.7)
-    
-    # Add values above bars
-    for bar in bars:
-        height = bar.get_height()
-        ax.annotate(f"{height}", 
-                    xy=(bar.get_x() + bar.get_width()/2, height),
-                    xytext=(0, 3), textcoords="offset points",
-                    ha="center", va="bottom", fontsize=10, fontweight="bold")
-    
-    plt.tight_layout()
-    img_stream = BytesIO()
-    plt.savefig(img_stream, format="png", dpi=300)
-    img_stream.seek(0)
-    plt.close(fig)
-    return img_stream
-
-def generate_payment_methods_pie_chart(payment_methods):
-    """Generate a pie chart for payment methods with improved visuals"""
-    labels = list(payment_methods.keys())
-    data = list(payment_methods.values())
-    
-    # Create the pie chart
-    fig, ax = plt.subplots(figsize=(8, 8))  # Adjust size for better visual appeal
-    wedges, texts, autotexts = ax.pie(data, labels=labels, autopct='%1.1f%%', 
-                                      colors=plt.cm.Paired.colors, startangle=90, 
-                                      wedgeprops={'edgecolor': 'black', 'linewidth': 1.5})
-    
-    # Customize the text on the chart
-    for autotext in autotexts:
-        autotext.set_fontsize(15)
-        autotext.set_weight('bold')
-        autotext.set_color('white')
-    
-    for text in texts:
-        text.set_fontsize(20)
-        text.set_weight('bold')
-        text.set_color('black')
-    
-    # Make the pie chart more visually appealing
-    ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
-    plt.tight_layout()  # To make sure everything fits nicely
-    
-    # Save the chart to a BytesIO object and return it as an image
-    img_stream = BytesIO()
-    plt.savefig(img_stream, format='png')
-    img_stream.seek(0)
-    return img_stream
-
 def _generate_orders_report(orders, period_label, styles): 
     story = []
     story.append(Paragraph("ORDERS REPORT", styles['title']))
@@ -2484,49 +1902,15 @@ def _generate_orders_report(orders, period_label, styles):
     if period_label:
         story.append(Paragraph(period_label, styles['subtitle']))
     
-    # --- Group orders by order_code + created_at date ---
-    grouped_orders = defaultdict(list)
-    for order in orders:
-        date_key = order.created_at.date() if order.created_at else None
-        group_key = (order.order_code, date_key)
-        grouped_orders[group_key].append(order)
-    
-    total_orders = len(grouped_orders)
-    completed = rejected = ongoing = pending = 0
-    payment_methods = defaultdict(int)
-    order_types = defaultdict(int)
-    order_details = []
-    
-    for (order_code, order_date), order_items in grouped_orders.items():
-        order_items = sorted(order_items, key=lambda o: o.created_at)
-        first_order = order_items[0]
-        
-        # ✅ Status counters (now includes pending)
-        status_lower = first_order.status.lower()
-        if status_lower in completed_statuses:
-            completed += 1
-        elif status_lower == "rejected":
-            rejected += 1
-        elif status_lower == "pending":
-            pending += 1
-        elif status_lower in ongoing_statuses:
-            ongoing += 1
-        
-        # Payment + order type
-        payment_methods[first_order.payment_method] += 1
-        if hasattr(first_order, "order_type"):
-            order_types[first_order.order_type] += 1
-        
-        total_items = len(order_items)
-        order_details.append({
-            'date': first_order.created_at.strftime('%m/%d/%Y'),
-            'time': first_order.created_at.strftime('%H:%M:%S'),
-            'order_code': order_code,
-            'customer': f"{first_order.first_name} {first_order.last_name}",
-            'status': first_order.status.title(),
-            'payment': first_order.payment_method,
-            'total_items': total_items
-        })
+    # --- Counts per order (one Order header per group), aggregated in the database ---
+    metrics = order_metrics(orders)
+    total_orders = metrics["total"]
+    completed = metrics["completed"]
+    rejected = metrics["rejected"]
+    ongoing = metrics["ongoing"]
+    pending = metrics["pending"]
+    payment_methods = dict(metrics["payment_methods"])
+    order_types = dict(metrics["order_types"])
     
     # ================= ORDER STATUS SUMMARY =================
     story.append(Paragraph("ORDER STATUS SUMMARY", styles['heading']))
@@ -2676,9 +2060,12 @@ def _generate_orders_report(orders, period_label, styles):
         story.append(Spacer(1, 5))
 
     # Inline explanation for order types
-    sorted_types = sorted(order_types.items(), key=lambda x: x[1], reverse=True)
-    top_type, top_count = sorted_types[0]
-    top_pct = (top_count / total_orders * 100)
+    sorted_types = list(metrics["order_types"])
+    if not sorted_types:
+        top_type, top_count, top_pct = "N/A", 0, 0
+    else:
+        top_type, top_count = sorted_types[0]
+        top_pct = (top_count / total_orders * 100)
 
 
     # Base statement
@@ -2726,10 +2113,11 @@ def _generate_orders_report(orders, period_label, styles):
     story.append(Paragraph("ORDER DETAILS", styles['heading']))
 
     order_data = [["Date", "Order Code", "Customer", "Total Items", "Status", "Payment"]]
-    for order in order_details:
+    for order in iter_order_details(orders):  # ✅ streamed
         order_data.append([
-            order['date'], order['order_code'], order['customer'],
-            str(order['total_items']), order['status'], order['payment']
+            order['created_at'].strftime('%m/%d/%Y'), order['order_code'],
+            f"{order['first_name']} {order['last_name']}",
+            str(order['total_items']), order['status'].title(), order['payment_method']
         ])
 
     order_table = Table(order_data, colWidths=[70, 80, 120, 80, 80, 80])
@@ -2738,15 +2126,13 @@ def _generate_orders_report(orders, period_label, styles):
     story.append(Spacer(1, 5))
 
     # --- Inline Explanation ---
-    if not order_details:
+    if not total_orders:
         order_expl = (
             "No individual order records were found for this reporting period. "
             "This indicates that no transactions were processed."
         )
     else:
-        total_orders = len(order_details)
-        completed = sum(1 for o in order_details if o['status'].lower() == "completed")
-        rejected = sum(1 for o in order_details if o['status'].lower() == "rejected")
+        completed = metrics["completed_only"]
         ongoing = total_orders - completed - rejected
 
         order_expl = (
@@ -2777,12 +2163,8 @@ def _generate_orders_report(orders, period_label, styles):
             )
 
         # Payment mode highlight
-        payments = {}
-        for o in order_details:
-            payments[o['payment']] = payments.get(o['payment'], 0) + 1
-        if payments:
-            top_method = max(payments, key=payments.get)
-            top_count = payments[top_method]
+        if metrics["payment_methods"]:
+            top_method, top_count = metrics["payment_methods"][0]
             pct = (top_count / total_orders) * 100
             order_expl += (
                 f"In terms of payments, the most frequently used method was "
@@ -2801,39 +2183,30 @@ def _generate_inventory_report(period_label, styles):
     if period_label:
         story.append(Paragraph(period_label, styles['subtitle']))
 
-    products = Products.objects.all()
-    
-    # --- total unique product names ---
-    total_products = products.values("name", "category").distinct().count()
-
-    tracked_products = products.filter(track_stocks=True)
-    untracked_products = products.filter(track_stocks=False).values("name", "category").distinct().count()
-
-    # Stock status counts (still per variation, since stocks vary)
-    out_of_stock = tracked_products.filter(stocks=0).count()
-    low_stock = tracked_products.filter(stocks__lte=5, stocks__gt=0).count()
-    normal_stock = tracked_products.filter(stocks__gt=5).count()
+    # --- Product and stock status counts (stock levels per variation) ---
+    metrics = inventory_metrics()
+    tracked_products = Products.objects.filter(track_stocks=True)
 
     # === Inventory Summary ===
     story.append(Paragraph("INVENTORY SUMMARY", styles['heading']))
     summary_text = f"""
-    Total Products: {total_products:,}<br/>
-    Tracked Products: {tracked_products.values("name", "category").distinct().count():,}<br/>
-    Untracked Products: {untracked_products:,}<br/>
-    Out of Stock (variations): {out_of_stock:,}<br/>
-    Low Stock (≤5, variations): {low_stock:,}<br/>
-    Normal Stock (variations): {normal_stock:,}
+    Total Products: {metrics['total_products']:,}<br/>
+    Tracked Products: {metrics['tracked_products']:,}<br/>
+    Untracked Products: {metrics['untracked_products']:,}<br/>
+    Out of Stock (variations): {metrics['out_of_stock']:,}<br/>
+    Low Stock (≤5, variations): {metrics['low_stock']:,}<br/>
+    Normal Stock (variations): {metrics['normal_stock']:,}
     """
     story.append(Paragraph(summary_text, styles['summary']))
     story.append(Spacer(1, 15))
 
     # === ITEMS NEEDING ATTENTION ===
-    critical_items = tracked_products.filter(stocks__lte=5).order_by('stocks')
-    if critical_items.exists():
+    critical_items = list(tracked_products.filter(stocks__lte=5).order_by('stocks')[:15])
+    if critical_items:
         story.append(Paragraph("ITEMS NEEDING ATTENTION", styles['heading']))
         critical_data = [["Product", "Variation", "Unit Price", "Current Stock", "Status"]]
         
-        for product in critical_items[:15]:  # Limit to 15 items
+        for product in critical_items:  # Limit to 15 items
             status = "OUT OF STOCK" if product.stocks == 0 else "LOW STOCK"
             critical_data.append([
                 product.name[:40] + "..." if len(product.name) > 40 else product.name,
@@ -2850,18 +2223,14 @@ def _generate_inventory_report(period_label, styles):
 
     # === Complete Inventory ===
     story.append(Paragraph("COMPLETE INVENTORY", styles['heading']))
-    categories = ProductCategory.objects.all().order_by("name")
-
-    for category in categories:
-        category_products = products.filter(category=category).order_by("name")
 
+    # ✅ One streamed query, grouped by category
+    for category_name, category_products in iter_inventory_by_category():
         # count distinct product names per category
-        unique_count = category_products.values("name").distinct().count()
-        if unique_count == 0:
-            continue
+        unique_count = len({product.name for product in category_products})
 
         # Category label with item count
-        story.append(Paragraph(f"{category.name} ({unique_count} Items)", styles['subtitle']))
+        story.append(Paragraph(f"{category_name} ({unique_count} Items)", styles['subtitle']))
         story.append(Spacer(1, 5))
 
         # Build table for this category
@@ -2874,7 +2243,7 @@ def _generate_inventory_report(period_label, styles):
                 product.variation_name or "Standard",
                 f"Php {product.price:,.2f}",
                 product.created_at.strftime("%m/%d/%y"),
-                str(product.sold_count),
+                str(product.units_sold),
                 stock_info,
             ])
 
@@ -2887,16 +2256,9 @@ def _generate_inventory_report(period_label, styles):
     from reportlab.graphics.shapes import Drawing
     from reportlab.graphics.charts.piecharts import Pie
 
-    category_counts = []
-    category_labels = []
-
-    for category in categories:
-        # distinct product names per category
-        unique_products = Products.objects.filter(category=category).values("name").distinct()
-        count = unique_products.count()
-        if count > 0:
-            category_counts.append(count)
-            category_labels.append(category.name)
+    # distinct product names per category
+    category_labels = [label for label, _ in metrics["categories"]]
+    category_counts = [count for _, count in metrics["categories"]]
 
     if category_counts:
         story.append(Paragraph("CATEGORY DISTRIBUTION", styles['heading']))
@@ -2961,11 +2323,10 @@ def _generate_inventory_report(period_label, styles):
 
 
 
-import matplotlib.pyplot as plt
 from reportlab.platypus import Image, Table, TableStyle, Paragraph, Spacer
 import io
 
-def _generate_products_report(period_label, styles):
+def _generate_products_report(period_label, styles, days=(None, None)):
     """Generate enhanced top products report with tables, charts, and explanations"""
     story = []
     story.append(Paragraph("TOP PRODUCTS REPORT", styles['title']))
@@ -2973,10 +2334,11 @@ def _generate_products_report(period_label, styles):
     if period_label:
         story.append(Paragraph(period_label, styles['subtitle']))
 
-    products = Products.objects.all().order_by("-sold_count")
-    total_products = products.count()
-    products_with_sales = products.filter(sold_count__gt=0).count()
-    total_units_sold = sum(product.sold_count for product in products)
+    # ✅ Units sold in the report period, from the per-product daily sales table
+    metrics = product_metrics(*days)
+    total_products = metrics["total_products"]
+    products_with_sales = metrics["products_with_sales"]
+    total_units_sold = metrics["total_units_sold"]
 
     # ----------------- SUMMARY -----------------
 # ----------------- PRODUCT PERFORMANCE SUMMARY -----------------
@@ -3000,18 +2362,7 @@ def _generate_products_report(period_label, styles):
     story.append(Spacer(1, 15))
 
     # ---- Bar Chart: Total vs Sales ----
-    plt.figure(figsize=(5,4))
-    bars = ["Total Products", "With Sales", "Units Sold"]
-    values = [total_products, products_with_sales, total_units_sold]
-
-    plt.bar(bars, values, color=["#607D8B", "#4CAF50", "#2196F3"])
-    plt.title("Products & Sales Overview")
-    plt.ylabel("Count")
-
-    buf = io.BytesIO()
-    plt.savefig(buf, format="png", bbox_inches="tight")
-    plt.close()
-    buf.seek(0)
+    buf = generate_products_overview_chart(total_products, products_with_sales, total_units_sold)
     story.append(Image(buf, width=350, height=250))
     story.append(Spacer(1, 20))
 
@@ -3033,10 +2384,10 @@ def _generate_products_report(period_label, styles):
     if products_with_sales > 0:
         story.append(Paragraph("TOP 10 PRODUCTS", styles['heading']))
 
-        top_products = products[:10]
+        best = top_products(*days, limit=10)
         table_data = [["Rank", "Product", "Units Sold"]]
-        for i, p in enumerate(top_products, 1):
-            table_data.append([str(i), p.name[:35] + "…" if len(p.name) > 35 else p.name, str(p.sold_count)])
+        for i, p in enumerate(best, 1):
+            table_data.append([str(i), p["name"][:35] + "…" if len(p["name"]) > 35 else p["name"], str(p["quantity"])])
 
         table = Table(table_data, colWidths=[40, 200, 100])
         table.setStyle(_get_table_style())
@@ -3044,23 +2395,15 @@ def _generate_products_report(period_label, styles):
         story.append(Spacer(1, 10))
 
         # Bar Chart
-        labels = [p.name[:15] + "…" if len(p.name) > 15 else p.name for p in top_products]
-        counts = [p.sold_count for p in top_products]
-
-        plt.figure(figsize=(6, 4))
-        plt.barh(labels, counts)
-        plt.xlabel("Units Sold")
-        plt.title("Top 10 Products by Units Sold")
-        plt.gca().invert_yaxis()
-        buf = io.BytesIO()
-        plt.savefig(buf, format="png", bbox_inches="tight")
-        plt.close()
-        buf.seek(0)
+        labels = [p["name"][:15] + "…" if len(p["name"]) > 15 else p["name"] for p in best]
+        counts = [p["quantity"] for p in best]
+
+        buf = generate_top_products_chart(tuple(labels), tuple(counts))
         story.append(Image(buf, width=400, height=250))
         story.append(Spacer(1, 10))
 
         # Explanation
-        if counts[0] >= counts[1] * 2:
+        if len(counts) > 1 and counts[0] >= counts[1] * 2:
             explanation = f"The top product ({labels[0]}) significantly outperformed others, selling over twice as much as the next product."
         elif counts[0] == counts[-1]:
             explanation = "All top 10 products sold at nearly the same level, indicating a balanced demand."
@@ -3071,10 +2414,10 @@ def _generate_products_report(period_label, styles):
 
     # ----------------- PERFORMANCE CATEGORIES (TABLE + PIE) -----------------
     story.append(Paragraph("PERFORMANCE CATEGORIES", styles['heading']))
-    high_performers = products.filter(sold_count__gte=50).count()
-    medium_performers = products.filter(sold_count__range=(10, 49)).count()
-    low_performers = products.filter(sold_count__range=(1, 9)).count()
-    no_sales = products.filter(sold_count=0).count()
+    high_performers = metrics["high_performers"]
+    medium_performers = metrics["medium_performers"]
+    low_performers = metrics["low_performers"]
+    no_sales = metrics["no_sales"]
 
     category_data = [
         ["Category", "Count", "Action Needed"],
@@ -3142,7 +2485,7 @@ def _get_table_style():
 
 @login_required_session
 def inventory(request):
-    business = BusinessDetails.objects.first()
+    business = get_business_details()
     categories = ProductCategory.objects.all()
     products = Products.objects.all()
     customization = get_or_create_customization()
@@ -3256,30 +2599,27 @@ def edit_product_price(request):
         try:
             product = Products.objects.get(id=product_id)
 
-            # Track changes
-            if new_price is not None and str(product.price) != str(new_price):
-                ProductEditHistory.objects.create(
-                    product=product,
-                    field="price",
-                    old_value=product.price,
-                    new_value=new_price,
-                )
-                product.price = new_price
+            if new_price is not None:
+                product.price = Decimal(new_price)
+            if new_stocks is not None:
+                product.stocks = int(new_stocks)
 
-            if new_stocks is not None and str(product.stocks) != str(new_stocks):
-                ProductEditHistory.objects.create(
-                    product=product,
-                    field="stocks",
-                    old_value=product.stocks,
-                    new_value=new_stocks,
-                )
-                product.stocks = new_stocks
+            # Track changes (compared against the values loaded above)
+            changes = product.changed_fields()
+            if changes:
+                # ✅ Only the edited columns, so stock taken meanwhile by reserve_stock isn't overwritten
+                product.save(update_fields=[*changes, 'last_updated'])
 
-            product.save()
+            ProductEditHistory.objects.bulk_create([
+                ProductEditHistory(product=product, field=field, old_value=old, new_value=new)
+                for field, (old, new) in changes.items()
+            ])
             messages.success(request, "Product updated successfully.")
 
         except Products.DoesNotExist:
             messages.error(request, "Product not found.")
+        except (InvalidOperation, ValueError):
+            messages.error(request, "Invalid price or stocks.")
 
     return redirect('inventory')
 
@@ -3295,7 +2635,7 @@ def delete_product(request, product_id):
         variation_name=product.variation_name,
         price=product.price,
         stocks=product.stocks,
-        sold_count=product.sold_count,
+        sold_count=units_sold(product.id),
     )
 
     # Delete from Products
@@ -3309,7 +2649,7 @@ def toggle_availability(request, product_id):
     product = get_object_or_404(Products, id=product_id)
     if request.method == 'POST':
         product.available = not product.available
-        product.save()
+        product.save(update_fields=['available', 'last_updated'])
     return redirect('inventory') 
 
 from django.db.models import Sum
@@ -3318,43 +2658,21 @@ from decimal import Decimal
 
 @login_required_session
 def pos(request):
-    business = BusinessDetails.objects.first()
-    products = Products.objects.select_related('category').filter(available=True)
-    categories = ProductCategory.objects.all()
+    business = get_business_details()
+    # ✅ Grouped products come from the cached catalog snapshot
+    catalog = get_catalog()
 
     # Get total cart quantity for walk-in user
     cart_count = Cart.objects.filter(email="walkin@store.com").aggregate(
         total=Sum('quantity')
     )['total'] or 0
 
-    grouped = defaultdict(list)
-    for p in products:
-        grouped[p.name].append(p)
-
-    unique_products = []
-    for name, group in grouped.items():
-        min_price = min(p.price for p in group)
-        max_price = max(p.price for p in group)
-        category = group[0].category
-        image = group[0].image
-        total_stocks = sum(p.stocks for p in group) 
-
-        show_stocks = all(p.track_stocks for p in group)
-
-        unique_products.append({
-            'name': name,
-            'price_range': f"₱{min_price:.2f}" if min_price == max_price else f"₱{min_price:.2f} - ₱{max_price:.2f}",
-            'category': category.name,
-            'image': image,
-            'stocks': total_stocks,
-            'show_stocks': show_stocks  
-        })
     customization = get_or_create_customization()
 
     return render(request, 'MSMEOrderingWebApp/pos.html', {
-        'products': unique_products,
-        'categories': categories,
-        'all_products': list(products.values('name', 'variation_name', 'price', 'stocks', 'track_stocks')),
+        'products': catalog['products'],
+        'categories': catalog['categories'],
+        'all_products': catalog['all_products'],
         'cart_count': cart_count,  # 👈 add this
 	    'customization': customization,
         'title': 'Point-of-Sale',
@@ -3369,14 +2687,9 @@ def pos_add_to_cart(request):
             data = json.loads(request.body)
             product_name = data.get('product_name')
             quantity = int(data.get('quantity'))
-            price = float(data.get('price'))  # <-- This should be UNIT price, not total
-
-            # Extract name and variation
-            name = product_name.split(" - ")[0]
-            variation = product_name.split(" - ")[1].split(" (₱")[0]
 
-            # Get the product that matches the name and variation
-            product = Products.objects.filter(name=name, variation_name=variation).first()
+            # The variation picked in the POS modal
+            product = Products.objects.get(pk=data.get('product_id'))
 
             # ✅ Always save the unit price (base price)
             Cart.objects.create(
@@ -3385,10 +2698,12 @@ def pos_add_to_cart(request):
                 contact_number="N/A",
                 address="In-store",
                 email="walkin@store.com",
-                product_name=product_name,
+                product=product,
+                product_name=product_name or f"{product.name} - {product.variation_name}",
                 quantity=quantity,
-                price=product.price if product else price,  # use DB base price if available
-                image=product.image if product and product.image else None
+                price=product.price,
+                unit_price=product.price,
+                image=product.image if product.image else None
             )
 
             return JsonResponse({'success': True})
@@ -3402,24 +2717,26 @@ def pos_add_to_cart_variation(request):
     if request.method == "POST":
         try:
             data = json.loads(request.body)
-            for item in data.get("items", []):
-                product_name = f"{item['productName']} - {item['variationName']}"
+            items = data.get("items", [])
+            products = Products.objects.in_bulk([int(item['product_id']) for item in items])
+            for item in items:
+                product = products[int(item['product_id'])]
+                product_name = f"{product.name} - {product.variation_name}"
                 quantity = int(item['quantity'])
                 price = float(item['price'])
 
-                # Get product
-                product = Products.objects.filter(name=item['productName'], variation_name=item['variationName']).first()
-
                 Cart.objects.create(
                     first_name="Walk-in",
                     last_name="Customer",
                     contact_number="N/A",
                     address="In-store",
                     email="walkin@store.com",
+                    product=product,
                     product_name=product_name,
                     quantity=quantity,
                     price=price,
-                    image=product.image if product and product.image else None
+                    unit_price=product.price,
+                    image=product.image if product.image else None
                 )
             return JsonResponse({'success': True, 'cart_count': Cart.objects.count()})
         except Exception as e:
@@ -3437,7 +2754,7 @@ def pos_cart_view(request):
     customization = get_or_create_customization()
 
     # Get business settings
-    business = BusinessDetails.objects.first()
+    business = get_business_details()
 
     # ✅ Get specific services (split into list)
     services = []
@@ -3514,90 +2831,78 @@ def pos_place_order(request):
             total = subtotal
             change = cash_given - total if cash_given is not None else None
 
-            order_code = generate_order_code('walkin')
-
-            # ✅ Use business day range
-            day_start, day_end = get_business_day_range()
-            if Checkout.objects.filter(
-                order_code=order_code,
-                created_at__gte=day_start,
-                created_at__lt=day_end
-            ).exists():
-                return JsonResponse({'success': False, 'error': 'Duplicate order code for current business day'})
-
             # ✅ Get specific order type
             specific_order_type = data.get('order_type', None)
 
-            checkout_entries = []
-
-            # ✅ Track grouped quantities by base product name
-            grouped_sales = {}
+            # ✅ One group_id for every line of this sale
+            group_id = uuid.uuid4()
 
-            for item in cart_items:
-                try:
-                    name, variation = item.product_name.split(" - ")
-                    variation = variation.split(" (₱")[0]
-                except ValueError:
-                    return JsonResponse({'success': False, 'error': 'Invalid product name format'})
-
-                # Deduct stock at variation level
-                try:
-                    product = Products.objects.get(
-                        name__iexact=name.strip(),
-                        variation_name__iexact=variation.strip()
+            # ✅ Stock, order and sales rollup commit together; a short line rolls back the sale
+            try:
+                with transaction.atomic():
+                    reserve_stock(cart_items)
+
+                    # ✅ Allocated from the per-day sequence, so no duplicate check needed;
+                    # a sale that rolls back gives its number back
+                    order_code = generate_order_code('walkin')
+
+                    order = Order.objects.create(
+                        group_id=group_id,
+                        order_code=order_code,
+                        first_name=cart_items[0].first_name,
+                        last_name=cart_items[0].last_name,
+                        contact_number=cart_items[0].contact_number,
+                        address=cart_items[0].address,
+                        email=cart_items[0].email,
+                        sub_total=subtotal,
+                        order_type="walkin",
+                        specific_order_type=specific_order_type,
+                        payment_method=payment_method,
+                        additional_notes=additional_notes,
+                        status="completed",
+                        updated_at=timezone.now(),
+                        cash_given=cash_given,
+                        change=change
                     )
-                    if product.track_stocks:
-                        if product.stocks < item.quantity:
-                            return JsonResponse({
-                                'success': False,
-                                'error': f"Not enough stock for {item.product_name}. Available: {product.stocks}"
-                            })
-                        product.stocks = max(0, product.stocks - item.quantity)
-                        product.save(update_fields=["stocks"])
-                except Products.DoesNotExist:
-                    print(f"❌ Product not found for: {name} - {variation}")
-                except Products.MultipleObjectsReturned:
-                    product = Products.objects.filter(
-                        name__iexact=name.strip(),
-                        variation_name__iexact=variation.strip()
-                    ).first()
-                    if product and product.track_stocks:
-                        product.stocks = max(0, product.stocks - item.quantity)
-                        product.save(update_fields=["stocks"])
-
-                # ✅ Accumulate sales at base product name level
-                grouped_sales[name.strip().lower()] = grouped_sales.get(name.strip().lower(), 0) + item.quantity
-
-                checkout = Checkout.objects.create(
-                    first_name=item.first_name,
-                    last_name=item.last_name,
-                    contact_number=item.contact_number,
-                    address=item.address,
-                    email=item.email,
-                    image=item.image,
-                    product_name=item.product_name,
-                    quantity=item.quantity,
-                    price=item.price,
-                    sub_total=subtotal,
-                    order_type="walkin",  # general
-                    specific_order_type=specific_order_type,  # ✅ save dropdown value
-                    order_code=order_code,
-                    payment_method=payment_method,
-                    proof_of_payment=proof,
-                    additional_notes=additional_notes,
-                    status="completed",
-                    cash_given=cash_given,
-                    change=change
-                )
-                checkout_entries.append(checkout)
 
-            # ✅ Bulk update sold_count for all grouped product names
-            for base_name, qty in grouped_sales.items():
-                Products.objects.filter(name__iexact=base_name).update(
-                    sold_count=F("sold_count") + qty
-                )
-
-            business = BusinessDetails.objects.first()
+                    checkout_entries = []
+
+                    for item in cart_items:
+                        checkout = Checkout.objects.create(
+                            order=order,
+                            first_name=item.first_name,
+                            last_name=item.last_name,
+                            contact_number=item.contact_number,
+                            address=item.address,
+                            email=item.email,
+                            image=item.image,
+                            product_id=item.product_id,
+                            product_name=item.product_name,
+                            quantity=item.quantity,
+                            price=item.price,
+                            unit_price=item.unit_price,
+                            sub_total=subtotal,
+                            order_type="walkin",  # general
+                            specific_order_type=specific_order_type,  # ✅ save dropdown value
+                            order_code=order_code,
+                            group_id=group_id,
+                            payment_method=payment_method,
+                            proof_of_payment=proof,
+                            additional_notes=additional_notes,
+                            status="completed",
+                            cash_given=cash_given,
+                            change=change
+                        )
+                        checkout_entries.append(checkout)
+
+                    # ✅ Walk-in sales are completed on the spot; this also counts
+                    # the units sold in ProductDailySales
+                    record_order_outcome(group_id)
+
+            except InsufficientStock as e:
+                return JsonResponse({'success': False, 'error': str(e), 'shortages': stock_shortages(e)})
+
+            business = get_business_details()
             business_name = business.business_name if business else "My Store"
             store_address = business.store_address if business else "Store Address"
 
@@ -3624,8 +2929,7 @@ def pos_place_order(request):
             ]
 
             # ✅ Send print job
-            channel_layer = get_channel_layer()
-            async_to_sync(channel_layer.group_send)(
+            async_to_sync(group_send)(
                 'printers',
                 {
                     'type': 'send_print_job',
@@ -3652,33 +2956,31 @@ from django.utils.safestring import mark_safe
 
 @login_required_session
 def delivery(request):
-    business = BusinessDetails.objects.first()
+    business = get_business_details()
     customization = get_or_create_customization()
 
     today = now().date()
 
-    # Only include delivery orders with in-house delivery
-    delivery_orders_raw = Checkout.objects.filter(
+    # Only include delivery orders with in-house delivery (set on the Order header)
+    delivery_orders_raw = Order.objects.filter(
         delivery_method='in_house'
+    ).prefetch_related(
+        Prefetch('items', queryset=Checkout.objects.order_by('id'))
     ).order_by('-created_at')
 
-    # Group by both order_code AND date
-    grouped_delivery_orders = defaultdict(list)
-    for order in delivery_orders_raw:
-        order_date = order.created_at.date() if order.created_at else None
-        composite_key = f"{order.order_code}_{order_date}" if order_date else order.order_code
-        grouped_delivery_orders[composite_key].append(order)
-
-    # Convert to display format with clean order codes + JSON-safe items
+    # Convert to display format + JSON-safe items
     delivery_orders_grouped = []
-    for composite_key, items in grouped_delivery_orders.items():
-        clean_order_code = composite_key.split('_')[0] if '_' in composite_key else composite_key
+    for order in delivery_orders_raw:
+        items = list(order.items.all())
+        if not items:
+            continue
         item_total = sum(item.price for item in items)
-        delivery_fee = items[0].delivery_fee or 0
+        delivery_fee = order.delivery_fee or 0
         grand_total = item_total + delivery_fee
 
         delivery_orders_grouped.append({
-            'order_code': clean_order_code,
+            'order': order,
+            'order_code': order.order_code,
             'items': items,
             'items_json': mark_safe(json.dumps([
                 {"name": i.product_name, "qty": i.quantity}
@@ -3719,7 +3021,7 @@ def delivery(request):
 
 @login_required_session
 def reviews(request):
-    business = BusinessDetails.objects.first()
+    business = get_business_details()
     customization = get_or_create_customization()
 
     # Fetch reviews from the database, ordered by submission date
@@ -3736,7 +3038,7 @@ def reviews(request):
     return render(request, 'MSMEOrderingWebApp/reviews.html', context)
 
 def users(request):
-    business = BusinessDetails.objects.first()
+    business = get_business_details()
     customization = get_or_create_customization()
 
     search_query = request.GET.get('search', '').strip()
@@ -3769,10 +3071,7 @@ def users(request):
     for staff in staff_accounts:
         user_data.append({'user': staff, 'role': staff.role})
 
-    # Debugging: Print the IDs
-    print("User data:")
-    for entry in user_data:
-        print(f"{entry['role'].capitalize()} ID: {entry['user'].id}")
+    logger.debug("User data: %s", ", ".join(f"{entry['role'].capitalize()} ID: {entry['user'].id}" for entry in user_data))
 
     # Sort Users and Staff by access and role
     user_data.sort(key=lambda x: (x['user'].access != 'enabled', x['role'] == 'staff'), reverse=True)
@@ -3919,7 +3218,7 @@ def business_dashboard(request):
     customization = get_or_create_customization()
 
     # Get the business details (replace with filter if needed per user)
-    business = BusinessDetails.objects.first()
+    business = get_business_details()
 
     # Pass both customization and business to the template
     return render(request, 'MSMEOrderingWebApp/business_owner_base.html', {
@@ -3945,110 +3244,35 @@ def deliveryrider_dashboard(request):
 
 def cashier_dashboard(request):
     customization = get_or_create_customization()
-    business = BusinessDetails.objects.first()
-
-    # Count unique orders based on order_code + date combinations
-    def count_unique_orders(queryset, use_updated=False):
-        unique_orders = set()
-        for order in queryset:
-            order_date = order.updated_at.date() if use_updated and order.updated_at else (
-                order.created_at.date() if order.created_at else None
-            )
-            composite_key = f"{order.order_code}_{order_date}" if order_date else order.order_code
-            unique_orders.add(composite_key)
-        return len(unique_orders)
+    business = get_business_details()
 
     total_inventory = Products.objects.values('name').distinct().count()
-    total_pending = count_unique_orders(Checkout.objects.filter(status__iexact="pending"))
-    total_preparing = count_unique_orders(Checkout.objects.filter(status__iexact="preparing"))
-    total_unsuccessful = count_unique_orders(
-        Checkout.objects.filter(status__in=["rejected", "void"])
-    )
+    total_pending = orders_with_status("pending").count()
+    total_preparing = orders_with_status("preparing").count()
+    total_unsuccessful = Order.objects.filter(status__in=["rejected", "void"]).count()
 
 
-    # ✅ Completed orders updated today (for stats and sales)
-    today = localdate()
-    tz = get_current_timezone()
-    start_of_day = make_aware(datetime.combine(today, datetime.min.time()), tz)
-    end_of_day = make_aware(datetime.combine(today, datetime.max.time()), tz)
+    # ✅ Today's completed orders and sales, from the business day's rollup row
+    today_sales = day_totals(get_business_day())
+    total_completed = today_sales.completed_orders
+    total_sales = today_sales.revenue  # ✅ Daily sales only
 
-    completed_today_qs = Checkout.objects.filter(
-        status__iexact="completed",
-        updated_at__range=(start_of_day, end_of_day)
+    # Group ACCEPTED orders (oldest first)
+    accepted_orders = paginate_orders(
+        Order.objects.filter(status__in=ONGOING_STATUSES),
+        request.GET.get('accepted_page'), per_page=50, order_by='created_at'
     )
 
-    total_completed = count_unique_orders(completed_today_qs, use_updated=True)
-
-    # Group ACCEPTED orders
-    ongoing_statuses = ["accepted", "preparing", "packed", "out for delivery", "ready for pickup", "delivered"]
-    accepted_orders_raw = Checkout.objects.filter(status__in=ongoing_statuses).order_by('created_at')
-    grouped_accepted_orders = defaultdict(list)
-    for order in accepted_orders_raw:
-        order_date = order.created_at.date() if order.created_at else None
-        composite_key = f"{order.order_code}_{order_date}" if order_date else order.order_code
-        grouped_accepted_orders[composite_key].append(order)
-
-    accepted_orders_grouped = []
-    for composite_key, items in grouped_accepted_orders.items():
-        clean_order_code = composite_key.split('_')[0]
-        accepted_orders_grouped.append({
-            'order_code': clean_order_code,
-            'items': items,
-            'first': items[0],
-            'total_price': sum(item.price for item in items),
-        })
-    accepted_orders_grouped.sort(key=lambda x: x['first'].created_at or make_aware(datetime.min, tz))
-
     # Group REJECTED orders
-    rejected_orders_raw = Checkout.objects.filter(status__iexact="rejected").order_by('-created_at')
-    grouped_rejected_orders = defaultdict(list)
-    for order in rejected_orders_raw:
-        order_date = order.created_at.date() if order.created_at else None
-        composite_key = f"{order.order_code}_{order_date}" if order_date else order.order_code
-        grouped_rejected_orders[composite_key].append(order)
-
-    rejected_orders_grouped = []
-    for composite_key, items in grouped_rejected_orders.items():
-        clean_order_code = composite_key.split('_')[0]
-        rejected_orders_grouped.append({
-            'order_code': clean_order_code,
-            'items': items,
-            'first': items[0],
-            'total_price': sum(item.price for item in items),
-        })
-    rejected_orders_grouped.sort(
-        key=lambda x: x['first'].created_at or make_aware(datetime.min, tz),
-        reverse=True
+    rejected_orders = paginate_orders(
+        orders_with_status("rejected"),
+        request.GET.get('unsuccessful_page')
     )
 
-    # ✅ Completed orders for table (all time)
-    completed_all_qs = Checkout.objects.filter(status__iexact="completed").order_by('-updated_at')
-
-    grouped_completed_orders = defaultdict(list)
-    for order in completed_all_qs:
-        order_date = order.updated_at.date() if order.updated_at else None
-        composite_key = f"{order.order_code}_{order_date}" if order_date else order.order_code
-        grouped_completed_orders[composite_key].append(order)
-
-    completed_orders_grouped = []
-    total_sales = Decimal("0.00")  # ✅ Daily sales only
-    for composite_key, items in grouped_completed_orders.items():
-        clean_order_code = composite_key.split('_')[0]
-        subtotal = sum(item.price for item in items)
-
-        # ✅ Count sales only if order is completed today
-        if items[0].updated_at and start_of_day <= items[0].updated_at <= end_of_day:
-            total_sales += subtotal
-
-        completed_orders_grouped.append({
-            'order_code': clean_order_code,
-            'items': items,
-            'first': items[0],
-            'total_price': subtotal,
-        })
-    completed_orders_grouped.sort(
-        key=lambda x: x['first'].updated_at or make_aware(datetime.min, tz),
-        reverse=True
+    # ✅ Completed orders for table (all time, paginated)
+    completed_orders = paginate_orders(
+        orders_with_status("completed"),
+        request.GET.get('completed_page'), order_by='-updated_at'
     )
 
     riders = StaffAccount.objects.filter(role="rider", access="enabled")
@@ -4059,9 +3283,10 @@ def cashier_dashboard(request):
         'title': 'Dashboard',
         'business': business,
         'total_inventory': total_inventory,
-        'accepted_orders_grouped': accepted_orders_grouped,
-        'rejected_orders_grouped': rejected_orders_grouped,
-        'completed_orders_grouped': completed_orders_grouped,  # ✅ all completed orders
+        'accepted_orders_grouped': accepted_orders,
+        'rejected_orders_grouped': rejected_orders,
+        'unsuccessful_orders_grouped': rejected_orders,
+        'completed_orders_grouped': completed_orders,  # ✅ all completed orders
         'total_pending': total_pending,
         'total_preparing': total_preparing,
         'total_unsuccessful': total_unsuccessful,
@@ -4073,43 +3298,21 @@ def cashier_dashboard(request):
     return render(request, 'MSMEOrderingWebApp/cashier_dashboard.html', context)
 
 def cashier_pos(request):
-    business = BusinessDetails.objects.first()
-    products = Products.objects.select_related('category').filter(available=True)
-    categories = ProductCategory.objects.all()
+    business = get_business_details()
+    # ✅ Grouped products come from the cached catalog snapshot
+    catalog = get_catalog()
 
     # Walk-in cart total
     cart_count = Cart.objects.filter(email="walkin@store.com").aggregate(
         total=Sum('quantity')
     )['total'] or 0
 
-    grouped = defaultdict(list)
-    for p in products:
-        grouped[p.name].append(p)
-
-    unique_products = []
-    for name, group in grouped.items():
-        min_price = min(p.price for p in group)
-        max_price = max(p.price for p in group)
-        category = group[0].category
-        image = group[0].image
-        total_stocks = sum(p.stocks for p in group)
-        show_stocks = all(p.track_stocks for p in group)
-
-        unique_products.append({
-            'name': name,
-            'price_range': f"₱{min_price:.2f}" if min_price == max_price else f"₱{min_price:.2f} - ₱{max_price:.2f}",
-            'category': category.name,
-            'image': image,
-            'stocks': total_stocks,
-            'show_stocks': show_stocks
-        })
-
     customization = get_or_create_customization()
 
     return render(request, 'MSMEOrderingWebApp/cashier_pos.html', {
-        'products': unique_products,
-        'categories': categories,
-        'all_products': list(products.values('name', 'variation_name', 'price', 'stocks')),
+        'products': catalog['products'],
+        'categories': catalog['categories'],
+        'all_products': catalog['all_products'],
         'cart_count': cart_count,
         'customization': customization,
         'title': 'Cashier POS',
@@ -4127,7 +3330,7 @@ def cashier_pos_cart_view(request):
     customization = get_or_create_customization()
 
     # Get business settings to pass to the cart
-    business = BusinessDetails.objects.first()
+    business = get_business_details()
     
     return render(request, 'MSMEOrderingWebApp/cashier_poscart.html', {
         'cart_items': cart_items,
@@ -4138,65 +3341,43 @@ def cashier_pos_cart_view(request):
     })
 
 def cashier_notifications(request):
+    # ✅ Newest pending orders, one keyset page at a time
+    final_orders, next_cursor = feed_page(owner_feed())
 
-    raw_orders = Checkout.objects.filter(status="pending").order_by('-created_at')
-    grouped_orders = defaultdict(list)
-    
-    for order in raw_orders:
-        order_date = order.created_at.date() if order.created_at else None
-        composite_key = f"{order.order_code}_{order_date}" if order_date else order.order_code
-        grouped_orders[composite_key].append(order)
-
-    # Convert to display format with clean order codes
-    final_orders = []
-    for composite_key, items in grouped_orders.items():
-        clean_order_code = composite_key.split('_')[0] if '_' in composite_key else composite_key
-        total_price = sum(float(item.price) for item in items)
-        final_orders.append({
-            "order_code": clean_order_code,
-            "items": items,
-            "first": items[0],
-            "total_price": total_price
-        })
-
-    # Sort by most recent date
-    final_orders.sort(key=lambda x: x['first'].created_at if x['first'].created_at else datetime.min, reverse=True)
-
-    business = BusinessDetails.objects.first()
+    business = get_business_details()
     customization = get_or_create_customization()
 
     return render(request, 'MSMEOrderingWebApp/cashier_notification.html', {
         'grouped_orders': final_orders,
+        'next_cursor': next_cursor,
         'business': business,
         'customization': customization,
         'title': 'Notifications'
     })
 
 def deliveryrider_home(request):
-    business = BusinessDetails.objects.first()
+    business = get_business_details()
     customization = get_or_create_customization()
 
     today = now().date()
 
-    # Only include delivery orders with in-house delivery
-    delivery_orders_raw = Checkout.objects.filter(
+    # Only include delivery orders with in-house delivery (set on the Order header)
+    delivery_orders_raw = Order.objects.filter(
         delivery_method='in_house'
+    ).prefetch_related(
+        Prefetch('items', queryset=Checkout.objects.order_by('id'))
     ).order_by('-created_at')
 
-    # Group by both order_code AND date
-    grouped_delivery_orders = defaultdict(list)
-    for order in delivery_orders_raw:
-        order_date = order.created_at.date() if order.created_at else None
-        composite_key = f"{order.order_code}_{order_date}" if order_date else order.order_code
-        grouped_delivery_orders[composite_key].append(order)
-
-    # Convert to display format with clean order codes + JSON-safe items
+    # Convert to display format + JSON-safe items
     delivery_orders_grouped = []
-    for composite_key, items in grouped_delivery_orders.items():
-        clean_order_code = composite_key.split('_')[0] if '_' in composite_key else composite_key
+    for order in delivery_orders_raw:
+        items = list(order.items.all())
+        if not items:
+            continue
         delivery_orders_grouped.append({
-            'order_code': clean_order_code,
-            'group_id': str(items[0].group_id),
+            'order': order,
+            'order_code': order.order_code,
+            'group_id': str(order.group_id),
             'items': items,
             'items_json': mark_safe(json.dumps([
                 {"name": i.product_name, "qty": i.quantity}
@@ -4240,17 +3421,23 @@ def mark_as_delivered(request):
         messages.error(request, "Missing order code, group ID, or file.")
         return redirect('deliveryrider_home')  # or your actual page name
 
-    # ✅ Get all items for this exact order group
-    orders = Checkout.objects.filter(order_code=order_code, group_id=group_id)
+    # ✅ The header of this exact order group (a malformed group_id matches nothing)
+    try:
+        header = Order.objects.filter(group_id=group_id, order_code=order_code).first()
+    except ValidationError:
+        header = None
 
-    if not orders.exists():
+    if header is None or not Checkout.objects.filter(order_code=order_code, group_id=group_id).exists():
         messages.error(request, "Order not found or already completed.")
         return redirect('deliveryrider_home')
 
-    for order in orders:
-        order.status = 'delivered'
-        order.proof_of_delivery = proof
-        order.save()
+    # ✅ Store the file once on the header, then point every line at it in one UPDATE
+    header.proof_of_delivery.save(proof.name, proof, save=False)
+    try:
+        transition_order(group_id, 'delivered', order_code=order_code, proof_of_delivery=header.proof_of_delivery.name)
+    except InvalidTransition as e:
+        messages.error(request, str(e))
+        return redirect('deliveryrider_home')
 
     messages.success(request, f"Order #{order_code} marked as delivered.")
     return redirect('deliveryrider_home')
@@ -4258,55 +3445,20 @@ def mark_as_delivered(request):
 @login_required_session
 def business_notifications(request):
     # Mark unseen pending orders as seen
-    Checkout.objects.filter(status="pending", is_seen_by_owner=False).update(is_seen_by_owner=True)
+    Order.objects.filter(status="pending", is_seen_by_owner=False).update(is_seen_by_owner=True)
 
-    # WebSocket badge update - count unique order_code + group_id combinations
-    raw_pending = Checkout.objects.filter(status="pending")
-    unique_orders = set()
-    for order in raw_pending:
-        composite_key = f"{order.order_code}_{order.group_id}" if order.group_id else order.order_code
-        unique_orders.add(composite_key)
-    
-    pending_count = len(unique_orders)
-    unseen_count = Checkout.objects.filter(status="pending", is_seen_by_owner=False).count()
+    # WebSocket badge update (refreshes the cached counters)
+    broadcast_owner_counts()
 
-    channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
-        "notifications", {
-            "type": "send_pending_count",
-            "unseen_count": unseen_count,
-            "pending_count": pending_count,
-        }
-    )
+    # ✅ Newest pending orders, one keyset page at a time
+    final_orders, next_cursor = feed_page(owner_feed())
 
-    # Group orders by order_code AND group_id
-    raw_orders = Checkout.objects.filter(status="pending").order_by('-created_at')
-    grouped_orders = defaultdict(list)
-    
-    for order in raw_orders:
-        composite_key = f"{order.order_code}_{order.group_id}" if order.group_id else order.order_code
-        grouped_orders[composite_key].append(order)
-
-    # Convert to display format with clean order codes
-    final_orders = []
-    for composite_key, items in grouped_orders.items():
-        clean_order_code = composite_key.split('_')[0] if '_' in composite_key else composite_key
-        total_price = sum(float(item.price) for item in items)
-        final_orders.append({
-            "order_code": clean_order_code,
-            "items": items,
-            "first": items[0],
-            "total_price": total_price
-        })
-
-    # Sort by most recent created_at
-    final_orders.sort(key=lambda x: x['first'].created_at if x['first'].created_at else datetime.min, reverse=True)
-
-    business = BusinessDetails.objects.first()
+    business = get_business_details()
     customization = get_or_create_customization()
 
     return render(request, 'MSMEOrderingWebApp/business_notification.html', {
         'grouped_orders': final_orders,
+        'next_cursor': next_cursor,
         'business': business,
         'customization': customization,
         'title': 'Notifications'
@@ -4314,47 +3466,13 @@ def business_notifications(request):
 
 @login_required_session
 def customer_home(request):
-    business = BusinessDetails.objects.first()
+    business = get_business_details()
     customization = get_or_create_customization()
-    products = Products.objects.select_related('category').filter(available=True)
-    categories = ProductCategory.objects.all()
-
-    # Group products by name
-    grouped = defaultdict(list)
-    for p in products:
-        grouped[p.name].append(p)
-
-    unique_products = []
-    best_seller_products = []
-    for name, group in grouped.items():
-        min_price = min(p.price for p in group)
-        max_price = max(p.price for p in group)
-        representative = group[0]
-
-        price_range = (
-            f"₱{min_price:.2f}"
-            if min_price == max_price
-            else f"₱{min_price:.2f} - ₱{max_price:.2f}"
-        )
+    # ✅ Grouped products come from the cached catalog snapshot
+    catalog = get_catalog()
 
-        product_data = {
-            'name': name,
-            'price_range': price_range,
-            'category': representative.category.name if representative.category else "Uncategorized",
-            'image': representative.image if representative.image else None,
-            'stocks': sum(p.stocks for p in group),
-            'track_stocks': representative.track_stocks,
-            'sold_count': representative.sold_count,  # ✅ keep sold_count here
-        }
-
-        unique_products.append(product_data)
-
-        # ✅ Add to best sellers only if sold_count >= 3
-        if representative.sold_count >= 3:
-            best_seller_products.append(product_data)
-
-    # ✅ Sort best sellers by sold_count and take top 3
-    best_seller_products = sorted(best_seller_products, key=lambda x: x['sold_count'], reverse=True)[:3]
+    # ✅ Top 3 products with 3+ units sold over the last BEST_SELLER_DAYS business days
+    best_seller_products = best_sellers(catalog, top_products(*recent_days(BEST_SELLER_DAYS)))
 
     # Format times to HH:MM:SS (ignore microseconds)
     current_time = datetime.now().strftime("%H:%M:%S")
@@ -4362,9 +3480,9 @@ def customer_home(request):
     closing_time = business.closing_time.strftime("%H:%M:%S")
 
     return render(request, 'MSMEOrderingWebApp/customer_home.html', {
-        'products': unique_products,
-        'categories': categories,
-        'all_products': list(products.values('name', 'variation_name', 'price', 'stocks', 'track_stocks')),
+        'products': catalog['products'],
+        'categories': catalog['categories'],
+        'all_products': catalog['all_products'],
         'customization': customization,
         'best_seller_products': best_seller_products,
         'business': business,
@@ -4400,7 +3518,7 @@ def staff_profile(request):
         base_template = 'MSMEOrderingWebApp/base.html'  # fallback
 
     # Pass customization & business info
-    business = BusinessDetails.objects.first()
+    business = get_business_details()
     customization = get_or_create_customization()
 
     context = {
@@ -4435,7 +3553,7 @@ from .models import CustomerReview, ReviewPhoto, User
 
 @login_required_session
 def customer_reviews(request):
-    business = BusinessDetails.objects.first()
+    business = get_business_details()
     customization = get_or_create_customization()
 
     if request.method == 'POST':
@@ -4493,17 +3611,12 @@ def customer_reviews(request):
 
 @login_required_session
 def customer_cart(request):
-    business = BusinessDetails.objects.first()
+    business = get_business_details()
 
     if 'user_id' in request.session and request.session.get('user_type') == 'customer':
         user = User.objects.get(id=request.session['user_id'])
-        cart_items = Cart.objects.filter(email=user.email)
-
-        # Get product data for each cart item
-        for item in cart_items:
-            product_name = item.product_name.split(' - ')[0]
-            variation_name = item.product_name.split(' - ')[1] if ' - ' in item.product_name else 'Default'
-            item.product = Products.objects.filter(name=product_name, variation_name=variation_name).first()
+        # ✅ item.product comes from the same query
+        cart_items = Cart.objects.filter(email=user.email).select_related('product')
 
         subtotal = sum(item.price for item in cart_items)
         customization = get_or_create_customization()
@@ -4536,7 +3649,8 @@ def update_cart(request, cart_id):
             new_qty = int(data.get('quantity', 1))
 
             cart_item = Cart.objects.get(id=cart_id)
-            unit_price = float(cart_item.price) / cart_item.quantity  # price per unit
+            # price per unit: the snapshot taken when the item was added
+            unit_price = float(cart_item.unit_price or cart_item.price / cart_item.quantity)
             updated_price = round(unit_price * new_qty, 2)
 
             cart_item.quantity = new_qty
@@ -4559,48 +3673,6 @@ def update_cart(request, cart_id):
 
     return JsonResponse({'success': False, 'error': 'Invalid method'})
 
-def generate_order_code(order_type):
-    if order_type == 'delivery':
-        prefix = 'DL'
-    elif order_type == 'pickup':
-        prefix = 'PU'
-    elif order_type == 'walkin':
-        prefix = 'WI'
-    else:
-        prefix = 'XX'
-
-    # Get business opening time
-    business = BusinessDetails.objects.first()  # adjust if multiple businesses
-    opening_time = business.opening_time  # stored as time (e.g. 08:00:00)
-
-    now = timezone.localtime()  # current local datetime
-    today_opening = datetime.combine(now.date(), opening_time, tzinfo=now.tzinfo)
-
-    # If before opening today, use yesterday’s opening for reset reference
-    if now < today_opening:
-        reset_reference = today_opening - timezone.timedelta(days=1)
-    else:
-        reset_reference = today_opening
-
-    # Get latest order for this type since reset_reference
-    last_order = Checkout.objects.filter(
-        order_type=order_type,
-        created_at__gte=reset_reference
-    ).order_by('-created_at').first()
-
-    if last_order and last_order.order_code.startswith(prefix):
-        try:
-            # Extract numeric part
-            last_number = int(last_order.order_code.replace(prefix, ''))
-        except ValueError:
-            last_number = 0
-    else:
-        last_number = 0
-
-    next_number = last_number + 1
-    return f"{prefix}{str(next_number).zfill(3)}"
-
-
 @login_required_session
 @csrf_exempt
 def customer_checkout(request):
@@ -4623,33 +3695,24 @@ def customer_checkout(request):
             # Make it timezone aware
             scheduled_at = timezone.make_aware(scheduled_at)
         except ValueError as e:
-            print(f"Date parsing error: {e}")
+            logger.debug("Date parsing error: %s", e)
             scheduled_at = None
 
     total_with_fee = subtotal + delivery_fee
-    business = BusinessDetails.objects.first()
+    business = get_business_details()
     customization = get_or_create_customization()
 
     # Build enriched cart
+    products = products_for(cart_items)  # ✅ one query for every line
     cart_data = []
     for item in cart_items:
-        product_image = None
-        try:
-            name, variation = item.product_name.split(" - ")
-            variation = variation.split(" (₱")[0]
-            product = Products.objects.get(
-                name__iexact=name.strip(),
-                variation_name__iexact=variation.strip()
-            )
-            product_image = product.image
-        except Exception as e:
-            print(f"Image fetch error for {item.product_name}: {e}")
+        product = products.get(item.product_id)
 
         cart_data.append({
             "product_name": item.product_name,
             "quantity": item.quantity,
             "price": item.price,
-            "image": product_image,
+            "image": product.image if product else None,
         })
 
     if request.method == 'POST':
@@ -4666,71 +3729,82 @@ def customer_checkout(request):
                 scheduled_at = datetime.strptime(scheduled_date_post, "%Y-%m-%dT%H:%M")
                 scheduled_at = timezone.make_aware(scheduled_at)
             except ValueError as e:
-                print(f"POST date parsing error: {e}")
+                logger.debug("POST date parsing error: %s", e)
                 # Keep the scheduled_at from GET if POST parsing fails
                 pass
 
-        order_code = generate_order_code(order_type)
         group_id = str(uuid.uuid4())
 
-        # Stock validation
         for item in cart_items:
-            try:
-                name, variation = item.product_name.split(" - ")
-                variation = variation.split(" (₱")[0]
-                product = Products.objects.get(
-                    name__iexact=name.strip(),
-                    variation_name__iexact=variation.strip()
-                )
-
-                if product.track_stocks and product.stocks < item.quantity:
-                    messages.error(request, f"Not enough stocks for {item.product_name}. Available: {product.stocks}")
-                    return redirect('customer_checkout')
-            except Exception as e:
-                messages.error(request, str(e))
+            if item.product_id not in products:
+                messages.error(request, f"{item.product_name} is no longer available.")
                 return redirect('customer_checkout')
 
-        # Create Checkout records
-        for item in cart_items:
-            product_image = None
-            try:
-                name, variation = item.product_name.split(" - ")
-                variation = variation.split(" (₱")[0]
-                product = Products.objects.get(
-                    name__iexact=name.strip(),
-                    variation_name__iexact=variation.strip()
+        # ✅ Stock + header + lines in one transaction: one notification broadcast on commit
+        try:
+            with transaction.atomic():
+                # ✅ Hold the stock now; acceptance consumes it, rejection gives it back
+                reserve_stock(cart_items)
+
+                # ✅ Allocated inside the transaction: a checkout that fails on stock gives its number back
+                order_code = generate_order_code(order_type)
+
+                # Order header (one row per order)
+                order = Order.objects.create(
+                    group_id=group_id,
+                    order_code=order_code,
+                    first_name=user.first_name,
+                    last_name=user.last_name,
+                    contact_number=user.contact_number,
+                    address=f"{user.address}, {user.city}, {user.province}, {user.zipcode}",
+                    email=user.email,
+                    sub_total=subtotal,
+                    order_type=order_type,
+                    payment_method=payment_method,
+                    proof_of_payment=proof,
+                    additional_notes=notes or "",
+                    delivery_fee=delivery_fee_post,
+                    scheduled_at=scheduled_at,
+                    stock_reserved=True,
                 )
-                product_image = product.image
-            except:
-                pass
 
-            checkout = Checkout.objects.create(
-                first_name=user.first_name,
-                last_name=user.last_name,
-                contact_number=user.contact_number,
-                address=f"{user.address}, {user.city}, {user.province}, {user.zipcode}",
-                email=user.email,
-                image=product_image,
-                product_name=item.product_name,
-                quantity=item.quantity,
-                price=item.price,
-                sub_total=subtotal,
-                order_type=order_type,
-                payment_method=payment_method,
-                proof_of_payment=proof,
-                additional_notes=notes,
-                order_code=order_code,
-                group_id=group_id,
-                delivery_fee=delivery_fee_post,
-                scheduled_at=scheduled_at,  # This should now work
-            )
+                # Create Checkout records
+                for item in cart_items:
+                    product = products[item.product_id]
+
+                    checkout = Checkout.objects.create(
+                        order=order,
+                        first_name=user.first_name,
+                        last_name=user.last_name,
+                        contact_number=user.contact_number,
+                        address=f"{user.address}, {user.city}, {user.province}, {user.zipcode}",
+                        email=user.email,
+                        image=product.image,
+                        product=product,
+                        product_name=item.product_name,
+                        quantity=item.quantity,
+                        price=item.price,
+                        unit_price=product.price,
+                        sub_total=subtotal,
+                        order_type=order_type,
+                        payment_method=payment_method,
+                        proof_of_payment=proof,
+                        additional_notes=notes,
+                        order_code=order_code,
+                        group_id=group_id,
+                        delivery_fee=delivery_fee_post,
+                        scheduled_at=scheduled_at,  # This should now work
+                    )
             
-            # Debug log
-            print(f"Created order with scheduled_at: {checkout.scheduled_at}")
+                    # Debug log
+                    logger.debug("Created order with scheduled_at: %s", checkout.scheduled_at)
 
-        # 🚫 Removed stock deduction here
+                cart_items.delete()
+        except InsufficientStock as e:
+            for line, available in e.shortages:
+                messages.error(request, f"Not enough stocks for {line.product_name}. Available: {available}")
+            return redirect('customer_checkout')
 
-        cart_items.delete()
         messages.success(request, "Order placed. Check your notifications to see the progress of your order.")
         return redirect('customer_home')
 
@@ -4750,52 +3824,23 @@ def customer_checkout(request):
 @login_required_session
 def customer_notifications(request):
     email = request.session.get('email')
-    business = BusinessDetails.objects.first()
-    customization, _ = Customization.objects.get_or_create(pk=1)
+    business = get_business_details()
+    customization = get_or_create_customization()
 
     # Mark all unseen accepted/rejected notifications as seen
-    Checkout.objects.filter(
+    seen_statuses = [
+        "accepted", "rejected",
+        "Preparing", "Packed", "Out for Delivery", "Completed"
+    ]
+    Order.objects.filter(
         email=email,
-        status__in=[
-            "accepted", "rejected",
-            "Preparing", "Packed", "Out for Delivery", "Completed"
-        ],
+        status__in=seen_statuses,
         is_seen_by_customer=False
     ).update(is_seen_by_customer=True)
+    refresh_customer_count(email)
 
-    # Group by both order_code AND date
-    all_orders = Checkout.objects.filter(
-        email=email,
-        status__in=[
-            "accepted", "rejected", "Preparing", "Packed", 
-            "Ready for Pickup", "Out for Delivery", "Completed"
-        ]
-    ).order_by('-created_at')
-
-    grouped_orders = defaultdict(list)
-    for order in all_orders:
-        # Create composite key with order_code + date
-        order_date = order.created_at.date() if order.created_at else None
-        composite_key = f"{order.order_code}_{order_date}" if order_date else order.order_code
-        grouped_orders[composite_key].append(order)
-
-    # Convert to display format
-    grouped_notifications = []
-    for composite_key, items in grouped_orders.items():
-        # Extract clean order code for display
-        clean_order_code = composite_key.split('_')[0] if '_' in composite_key else composite_key
-        first_item = items[0]
-        grouped_notifications.append({
-            'order_code': clean_order_code,
-            'status': first_item.status,
-            'created_at': first_item.created_at,
-            'items': items,
-            'sub_total': first_item.sub_total,
-            'rejection_reason': first_item.rejection_reason if first_item.status == "rejected" else None
-        })
-
-    # Sort by most recent date
-    grouped_notifications.sort(key=lambda x: x['created_at'] if x['created_at'] else datetime.min, reverse=True)
+    # ✅ Newest orders first, one keyset page at a time
+    grouped_notifications, next_cursor = feed_page(customer_feed(email))
 
     # Format times to HH:MM:SS
     current_time = datetime.now().strftime("%H:%M:%S")
@@ -4804,6 +3849,7 @@ def customer_notifications(request):
 
     return render(request, 'MSMEOrderingWebApp/customer_notification.html', {
         'notifications': grouped_notifications,
+        'next_cursor': next_cursor,
         'business': business,
         'customization': customization,
         'current_time': current_time,
@@ -4814,44 +3860,10 @@ def customer_notifications(request):
 def partial_customer_notifications(request):
     customization = get_or_create_customization()
     email = request.session.get('email')
-    business = BusinessDetails.objects.first()
-
-    # Group by both order_code AND date
-    all_orders = Checkout.objects.filter(
-        email=email,
-        status__in=[
-            "accepted", "rejected", "Preparing", "Packed",
-            "Ready for Pickup", "Out for Delivery", "Completed"
-        ]
-    ).order_by('-created_at')
-
-    grouped = defaultdict(list)
-    for order in all_orders:
-        # Create composite key with order_code + date
-        order_date = order.created_at.date() if order.created_at else None
-        composite_key = f"{order.order_code}_{order_date}" if order_date else order.order_code
-        grouped[composite_key].append(order)
-
-    # Convert to display format
-    grouped_notifications = []
-    for composite_key, items in grouped.items():
-        # Extract clean order code for display
-        clean_order_code = composite_key.split('_')[0] if '_' in composite_key else composite_key
-        first_item = items[0]
-        grouped_notifications.append({
-            'order_code': clean_order_code,
-            'status': first_item.status,
-            'created_at': first_item.created_at,
-            'items': items,
-            'sub_total': first_item.sub_total,
-            'rejection_reason': first_item.rejection_reason if first_item.status == "rejected" else None,
-            'order_type': first_item.order_type,
-            'delivery_fee': first_item.delivery_fee,
-            'final_total': (first_item.sub_total + first_item.delivery_fee) if first_item.order_type and first_item.order_type.lower() == "delivery" and first_item.delivery_fee else first_item.sub_total,
-        })
+    business = get_business_details()
 
-    # Sort by most recent date
-    grouped_notifications.sort(key=lambda x: x['created_at'] if x['created_at'] else datetime.min, reverse=True)
+    # ✅ Re-rendered on every WebSocket ping, so only the first page
+    grouped_notifications, next_cursor = feed_page(customer_feed(email))
 
     # Format times to HH:MM:SS
     current_time = datetime.now().strftime("%H:%M:%S")
@@ -4860,6 +3872,7 @@ def partial_customer_notifications(request):
 
     html = render_to_string("partials/customer_notifications_list.html", {
         'notifications': grouped_notifications,
+        'next_cursor': next_cursor,
         'customization': customization,
         'business': business,
         'current_time': current_time,
@@ -4868,6 +3881,18 @@ def partial_customer_notifications(request):
     })
     return HttpResponse(html)
 
+def older_customer_notifications(request):
+    try:
+        notifications, next_cursor = feed_page(customer_feed(request.session.get('email')), request.GET.get('cursor'))
+    except ValueError as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
+
+    return JsonResponse({
+        "success": True,
+        "html": render_to_string("partials/customer_notification_cards.html", {'notifications': notifications}),
+        "next_url": f"{reverse('older_customer_notifications')}?{urlencode({'cursor': next_cursor})}" if next_cursor else None,
+    })
+
 def notify_customer(email, message):
     group = f"customer_{email.replace('@', '_at_').replace('.', '_dot_')}"
     
@@ -4885,7 +3910,7 @@ def notify_customer(email, message):
     
     customer_count = len(unique_orders)
 
-    async_to_sync(get_channel_layer().group_send)(
+    async_to_sync(group_send)(
         group,
         {
             "type": "send_customer_notification",
@@ -4901,7 +3926,7 @@ def customer_profile(request):
     user_id = request.session.get('user_id')
     user = User.objects.get(id=user_id)
 
-    business = BusinessDetails.objects.first()
+    business = get_business_details()
     customization = get_or_create_customization()
     edit_mode = request.GET.get('edit', False)
 
@@ -4959,7 +3984,7 @@ def customer_profile(request):
 @login_required_session
 def online_payment_details(request):
     customization = get_or_create_customization()
-    business = BusinessDetails.objects.first()
+    business = get_business_details()
     all_payments = OnlinePaymentDetails.objects.all().order_by('-id')
     selected_payment = None
 
@@ -5025,7 +4050,7 @@ def delete_online_payment(request, id):
 def customer_viewonlinepayment(request):
     customization = get_or_create_customization()
     payment_methods = OnlinePaymentDetails.objects.all().order_by('-id')
-    business = BusinessDetails.objects.first()
+    business = get_business_details()
 
     return render(request, 'MSMEOrderingWebApp/customer_viewonlinepayment.html', {
         'customization': customization,
@@ -5037,7 +4062,7 @@ def customer_viewonlinepayment(request):
 def business_viewonlinepayment(request):
     customization = get_or_create_customization()
     payment_methods = OnlinePaymentDetails.objects.all().order_by('-id')
-    business = BusinessDetails.objects.first()
+    business = get_business_details()
 
     return render(request, 'MSMEOrderingWebApp/business_viewonlinepayment.html', {
         'customization': customization,
@@ -5118,9 +4143,9 @@ def customer_changepassword(request):
     return JsonResponse({'status': 'error', 'message': 'Invalid request.'})
 
 def add_to_cart(request):
-    print("add_to_cart called")
+    logger.debug("add_to_cart called")
     if request.method == 'POST':
-        print("POST request received")
+        logger.debug("POST request received")
         if 'user_id' not in request.session or request.session.get('user_type') != 'customer':
             return JsonResponse({'success': False, 'error': 'User not authenticated'})
 
@@ -5130,25 +4155,13 @@ def add_to_cart(request):
             user_id = request.session.get('user_id')
             user = User.objects.get(id=user_id)
 
-            # Extract product_name and variation_name
-            full_name = data.get('product_name')  # e.g., "Ember Lulu - small (₱100.00)"
-            match = re.match(r"^(.*?)\s*-\s*(.*?)\s*\(₱.*?\)$", full_name)
-            if match:
-                product_name = match.group(1).strip()
-                variation_name = match.group(2).strip()
-            else:
-                product_name = full_name
-                variation_name = "Default"
+            full_name = data.get('product_name')  # e.g., "Ember Lulu - small"
 
-            # Try to fetch product from DB
-            product = None
+            # The variation picked in the product modal
             image_file = None
-            try:
-                product = Products.objects.get(name=product_name, variation_name=variation_name)
-                if product.image:
-                    image_file = product.image  # ✅ use existing product image
-            except Products.DoesNotExist:
-                pass
+            product = Products.objects.get(pk=data.get('product_id'))
+            if product.image:
+                image_file = product.image  # ✅ use existing product image
 
             # If frontend sent an image URL and no DB image, use that instead
             if not image_file:
@@ -5160,11 +4173,11 @@ def add_to_cart(request):
                             filename = os.path.basename(urlparse(image_url).path) or "cart_image.jpg"
                             image_file = ContentFile(response.content, name=filename)
                     except Exception as e:
-                        print("Image fetch failed:", e)
+                        logger.warning("Image fetch failed: %s", e)
 
             # Compose full address
             full_address = f"{user.address}, {user.city}, {user.province}"
-            print("Full address to save:", full_address)
+            logger.debug("Full address to save: %s", full_address)
 
             # Save to cart
             Cart.objects.create(
@@ -5173,16 +4186,18 @@ def add_to_cart(request):
                 contact_number=user.contact_number,
                 address=full_address,
                 email=user.email,
-                product_name=full_name,
+                product=product,
+                product_name=full_name or f"{product.name} - {product.variation_name}",
                 quantity=data.get('quantity'),
                 price=data.get('price'),
+                unit_price=product.price,
                 image=image_file  # ✅ final image
             )
 
             return JsonResponse({'success': True})
 
         except Exception as e:
-            print("Error in add_to_cart:", e)
+            logger.exception("Error in add_to_cart: %s", e)
             return JsonResponse({'success': False, 'error': str(e)})
 
     return JsonResponse({'success': False, 'error': 'Invalid method'})
@@ -37,22 +37,20 @@ INSTALLED_APPS = [
 # -------------------------
 ASGI_APPLICATION = "OrderingSystem.asgi.application"
 
+# Shared cache (notification counters); per-process memory cache without Redis
 if os.getenv("REDIS_URL"):
-    CHANNEL_LAYERS = {
+    CACHES = {
         "default": {
-            "BACKEND": "channels_redis.core.RedisChannelLayer",
-            "CONFIG": {"hosts": [os.getenv("REDIS_URL")]},
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
         }
     }
-else:
-    CHANNEL_LAYERS = {
-        "default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}
-    }
 
 # -------------------------
 # Middleware
 # -------------------------
 MIDDLEWARE = [
+    "MSMEOrderingWebApp.middleware.MetricsMiddleware",  # ✅ outermost, so latency covers every layer
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  # ✅ serve static on Render
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -100,6 +98,24 @@ DATABASES = {
     )
 }
 
+# Channel layer: Redis when configured, else the Postgres database itself
+# (LISTEN/NOTIFY, shared by every daphne process), else in-memory (one process)
+if os.getenv("REDIS_URL"):
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {"hosts": [os.getenv("REDIS_URL")]},
+        }
+    }
+elif DATABASES["default"]["ENGINE"] == "django.db.backends.postgresql":
+    CHANNEL_LAYERS = {
+        "default": {"BACKEND": "MSMEOrderingWebApp.pg_channel_layer.PostgresChannelLayer"}
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}
+    }
+
 # -------------------------
 # Password Validators
 # -------------------------
@@ -138,7 +154,12 @@ CSRF_TRUSTED_ORIGINS = [
     "https://orderingsystem-ctpv.onrender.com",
 ]
 
-if DEBUG:
+if os.getenv("EMAIL_FILE_PATH"):
+    # Offline stand-in: every email is written to a file in this directory
+    EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
+    EMAIL_FILE_PATH = os.getenv("EMAIL_FILE_PATH")
+    DEFAULT_FROM_EMAIL = "dev@localhost"
+elif DEBUG:
     EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
     DEFAULT_FROM_EMAIL = "dev@localhost"
 else:
@@ -150,3 +171,36 @@ else:
     EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD")
     DEFAULT_FROM_EMAIL = os.environ.get("DEFAULT_FROM_EMAIL", EMAIL_HOST_USER)
     EMAIL_TIMEOUT = 30
+
+# -------------------------
+# Logging & Metrics
+# -------------------------
+# App logs go to stdout; DEBUG / INFO records are sampled 1 in LOG_SAMPLE_RATE
+# per call site (see MSMEOrderingWebApp.log_sampling), warnings always pass
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "filters": {
+        "sampled": {
+            "()": "MSMEOrderingWebApp.log_sampling.SampleFilter",
+            "rate": int(os.getenv("LOG_SAMPLE_RATE", "10")),
+        },
+    },
+    "formatters": {
+        "plain": {"format": "%(asctime)s %(levelname)s %(name)s: %(message)s"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": "plain", "filters": ["sampled"]},
+    },
+    "loggers": {
+        "MSMEOrderingWebApp": {
+            "handlers": ["console"],
+            "level": os.getenv("LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
+}
+
+# /metrics requires "Authorization: Bearer <token>" when this is set; without it
+# only requests from localhost or the logged-in owner may read it
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
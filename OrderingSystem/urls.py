@@ -9,6 +9,7 @@ urlpatterns = [
     path('', views.login_view, name='login'),
     path('MSMEOrderingWebApp/', include('MSMEOrderingWebApp.urls')),
     path('admin/', admin.site.urls),
+    path('metrics', views.metrics, name='metrics'),
     path('verify-email/', views.verify_email, name='verify_email'),
     path('Logout/', views.logout_view, name='logout'),
     path('add-to-cart/', views.add_to_cart, name='add_to_cart'),
@@ -25,6 +26,8 @@ urlpatterns = [
     path('customer/online-payment/', views.customer_viewonlinepayment, name='customer_viewonlinepayment'),
     path('business/pending-orders/', views.partial_pending_orders, name='partial_pending_orders'),
     path('partial/pending-orders/', views.partial_pending_orders, name='partial_pending_orders'),
+    path('partial/pending-orders/older/', views.older_pending_orders, name='older_pending_orders'),
+    path('partial/customer-notifications/older/', views.older_customer_notifications, name='older_customer_notifications'),
     path('partial/customer-notifications/', views.partial_customer_notifications, name='partial_customer_notifications'),
     path('update-order-status/', views.update_order_status, name='update_order_status'),
     path('partial/customer-notifications/', views.partial_customer_notifications, name='partial_customer_notifications'),